@@ -0,0 +1,187 @@
+""" Assign the locations to the WRS2 path-rows that fully contain their buffer,
+in one pass over all sites and path-rows. This is the Python counterpart of
+get_WRS_pathrow_poi.R and check_if_fully_within_pr.R, used when
+`python_pathrow_assignment` is set in the yml: the WRS2 footprints are read and
+indexed (STRtree) once, and the buffers are projected and tested against the
+footprints per UTM zone instead of per path-row. It writes the same
+WRS_subset_list.csv and locations_<PR>.csv files, or the single locations store
+if `locations_store` is set in the yml (see locations_store.py).
+
+Run by the `b_WRS_pathrow_poi` target (see assign_pathrows_python.R), from the
+repository root. Requires geopandas, shapely (>= 2.0) and pyproj.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import geopandas
+import shapely
+from pandas import read_csv
+from pyproj import Transformer
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from locations_store import write_locations_store
+
+WRS_FILE = "b_pull_Landsat_SRST_poi/in/WRS2_descending.shp"
+# locations written by assign_pathrows_python.R
+LOCATIONS_FILE = "b_pull_Landsat_SRST_poi/mid/ref_locations.csv"
+LOCATIONS_FOLDER = "b_pull_Landsat_SRST_poi/out/locations/"
+WRS_SUBSET_FILE = "b_pull_Landsat_SRST_poi/out/WRS_subset_list.csv"
+
+# segments per quarter circle of the buffers, the sf::st_buffer() default
+BUFFER_QUAD_SEGS = 30
+
+
+def read_wrs(path=WRS_FILE):
+  """ Read the WRS2 footprints in EPSG:4326
+
+  Args:
+      path: path of the WRS2 descending shapefile
+
+  Returns:
+      geopandas.GeoDataFrame with a 'PR' column
+  """
+  wrs = geopandas.read_file(path)
+  if wrs.crs is None or wrs.crs.to_epsg() != 4326:
+    wrs = wrs.to_crs(4326)
+  return wrs
+
+
+def utm_epsg(tiles):
+  """ EPSG code of the UTM zone of each footprint, from the mean of its vertex
+  coordinates as in check_if_fully_within_pr.R
+
+  Args:
+      tiles: array of shapely geometries in EPSG:4326
+
+  Returns:
+      integer array of EPSG codes (326xx north, 327xx south of the equator)
+  """
+  coords, index = shapely.get_coordinates(tiles, return_index = True)
+  n_coords = np.bincount(index, minlength = len(tiles))
+  mean_x = np.bincount(index, coords[:, 0], minlength = len(tiles)) / n_coords
+  mean_y = np.bincount(index, coords[:, 1], minlength = len(tiles)) / n_coords
+  zone = np.ceil((mean_x + 180) / 6).astype(int)
+  return np.where(mean_y >= 0, 32600, 32700) + zone
+
+
+def candidate_pairs(lon, lat, tiles):
+  """ Find the (site, footprint) pairs where the site is in the footprint,
+  with an STRtree over the footprints
+
+  Args:
+      lon, lat: arrays of the site coordinates in EPSG:4326
+      tiles: array of shapely geometries of the footprints in EPSG:4326
+
+  Returns:
+      tuple of the site and footprint indices of the pairs, sorted by site
+  """
+  tree = shapely.STRtree(tiles)
+  site, tile = tree.query(shapely.points(lon, lat), predicate = "intersects")
+  order = np.lexsort((tile, site))
+  return site[order], tile[order]
+
+
+def buffers_within(lon, lat, tiles, site, tile, buffer):
+  """ Test whether the buffer of each site of a (site, footprint) pair is fully
+  within the footprint. Sites and footprints are projected to the UTM zone of
+  the footprint and buffered there, one zone at a time.
+
+  Args:
+      lon, lat: arrays of the site coordinates in EPSG:4326
+      tiles: array of shapely geometries of the footprints in EPSG:4326
+      site, tile: site and footprint indices of the pairs, see
+      candidate_pairs()
+      buffer: buffer distance in meters
+
+  Returns:
+      boolean array, one value per pair
+  """
+  within = np.zeros(len(site), dtype = bool)
+  pair_epsg = utm_epsg(tiles)[tile]
+  for epsg in np.unique(pair_epsg):
+    in_zone = np.flatnonzero(pair_epsg == epsg)
+    to_utm = Transformer.from_crs("EPSG:4326", "EPSG:" + str(epsg), always_xy = True)
+    x, y = to_utm.transform(lon[site[in_zone]], lat[site[in_zone]])
+    buffered = shapely.buffer(shapely.points(x, y), buffer, quad_segs = BUFFER_QUAD_SEGS)
+    # project each footprint of the zone once
+    zone_tiles, lookup = np.unique(tile[in_zone], return_inverse = True)
+    utm_tiles = shapely.make_valid(shapely.transform(
+      tiles[zone_tiles], lambda xy: np.column_stack(to_utm.transform(xy[:, 0], xy[:, 1]))))
+    shapely.prepare(utm_tiles)
+    within[in_zone] = shapely.contains(utm_tiles[lookup], buffered)
+  return within
+
+
+def assign_pathrows(locations, wrs, buffer, crs="EPSG:4326"):
+  """ Assign the locations to the path-rows that fully contain their buffer
+
+  Args:
+      locations: pandas.DataFrame of the locations with the columns 'id',
+      'Latitude' and 'Longitude'
+      wrs: WRS2 footprints, see read_wrs()
+      buffer: buffer distance in meters
+      crs: CRS of the location coordinates
+
+  Returns:
+      tuple of a pandas.DataFrame with one row per location and path-row (the
+      columns of `locations` with 'WRS2_PR' before the coordinates, as written
+      by check_if_fully_within_pr.R) and the list of path-rows that intersect
+      any location (as listed by get_WRS_pathrow_poi.R)
+  """
+  locations = locations.dropna(subset = ["Longitude", "Latitude"])
+  lon = locations["Longitude"].to_numpy(dtype = float)
+  lat = locations["Latitude"].to_numpy(dtype = float)
+  if crs != "EPSG:4326":
+    lon, lat = Transformer.from_crs(crs, "EPSG:4326", always_xy = True).transform(lon, lat)
+  tiles = wrs.geometry.to_numpy()
+  site, tile = candidate_pairs(lon, lat, tiles)
+  within = buffers_within(lon, lat, tiles, site, tile, buffer)
+  pathrows = wrs["PR"].to_numpy()
+  assigned = locations.iloc[site[within]].copy()
+  assigned["WRS2_PR"] = pathrows[tile[within]]
+  coords = [column for column in locations.columns if column in ["Latitude", "Longitude"]]
+  columns = [column for column in locations.columns if column not in coords]
+  assigned = assigned[columns + ["WRS2_PR"] + coords].reset_index(drop = True)
+  return assigned, list(dict.fromkeys(pathrows[np.unique(tile)].tolist()))
+
+
+def write_pathrow_locations(assigned, pathrows, folder=LOCATIONS_FOLDER):
+  """ Write the locations of each path-row to locations_<PR>.csv, the files
+  read by run_GEE_per_pathrow.py. Path-rows without fully contained locations
+  get a file with the header only, as from check_if_fully_within_pr.R.
+
+  Args:
+      assigned: locations with 'WRS2_PR', see assign_pathrows()
+      pathrows: path-rows to write a file for
+      folder: folder of the location files
+
+  Returns:
+      list of the written file paths
+  """
+  os.makedirs(folder, exist_ok = True)
+  groups = dict(tuple(assigned.groupby("WRS2_PR", sort = False)))
+  files = []
+  for pr in pathrows:
+    fn = os.path.join(folder, "locations_" + str(pr) + ".csv")
+    groups.get(pr, assigned.iloc[0:0]).to_csv(fn, index = False)
+    files.append(fn)
+  return files
+
+
+if __name__ == "__main__":
+  yml = read_csv("b_pull_Landsat_SRST_poi/mid/yml.csv")
+  locations = read_csv(LOCATIONS_FILE, dtype = {"id": str})
+  start = time.perf_counter()
+  wrs = read_wrs()
+  assigned, assigned_pathrows = assign_pathrows(locations, wrs, float(yml["site_buffer"][0]),
+                                                yml["location_crs"][0])
+  wrs[wrs["PR"].isin(assigned_pathrows)].drop(columns = "geometry").to_csv(WRS_SUBSET_FILE, index = False)
+  if "locations_store" in yml and str(yml["locations_store"][0]) == "True":
+    write_locations_store(assigned)
+  else:
+    write_pathrow_locations(assigned, assigned_pathrows)
+  print("Assigned " + str(len(locations)) + " locations to " + str(len(assigned_pathrows)) +
+        " path-rows in " + str(round(time.perf_counter() - start, 1)) + " seconds")
@@ -0,0 +1,45 @@
+""" Benchmark of the path-row assignment of assign_pathrows.py: assigns 20,000
+and 60,000 synthetic sites spread over the conterminous US to the WRS2
+path-rows that fully contain their 120 m buffer, and reports the time of each
+step (reading the footprints is timed once). Needs the WRS2 descending
+shapefile in b_pull_Landsat_SRST_poi/in/, geopandas, shapely and pyproj, but
+not Earth Engine.
+
+Run from the repository root:
+
+    python b_pull_Landsat_SRST_poi/py/benchmarks/bench_assign_pathrows.py
+"""
+import sys
+import time
+
+import numpy as np
+from pandas import DataFrame
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from assign_pathrows import read_wrs, candidate_pairs, buffers_within, assign_pathrows
+
+BUFFER = 120
+
+start = time.perf_counter()
+wrs = read_wrs()
+print("read_wrs: %.2f s" % (time.perf_counter() - start))
+tiles = wrs.geometry.to_numpy()
+
+rng = np.random.default_rng(1)
+print("n_sites  pairs  contained  pairs_s  within_s  total_s")
+for n_sites in [20000, 60000]:
+  lon = rng.uniform(-124.0, -67.0, n_sites)
+  lat = rng.uniform(25.0, 49.0, n_sites)
+  start = time.perf_counter()
+  site, tile = candidate_pairs(lon, lat, tiles)
+  pairs_s = time.perf_counter() - start
+  start = time.perf_counter()
+  within = buffers_within(lon, lat, tiles, site, tile, BUFFER)
+  within_s = time.perf_counter() - start
+  locations = DataFrame({'Latitude': lat, 'Longitude': lon,
+                         'id': [str(i) for i in range(n_sites)]})
+  start = time.perf_counter()
+  assign_pathrows(locations, wrs, BUFFER)
+  print("%7d  %5d  %9d  %7.2f  %8.2f  %7.2f" % (n_sites, len(site), within.sum(), pairs_s,
+                                                within_s, time.perf_counter() - start))
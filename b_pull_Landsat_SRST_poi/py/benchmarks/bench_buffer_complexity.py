@@ -0,0 +1,51 @@
+""" Benchmark of the reducer time against the complexity of the site buffers.
+Reduces one Landsat 8/9 scene over 1,000 synthetic sites with ref_pull(), with
+the buffers approximated by polygons of 8 to 64 vertices (`buffer_vertices`)
+and with the Earth Engine default error, and reports the wall time of fetching
+the summaries. Each case has a different graph, so Earth Engine does not serve
+it from its cache, but the times include the transfer of the summaries and the
+load on Earth Engine at the time, so compare them within a run.
+
+Run from the repository root after the {targets} pipeline has written
+b_pull_Landsat_SRST_poi/mid/yml.csv (importing run_GEE_per_pathrow initializes
+Earth Engine with the configured project):
+
+    python b_pull_Landsat_SRST_poi/py/benchmarks/bench_buffer_complexity.py
+"""
+import sys
+import time
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+# the synthetic sites are shared with the tests
+if "b_pull_Landsat_SRST_poi/py/tests" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py/tests")
+import run_GEE_per_pathrow as per_pr
+from buffers import max_error_for_vertices, vertices_for_max_error
+from fake_sites import fake_locations
+
+N_SITES = 1000
+PATHROW = "034032"
+VERTICES = [0, 64, 32, 16, 8]
+
+radius = float(per_pr.buffer)
+wrs, ls457, ls89 = per_pr.get_pathrow_stacks(PATHROW)
+image = ls89.sort('CLOUD_COVER').first()
+# sites in the middle of the WRS2 tile
+df = fake_locations(N_SITES, lon_range = (-105.0, -104.0), lat_range = (39.5, 40.5))
+sites = per_pr.csv_to_eeFeat(df, per_pr.yml['location_crs'][0], 0, N_SITES)
+
+print("vertices  max_error_m  seconds")
+for n_vertices in VERTICES:
+  if n_vertices > 0:
+    per_pr.buffer_max_error = max_error_for_vertices(radius, n_vertices)
+    label = "%8d  %11.2f" % (vertices_for_max_error(radius, per_pr.buffer_max_error),
+                             per_pr.buffer_max_error)
+  else:
+    per_pr.buffer_max_error = None
+    label = "%8s  %11s" % ("default", "default")
+  feat = sites.map(per_pr.dp_buff)
+  out = per_pr.ref_pull(image, feat, wrs.geometry(), 'LS89', 'DSWE1')
+  start = time.perf_counter()
+  out.getInfo()
+  print(label + "  %7.2f" % (time.perf_counter() - start))
@@ -0,0 +1,60 @@
+""" Benchmark of building the site FeatureCollection of a chunk: the previous
+row-by-row builder (one client-side ee.Feature per site) against the current
+`csv_to_eeFeat()` (two flat lists, features built server side). Reports the
+client build time and the size of the serialized request for chunks of 5,000
+and 50,000 sites.
+
+Run from the repository root after the {targets} pipeline has written
+b_pull_Landsat_SRST_poi/mid/yml.csv (importing run_GEE_per_pathrow initializes
+Earth Engine with the configured project):
+
+    python b_pull_Landsat_SRST_poi/py/benchmarks/bench_csv_to_eeFeat.py
+"""
+import json
+import sys
+import time
+
+import ee
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+# the synthetic sites are shared with the tests
+if "b_pull_Landsat_SRST_poi/py/tests" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py/tests")
+import run_GEE_per_pathrow as per_pr
+from fake_sites import fake_locations
+
+
+def csv_to_eeFeat_rowwise(df, proj):
+  """ The row-by-row builder used before, for comparison """
+  features = []
+  for i in range(len(df)):
+    row = df.iloc[i]
+    latlong = [row['Longitude'], row['Latitude']]
+    loc_properties = {'system:index': str(row['id']), 'id': str(row['id'])}
+    features.append(ee.Feature(ee.Geometry.Point(latlong, proj), loc_properties))
+  return ee.FeatureCollection(features)
+
+
+def measure(builder, df, proj):
+  """ Build the collection and serialize it, as is done when an export is
+  started
+
+  Returns:
+      tuple of build time in seconds and request size in bytes
+  """
+  start = time.perf_counter()
+  fc = builder(df, proj)
+  payload = json.dumps(ee.serializer.encode(fc))
+  return time.perf_counter() - start, len(payload.encode("utf-8"))
+
+
+proj = per_pr.yml['location_crs'][0]
+print("n_sites  builder   build_s  request_MB")
+for n_sites in [5000, 50000]:
+  df = fake_locations(n_sites)
+  builders = {"rowwise": csv_to_eeFeat_rowwise,
+              "lists": lambda d, p: per_pr.csv_to_eeFeat(d, p, 0, len(d))}
+  for name, builder in builders.items():
+    seconds, size = measure(builder, df, proj)
+    print("%7d  %-8s %8.2f  %10.2f" % (n_sites, name, seconds, size / 1e6))
@@ -0,0 +1,48 @@
+""" Benchmark of the local NumPy pipeline (local_pipeline.py) on a synthetic
+Landsat 8 scene: scaling and QA masks, DSWE, and zonal statistics for 1,000 and
+10,000 site buffers, with one DSWE variant and with all three variants
+summarized together. Does not need Earth Engine.
+
+Run from the repository root:
+
+    python b_pull_Landsat_SRST_poi/py/benchmarks/bench_local_pipeline.py
+"""
+import sys
+import time
+
+import numpy as np
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+import local_pipeline as lp
+from summary_bands import c2_bands
+
+
+def fake_scene(shape, seed=1):
+  """ Random LS89 band arrays with a realistic mix of QA_PIXEL values (clear
+  land, clear water, cloud, cloud shadow) """
+  rng = np.random.default_rng(seed)
+  raw = {b: rng.integers(7000, 14000, shape) for b in c2_bands['LS89'] if b.startswith('SR_B')}
+  raw['QA_PIXEL'] = rng.choice([21824, 21952, 22280, 23888], shape, p = [0.4, 0.4, 0.1, 0.1])
+  raw['QA_RADSAT'] = rng.choice([0, 1], shape, p = [0.99, 0.01])
+  raw['SR_QA_AEROSOL'] = rng.choice([0, 64, 192], shape)
+  raw['ST_B10'] = rng.integers(40000, 50000, shape)
+  return raw
+
+
+shape = (2000, 2000)
+geotransform = (500000.0, 30.0, 0, 4000000.0, 0, -30.0)
+raw = fake_scene(shape)
+rng = np.random.default_rng(2)
+print("n_sites  variants  pixels_s  pull_s")
+for n_sites in [1000, 10000]:
+  x = geotransform[0] + rng.uniform(0, shape[1] * 30, n_sites)
+  y = geotransform[3] - rng.uniform(0, shape[0] * 30, n_sites)
+  start = time.perf_counter()
+  site_pixels = lp.buffer_pixels(x, y, geotransform, shape, 120)
+  pixels_s = time.perf_counter() - start
+  ids = [str(i) for i in range(n_sites)]
+  for variants in [('DSWE1',), ('DSWE1', 'DSWE1a', 'DSWE3')]:
+    start = time.perf_counter()
+    lp.ref_pull_local(raw, 'LS89', ids, site_pixels, 'LC08_bench', variants)
+    print("%7d  %8d  %8.2f  %6.2f" % (n_sites, len(variants), pixels_s, time.perf_counter() - start))
@@ -0,0 +1,55 @@
+""" Benchmark of the per-path-row startup read of the locations: one
+locations_<PR>.csv file per path-row read with pandas.read_csv (the default)
+against the single memory-mapped locations store (`locations_store`). Writes
+60,000 synthetic sites in 500 path-rows to a temporary folder in both layouts
+and reports the time to read every path-row, as the pull does. Needs pyarrow,
+but not Earth Engine.
+
+Run from the repository root:
+
+    python b_pull_Landsat_SRST_poi/py/benchmarks/bench_locations_store.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pandas import DataFrame, read_csv
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from locations_store import write_locations_store, read_pathrow_locations
+
+N_SITES = 60000
+N_PATHROWS = 500
+
+rng = np.random.default_rng(1)
+pathrows = [str(p).zfill(3) + str(r).zfill(3) for p, r in
+            zip(rng.integers(1, 234, N_PATHROWS), rng.integers(1, 249, N_PATHROWS))]
+pathrows = list(dict.fromkeys(pathrows))
+locations = DataFrame({'lakeSR_id': [str(i) for i in range(N_SITES)],
+                       'id': [str(i) for i in range(N_SITES)],
+                       'flag': rng.integers(0, 3, N_SITES),
+                       'WRS2_PR': rng.choice(pathrows, N_SITES),
+                       'Latitude': rng.uniform(25, 49, N_SITES),
+                       'Longitude': rng.uniform(-124, -67, N_SITES)})
+
+with tempfile.TemporaryDirectory() as folder:
+  for pr, group in locations.groupby('WRS2_PR'):
+    group.to_csv(os.path.join(folder, 'locations_' + pr + '.csv'), index = False)
+  store = write_locations_store(locations, os.path.join(folder, 'locations.feather'))
+
+  start = time.perf_counter()
+  for pr in pathrows:
+    read_csv(os.path.join(folder, 'locations_' + pr + '.csv'))
+  csv_s = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for pr in pathrows:
+    read_pathrow_locations(pr, store)
+  store_s = time.perf_counter() - start
+
+print("layout  files  total_s  per_pathrow_ms")
+print("csv     %5d  %7.2f  %14.2f" % (len(pathrows), csv_s, 1000 * csv_s / len(pathrows)))
+print("store   %5d  %7.2f  %14.2f" % (1, store_s, 1000 * store_s / len(pathrows)))
@@ -0,0 +1,83 @@
+import math
+
+import ee
+
+
+def max_error_for_vertices(radius, n_vertices):
+  """ Maximum error of a buffer circle approximated by a regular polygon with
+  `n_vertices` vertices, to pass as the `maxError` of a buffer
+
+  Args:
+      radius: buffer distance in meters
+      n_vertices: number of vertices of the polygon (at least 3)
+
+  Returns:
+      maximum error in meters
+  """
+  return radius * (1 - math.cos(math.pi / max(n_vertices, 3)))
+
+
+def vertices_for_max_error(radius, max_error):
+  """ Number of vertices of a regular polygon that approximates a buffer circle
+  within `max_error`, the inverse of max_error_for_vertices()
+
+  Args:
+      radius: buffer distance in meters
+      max_error: maximum error in meters
+
+  Returns:
+      integer number of vertices
+  """
+  # round off the floating point error of the round trip before the ceiling
+  n_vertices = round(math.pi / math.acos(1 - min(max_error / radius, 1)), 6)
+  return max(3, math.ceil(n_vertices))
+
+
+def utm_epsg(lon, lat):
+  """ EPSG code of the UTM zone of a set of sites, picked from the mean of
+  their longitudes and latitudes with the rule of check_if_fully_within_pr.R.
+  The means are computed locally, so the zone does not depend on how Earth
+  Engine computes a centroid.
+
+  Args:
+      lon, lat: sequences of the site coordinates in EPSG:4326
+
+  Returns:
+      EPSG code as a string, 'EPSG:326xx' north and 'EPSG:327xx' south of the
+      equator
+  """
+  lon = [float(x) for x in lon]
+  lat = [float(y) for y in lat]
+  mean_x = math.fsum(lon) / len(lon)
+  mean_y = math.fsum(lat) / len(lat)
+  zone = min(max(math.ceil((mean_x + 180) / 6), 1), 60)
+  return ('EPSG:326' if mean_y >= 0 else 'EPSG:327') + '%02d' % zone
+
+
+def utm_projection(lon, lat):
+  """ UTM projection of a set of sites, see utm_epsg()
+
+  Args:
+      lon, lat: sequences of the site coordinates in EPSG:4326
+
+  Returns:
+      ee.Projection
+  """
+  return ee.Projection(utm_epsg(lon, lat))
+
+
+def buffer_sites(feat, distance, max_error=None, proj=None):
+  """ Buffer point sites
+
+  Args:
+      feat: ee.FeatureCollection of points
+      distance: buffer distance in meters
+      max_error: maximum error of the buffer polygons in meters, None for the
+      Earth Engine default
+      proj: optional ee.Projection to buffer in (e.g. from utm_projection()),
+      None to buffer geodesically
+
+  Returns:
+      ee.FeatureCollection of polygons
+  """
+  return feat.map(lambda site: site.buffer(distance, max_error, proj))
@@ -1,7 +1,35 @@
 import ee
-from pandas import read_csv
-import time
+from pandas import read_csv, DataFrame
 import os
+import sys
+
+# make the helper modules in this folder importable when sourced from R
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from task_ledger import get_task_ledger
+from task_monitor import ACTIVE_STATES, classify_task_error, wait_for_run
+
+
+def get_run_tasks():
+  """ Get the status of all of this run's tasks with a single task list request
+
+  Returns:
+      list of task status dictionaries (with the keys 'id', 'state',
+      'description' and, for failed tasks, 'error_message')
+  """
+  return [task for task in ee.data.getTaskList()
+          if run_date in (task.get("description") or "")]
+
+
+def base_description(description):
+  """ Strip the part of a split chunk from a site export description, so that
+  the parts of a resubmitted chunk can be matched to the original export """
+  export = per_pr.parse_site_export_description(description)
+  if export is None or export["part"] is None:
+    return description
+  return per_pr.site_export_description(export["sensor_group"], export["dswe_variant"],
+                                        export["pr"], export["chunk"])
+
 
 # get configs from yml file
 yml = read_csv("b_pull_Landsat_SRST_poi/mid/yml.csv")
@@ -13,15 +41,63 @@ ee.Initialize(project = eeproj)
 run_date = yml["run_date"][0]
 # make task error file name
 fn = "GEE_task_errors_v" + run_date + ".csv"
+# resubmit failed exports? (not present in yml files of older runs)
+resubmit = "resubmit_failed" in yml and str(yml["resubmit_failed"][0]) == "True"
+# number of times failed exports are resubmitted
+max_rounds = 2
+
+if resubmit:
+  # the per-pathrow functions are only needed to resubmit
+  import run_GEE_per_pathrow as per_pr
 
-# get a list of all the submitted tasks (these data time out at 10 days, so any 
+ledger = get_task_ledger()
+
+# get a list of all the submitted tasks (these data time out at 10 days, so any
 # failed tasks may not be indicative of ALL failed tasks if the runtime of the
 # pull is greater than 10 days)
-ts = list(ee.batch.Task.list())
-
-# for each of the tasks, see if any failed, if so, add a line to a csv file with the task id
-for task in ts:
-   if ("FAIL" in task.status()['state'] and run_date in task.status()['description']):
-       # add the task description to a file called 'GEE_task_errors.csv'
-       with open(os.path.join('b_pull_Landsat_SRST_poi/out/', fn), 'a') as f:
-          f.write(task.status()['description'] + '\n')
+run_tasks = get_run_tasks()
+failed = [task for task in run_tasks if task["state"] == "FAILED"]
+errors = []
+n_round = 0
+
+while len(failed) > 0:
+  n_round += 1
+  # store the failures with their error messages in the task ledger
+  ledger.update_states([dict(task, run_date = run_date) for task in failed])
+
+  # exports that were resubmitted before (e.g. by an earlier run of this
+  # script) and are running or complete do not need to be sent again
+  if resubmit:
+    superseded = set(base_description(task["description"]) for task in run_tasks
+                     if task["state"] in ACTIVE_STATES + ("COMPLETED",))
+
+  known_ids = set(task["id"] for task in run_tasks)
+  for task in failed:
+    error_type = classify_task_error(task.get("error_message"))
+    resubmitted_as = []
+    if (resubmit and n_round <= max_rounds and error_type != "user" and
+        base_description(task["description"]) not in superseded):
+      # memory and time out errors are sent as smaller tasks, quota errors as is
+      resubmitted_as = per_pr.resubmit_export(task["description"],
+                                              split = error_type in ("memory", "timeout"))
+      if len(resubmitted_as) > 0:
+        print("Resubmitted " + task["description"] + " (" + error_type + ") as " +
+              ", ".join(resubmitted_as))
+    errors.append({"description": task["description"], "task_id": task["id"],
+                   "error_type": error_type,
+                   "error_message": task.get("error_message"),
+                   "resubmitted_as": ";".join(resubmitted_as)})
+
+  if not any(error["resubmitted_as"] != "" for error in errors[-len(failed):]):
+    break
+
+  # wait for the resubmitted tasks and check them for failures
+  wait_for_run(run_date)
+  run_tasks = get_run_tasks()
+  failed = [task for task in run_tasks
+            if task["state"] == "FAILED" and task["id"] not in known_ids]
+
+# add the failed tasks to a file called 'GEE_task_errors_vRUN_DATE.csv'
+if len(errors) > 0:
+  DataFrame(errors).to_csv(os.path.join('b_pull_Landsat_SRST_poi/out/', fn), index = False)
+  print(str(len(errors)) + " failed task(s) documented in " + fn)
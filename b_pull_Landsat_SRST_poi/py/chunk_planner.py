@@ -0,0 +1,154 @@
+import math
+from statistics import median
+
+# run time per site per scene of a site export, in seconds, used until the task
+# ledger holds completed exports to calibrate against (roughly 3 hours for 5000
+# sites in a path-row with 700 scenes)
+DEFAULT_SECONDS_PER_SITE_SCENE = 0.003
+
+# minimum number of completed exports needed to calibrate the cost model
+MIN_CALIBRATION_TASKS = 5
+
+
+def calibrate_cost(ledger_rows, default=DEFAULT_SECONDS_PER_SITE_SCENE):
+  """ Estimate the run time and EECU usage per site per scene of a site export
+  from the completed exports recorded in the task ledger.
+
+  Args:
+      ledger_rows: list of task ledger rows (see TaskLedger.tasks())
+      default: run time per site per scene to use if there are fewer than
+      MIN_CALIBRATION_TASKS completed exports with a known run time
+
+  Returns:
+      tuple of the run time per site per scene in seconds and the EECU seconds
+      per site per scene (None if no EECU usage has been recorded)
+  """
+  seconds = []
+  eecu = []
+  for row in ledger_rows:
+    if (row["state"] != "COMPLETED" or row["site_start"] is None or
+        row["site_end"] is None or not row["n_scenes"]):
+      continue
+    site_scenes = (row["site_end"] - row["site_start"]) * row["n_scenes"]
+    if site_scenes <= 0:
+      continue
+    if row["runtime_s"] is not None:
+      seconds.append(row["runtime_s"] / site_scenes)
+    if row["eecu_s"] is not None:
+      eecu.append(row["eecu_s"] / site_scenes)
+  seconds_per_site_scene = median(seconds) if len(seconds) >= MIN_CALIBRATION_TASKS else default
+  eecu_per_site_scene = median(eecu) if len(eecu) >= MIN_CALIBRATION_TASKS else None
+  return seconds_per_site_scene, eecu_per_site_scene
+
+
+def plan_chunks(n_sites, n_scenes, seconds_per_site_scene, target_seconds=3600,
+                min_sites=100, max_sites=5000):
+  """ Split the sites of a path-row into chunks of roughly equal estimated cost.
+  The cost of an export is estimated as sites x scenes x the calibrated run
+  time per site per scene, the chunk size is chosen so that the most expensive
+  export of a chunk (i.e. the sensor group with the most scenes) takes about
+  `target_seconds`, and the sites are then spread evenly over the chunks.
+
+  Args:
+      n_sites: number of sites in the path-row
+      n_scenes: dictionary of the number of scenes per sensor group
+      seconds_per_site_scene: run time per site per scene, see calibrate_cost()
+      target_seconds: target run time per export task, in seconds
+      min_sites: minimum number of sites per chunk (unless the path-row has
+      fewer sites), so that path-rows with many scenes are not split into very
+      many tiny tasks
+      max_sites: maximum number of sites per chunk, which keeps the number of
+      features per export within the Earth Engine memory limits
+
+  Returns:
+      list of (start, end) row ranges of the locations, one per chunk
+  """
+  if n_sites == 0:
+    return []
+  max_scenes = max(list(n_scenes.values()) + [1])
+  chunk_size = int(target_seconds / (max_scenes * seconds_per_site_scene))
+  chunk_size = min(max(chunk_size, min_sites), max_sites)
+  # spread the sites evenly so that the last chunk is not much smaller, with
+  # few enough chunks that none has fewer than `min_sites` sites
+  n_chunks = min(math.ceil(n_sites / chunk_size), max(1, n_sites // min_sites))
+  chunk_size = math.ceil(n_sites / n_chunks)
+  return [(start, min(start + chunk_size, n_sites))
+          for start in range(0, n_sites, chunk_size)]
+
+
+def recorded_chunks(ledger_rows):
+  """ Get the chunk ranges recorded in the ledger for a path-row, so that a
+  resumed run keeps the chunks of the original run.
+
+  Args:
+      ledger_rows: task ledger rows of one run and path-row
+
+  Returns:
+      list of (start, end) row ranges ordered by chunk, or None if the chunks
+      were not recorded
+  """
+  ranges = {}
+  for row in ledger_rows:
+    if row["chunk"] is None or row["site_start"] is None or row["site_end"] is None:
+      continue
+    # parts of a split chunk record the sites of the part, keep the full chunk
+    start, end = ranges.get(row["chunk"], (row["site_start"], row["site_end"]))
+    ranges[row["chunk"]] = (min(start, row["site_start"]), max(end, row["site_end"]))
+  if len(ranges) == 0 or sorted(ranges) != list(range(len(ranges))):
+    return None
+  return [ranges[chunk] for chunk in sorted(ranges)]
+
+
+def hilbert_key(x, y, order=16):
+  """ Position of a grid cell along a Hilbert curve
+
+  Args:
+      x, y: integer cell coordinates, from 0 to 2 ** order - 1
+      order: order of the curve
+
+  Returns:
+      integer from 0 to 4 ** order - 1
+  """
+  n = 1 << order
+  key = 0
+  s = n >> 1
+  while s > 0:
+    rx = 1 if x & s else 0
+    ry = 1 if y & s else 0
+    key += s * s * ((3 * rx) ^ ry)
+    # rotate the quadrant so the curve stays continuous
+    if ry == 0:
+      if rx == 1:
+        x = n - 1 - x
+        y = n - 1 - y
+      x, y = y, x
+    s >>= 1
+  return key
+
+
+def hilbert_order(xs, ys, order=16):
+  """ Order points along a Hilbert curve over their bounding box, so that any
+  run of consecutive points (e.g. a site chunk) covers a compact area
+
+  Args:
+      xs, ys: sequences of point coordinates (e.g. longitude and latitude)
+      order: order of the curve; the bounding box is split in 2 ** order cells
+      per side
+
+  Returns:
+      list of the point positions in curve order (ties keep their input order)
+  """
+  if len(xs) == 0:
+    return []
+  valid = [(x, y) for x, y in zip(xs, ys) if not (math.isnan(x) or math.isnan(y))]
+  if len(valid) == 0:
+    return list(range(len(xs)))
+  x_min, y_min = min(x for x, _ in valid), min(y for _, y in valid)
+  # the same scale in both directions keeps cells square
+  extent = max(max(x for x, _ in valid) - x_min, max(y for _, y in valid) - y_min) or 1
+  cells = (1 << order) - 1
+  # points without coordinates go last
+  keys = [hilbert_key(int((x - x_min) / extent * cells), int((y - y_min) / extent * cells), order)
+          if not (math.isnan(x) or math.isnan(y)) else 4 ** order
+          for x, y in zip(xs, ys)]
+  return sorted(range(len(keys)), key = lambda i: keys[i])
@@ -0,0 +1,83 @@
+import numpy as np
+
+# DSWE classes of the five DSWE tests, packed as a decimal code
+# (t1 + 10 * t2 + 100 * t3 + 1000 * t4 + 10000 * t5), per the LS Collection 2
+# DSWE Data Format Control Book
+DECIMAL_CODE_CLASSES = {
+  0: [0, 1, 10, 100, 1000],  # not water
+  1: [1111, 10111, 11011, 11101, 11110, 11111],  # high confidence water
+  2: [111, 1011, 1101, 1110, 10011, 10101, 10110, 11001, 11010, 11100],  # moderate confidence water
+  3: [11000],  # potential wetland
+  4: [11, 101, 110, 1001, 1010, 1100, 10000, 10001, 10010, 10100]  # low confidence water
+}
+
+
+def decimal_code(bit_code):
+  """ Convert a bit-packed DSWE test code (t1 in bit 0 ... t5 in bit 4) to the
+  decimal code of the Data Format Control Book
+
+  Args:
+      bit_code: integer from 0 to 31
+
+  Returns:
+      integer
+  """
+  return sum(((bit_code >> test) & 1) * 10 ** test for test in range(5))
+
+
+def _class_table():
+  classes = {code: dswe_class for dswe_class, codes in DECIMAL_CODE_CLASSES.items()
+             for code in codes}
+  return [classes[decimal_code(bit_code)] for bit_code in range(32)]
+
+
+# DSWE class of each bit-packed test code, shared by DSWE() in
+# run_GEE_per_pathrow.py (as an ee.Image.remap) and the NumPy implementation
+# below (as an index into DSWE_CLASS_ARRAY)
+DSWE_CLASS_TABLE = _class_table()
+DSWE_CLASS_ARRAY = np.array(DSWE_CLASS_TABLE, dtype = np.uint8)
+
+
+def dswe_tests(blue, green, red, nir, swir1, swir2):
+  """ Compute the five DSWE tests of scaled surface reflectance arrays and pack
+  them into a bit code
+
+  Args:
+      blue, green, red, nir, swir1, swir2: NumPy arrays of scaled surface
+      reflectance (as after apply_scale_factors())
+
+  Returns:
+      uint8 array of bit-packed test codes (t1 in bit 0 ... t5 in bit 4)
+  """
+  with np.errstate(divide = "ignore", invalid = "ignore"):
+    mndwi = (green - swir1) / (green + swir1)
+    ndvi = (nir - red) / (nir + red)
+  mbsrv = green + red
+  mbsrn = nir + swir1
+  awesh = blue + 2.5 * green + (-1.5) * mbsrn + (-0.25) * swir2
+  # These thresholds are taken from the LS Collection 2 DSWE Data Format Control Book
+  t1 = mndwi > 0.124
+  t2 = mbsrv > mbsrn
+  t3 = awesh > 0
+  t4 = (mndwi > -0.44) & (swir1 < 0.09) & (nir < 0.15) & (ndvi < 0.7)
+  t5 = (mndwi > -0.5) & (blue < 0.1) & (swir1 < 0.3) & (swir2 < 0.1) & (nir < 0.25)
+  return (t1.astype(np.uint8)
+          | (t2.astype(np.uint8) << 1)
+          | (t3.astype(np.uint8) << 2)
+          | (t4.astype(np.uint8) << 3)
+          | (t5.astype(np.uint8) << 4))
+
+
+def dswe_numpy(blue, green, red, nir, swir1, swir2):
+  """ Calculate the dynamic surface water extent per pixel of scaled surface
+  reflectance arrays, the NumPy counterpart of DSWE() in run_GEE_per_pathrow.py
+
+  Args:
+      blue, green, red, nir, swir1, swir2: NumPy arrays of scaled surface
+      reflectance
+
+  Returns:
+      uint8 array of DSWE classes (0 not water, 1 high confidence water,
+      2 moderate confidence water, 3 potential wetland, 4 low confidence water)
+  """
+  return DSWE_CLASS_ARRAY[dswe_tests(blue, green, red, nir, swir1, swir2)]
@@ -0,0 +1,110 @@
+import json
+from collections import Counter
+
+import ee
+
+# Earth Engine rejects requests larger than this ("Request payload size exceeds
+# the limit")
+REQUEST_LIMIT_BYTES = 10 * 1024 * 1024
+
+
+def encode_expression(obj):
+  """ Serialize an Earth Engine object or export task locally, as it is sent to
+  Earth Engine (no network calls)
+
+  Args:
+      obj: ee.ComputedObject (e.g. an ee.FeatureCollection) or an unstarted
+      ee.batch.Task created by one of the ee.batch.Export functions
+
+  Returns:
+      dictionary of the serialized expression in the Cloud API format, with
+      the shared subexpressions in 'values' and the id of the result in 'result'
+  """
+  if isinstance(obj, ee.batch.Task):
+    obj = obj.config['expression']
+  if isinstance(obj, dict):
+    # already serialized
+    return obj
+  return ee.serializer.encode(obj, is_compound = True, for_cloud_api = True)
+
+
+def _walk(node, functions, counts):
+  """ Count the nodes of a serialized value and the functions it invokes """
+  counts['nodes'] += 1
+  if 'constantValue' in node:
+    counts['payload_bytes'] += len(json.dumps(node['constantValue'], separators = (',', ':')))
+  elif 'functionInvocationValue' in node:
+    invocation = node['functionInvocationValue']
+    functions[invocation.get('functionName', '<mapped function>')] += 1
+    for argument in invocation.get('arguments', {}).values():
+      _walk(argument, functions, counts)
+  elif 'arrayValue' in node:
+    for value in node['arrayValue'].get('values', []):
+      _walk(value, functions, counts)
+  elif 'dictionaryValue' in node:
+    for value in node['dictionaryValue'].get('values', {}).values():
+      _walk(value, functions, counts)
+
+
+def graph_stats(obj):
+  """ Measure the size and complexity of the expression graph of an Earth
+  Engine object or export task. Shared subexpressions are counted once, as
+  they are in the request.
+
+  Args:
+      obj: ee.ComputedObject or unstarted ee.batch.Task, see encode_expression()
+
+  Returns:
+      dictionary with 'graph_bytes' (size of the serialized expression),
+      'nodes' (number of value nodes), 'payload_bytes' (size of the constant
+      values, mostly the site ids and coordinates sent with the features) and
+      'functions' (collections.Counter of the number of invocations of each
+      Earth Engine function)
+  """
+  expression = encode_expression(obj)
+  functions = Counter()
+  counts = Counter()
+  for node in expression['values'].values():
+    _walk(node, functions, counts)
+  return {'graph_bytes': len(json.dumps(expression, separators = (',', ':')).encode('utf-8')),
+          'nodes': counts['nodes'],
+          'payload_bytes': counts['payload_bytes'],
+          'functions': functions}
+
+
+def format_graph_stats(stats, n_functions=5):
+  """ One line summary of graph_stats(), with the most invoked functions
+
+  Args:
+      stats: output of graph_stats()
+      n_functions: number of functions to list
+
+  Returns:
+      string
+  """
+  top = ', '.join(name + ' x' + str(n) for name, n in stats['functions'].most_common(n_functions))
+  return ('%.2f MB graph (%.2f MB payload), %d nodes, %d function calls [%s]' %
+          (stats['graph_bytes'] / 1e6, stats['payload_bytes'] / 1e6, stats['nodes'],
+           sum(stats['functions'].values()), top))
+
+
+def over_budget(stats, budget):
+  """ Compare graph_stats() to a budget
+
+  Args:
+      stats: output of graph_stats()
+      budget: dictionary with any of the keys 'graph_bytes', 'nodes' and
+      'payload_bytes' (maximum values), and 'functions' (dictionary of the
+      maximum number of invocations per function name)
+
+  Returns:
+      list of strings describing each exceeded limit, empty if within budget
+  """
+  exceeded = []
+  for key in ['graph_bytes', 'nodes', 'payload_bytes']:
+    if key in budget and stats[key] > budget[key]:
+      exceeded.append(key + ' ' + str(stats[key]) + ' > ' + str(budget[key]))
+  for name, limit in budget.get('functions', {}).items():
+    if stats['functions'][name] > limit:
+      exceeded.append(name + ' x' + str(stats['functions'][name]) + ' > ' + str(limit))
+  return exceeded
@@ -0,0 +1,77 @@
+import os
+from datetime import datetime, timedelta
+
+import ee
+from pandas import read_csv, concat
+
+# folder the metadata exports of each run are downloaded to by the -c- group,
+# relative to the repository root
+DOWNLOAD_FOLDER = "c_collate_Landsat_data/down/"
+
+# scenes acquired up to this many days before the last acquisition of the
+# previous runs are checked again, since scenes are added to the collections
+# (or moved to Tier 1) weeks after they were acquired. Scenes the previous runs
+# already acquired are skipped by product id.
+DEFAULT_LOOKBACK_DAYS = 90
+
+
+def previous_metadata_files(proj, previous_run_dates, sensor_group, pr,
+                            local_folder=DOWNLOAD_FOLDER):
+  """ File paths of the downloaded metadata exports of a path-row and sensor
+  group from earlier runs
+
+  Args:
+      proj: short project name used in the file names
+      previous_run_dates: list of the run dates of the earlier runs
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      local_folder: folder the Drive files were downloaded to
+
+  Returns:
+      list of file paths that exist
+  """
+  files = [os.path.join(local_folder, run_date, "metadata",
+                        proj + "_metadata_" + sensor_group + "_C2_" + pr + "_v" + run_date + ".csv")
+           for run_date in previous_run_dates]
+  return [fn for fn in files if os.path.exists(fn)]
+
+
+def previous_acquisitions(metadata_files, lookback_days=DEFAULT_LOOKBACK_DAYS):
+  """ Find the scenes acquired by earlier runs from their metadata exports
+
+  Args:
+      metadata_files: file paths of the metadata exports, see
+      previous_metadata_files()
+      lookback_days: number of days before the last acquisition to check again
+
+  Returns:
+      tuple of the date (YYYY-MM-DD) from which scenes should be pulled and the
+      list of LANDSAT_PRODUCT_IDs acquired on or after that date, or None if
+      the earlier runs did not acquire any scene
+  """
+  if len(metadata_files) == 0:
+    return None
+  meta = concat([read_csv(fn, usecols = ["DATE_ACQUIRED", "LANDSAT_PRODUCT_ID"])
+                 for fn in metadata_files])
+  if len(meta) == 0:
+    return None
+  last_acquired = datetime.strptime(str(meta["DATE_ACQUIRED"].max()), "%Y-%m-%d")
+  since = (last_acquired - timedelta(days = lookback_days)).strftime("%Y-%m-%d")
+  recent_ids = meta.loc[meta["DATE_ACQUIRED"] >= since, "LANDSAT_PRODUCT_ID"]
+  return since, sorted(set(recent_ids))
+
+
+def new_scenes(stack, since, acquired_ids):
+  """ Subset a Landsat stack to the scenes earlier runs did not acquire
+
+  Args:
+      stack: ee.ImageCollection
+      since: date (YYYY-MM-DD) of the earliest scene to keep
+      acquired_ids: LANDSAT_PRODUCT_IDs of the scenes acquired since `since`
+
+  Returns:
+      ee.ImageCollection
+  """
+  return (stack
+    .filter(ee.Filter.gte("system:time_start", ee.Date(since).millis()))
+    .filter(ee.Filter.inList("LANDSAT_PRODUCT_ID", acquired_ids).Not()))
@@ -0,0 +1,86 @@
+import os
+
+import ee
+from pandas import DataFrame
+
+# image properties written by lean metadata exports: the properties used by the
+# -c-, -d- and -e- groups (see prep_LS_metadata_for_export.R) and by
+# incremental runs (see incremental.py)
+METADATA_PROPERTIES = {
+  'LS457': ['system:index', 'LANDSAT_PRODUCT_ID', 'DATE_ACQUIRED', 'SCENE_CENTER_TIME',
+            'WRS_PATH', 'WRS_ROW', 'CLOUD_COVER', 'CLOUD_COVER_LAND', 'IMAGE_QUALITY',
+            'SUN_AZIMUTH', 'SUN_ELEVATION', 'EARTH_SUN_DISTANCE',
+            'ALGORITHM_SOURCE_SURFACE_REFLECTANCE', 'ALGORITHM_SOURCE_SURFACE_TEMPERATURE',
+            'DATA_SOURCE_REANALYSIS', 'PROCESSING_SOFTWARE_VERSION',
+            'GEOMETRIC_RMSE_MODEL', 'GEOMETRIC_RMSE_MODEL_X', 'GEOMETRIC_RMSE_MODEL_Y',
+            'GEOMETRIC_RMSE_VERIFY', 'GROUND_CONTROL_POINTS_MODEL',
+            'GROUND_CONTROL_POINTS_VERSION', 'GROUND_CONTROL_POINTS_VERIFY'],
+  'LS89': ['system:index', 'LANDSAT_PRODUCT_ID', 'DATE_ACQUIRED', 'SCENE_CENTER_TIME',
+           'WRS_PATH', 'WRS_ROW', 'CLOUD_COVER', 'CLOUD_COVER_LAND', 'IMAGE_QUALITY_OLI',
+           'IMAGE_QUALITY_TIRS', 'SUN_AZIMUTH', 'SUN_ELEVATION', 'EARTH_SUN_DISTANCE',
+           'ALGORITHM_SOURCE_SURFACE_REFLECTANCE', 'ALGORITHM_SOURCE_SURFACE_TEMPERATURE',
+           'DATA_SOURCE_REANALYSIS', 'PROCESSING_SOFTWARE_VERSION', 'NADIR_OFFNADIR',
+           'GEOMETRIC_RMSE_MODEL', 'GEOMETRIC_RMSE_MODEL_X', 'GEOMETRIC_RMSE_MODEL_Y',
+           'GEOMETRIC_RMSE_VERIFY', 'GROUND_CONTROL_POINTS_MODEL',
+           'GROUND_CONTROL_POINTS_VERSION', 'GROUND_CONTROL_POINTS_VERIFY']
+}
+
+# folder of the metadata sidecars, relative to the repository root
+SIDECAR_FOLDER = "b_pull_Landsat_SRST_poi/out/metadata/"
+
+
+def metadata_table(stack, properties):
+  """ Get the selected properties of every image of a stack as a table
+
+  Args:
+      stack: ee.ImageCollection
+      properties: list of image property names, see METADATA_PROPERTIES
+
+  Returns:
+      pandas.DataFrame with one row per image and one column per property
+      (missing properties are left empty)
+  """
+  # toDictionary() skips the properties an image does not have
+  table = ee.FeatureCollection(stack.map(
+    lambda image: ee.Feature(None, image.toDictionary(properties))
+      .set('system:index', image.get('system:index'))))
+  return DataFrame(feature_rows(table.getInfo()['features']), columns = properties)
+
+
+def feature_rows(features):
+  """ Get the rows of a table from the features of a FeatureCollection's
+  getInfo(). The system:index of a feature is its id, which getInfo() returns
+  next to the properties rather than among them.
+
+  Args:
+      features: list of feature dictionaries
+
+  Returns:
+      list of dictionaries of the properties, with the feature id as
+      'system:index'
+  """
+  return [dict(feature.get('properties') or {}, **{'system:index': feature.get('id')})
+          for feature in features]
+
+
+def write_metadata_sidecar(stack, properties, description, run_date,
+                           folder=SIDECAR_FOLDER):
+  """ Write the selected properties of every image of a stack to a local
+  feather file (lz4 compressed, as the collated files of the -c- group), next
+  to the metadata export on Drive. Requires pyarrow.
+
+  Args:
+      stack: ee.ImageCollection
+      properties: list of image property names, see METADATA_PROPERTIES
+      description: description of the matching metadata export, used as the
+      file name
+      run_date: run date of the pull, used for versioning
+      folder: folder of the sidecars
+
+  Returns:
+      file path of the sidecar
+  """
+  fn = os.path.join(folder, "v" + run_date, description + ".feather")
+  os.makedirs(os.path.dirname(fn), exist_ok = True)
+  metadata_table(stack, properties).to_feather(fn, compression = "lz4")
+  return fn
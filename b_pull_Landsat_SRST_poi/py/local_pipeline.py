@@ -0,0 +1,352 @@
+""" Local NumPy implementation of the per-pixel QA, DSWE and per-site summary
+pipeline of run_GEE_per_pathrow.py, for Landsat Collection 2 Level 2 band
+arrays (NumPy stacks or GeoTIFF chips). It produces the same columns as the
+site exports, so it can be used to benchmark and profile the pipeline, to
+check changes against known outputs and to re-process cached chips without
+Earth Engine.
+
+Masked pixels are NaN, and every function follows the Earth Engine masking
+rules of its counterpart: comparisons and logical operations are masked where
+any input is masked, `self_mask()` masks zeros and `update_mask()` masks
+pixels where the mask is zero or masked.
+"""
+import math
+
+import numpy as np
+from pandas import DataFrame
+
+from dswe import dswe_numpy
+from summary_bands import (c2_bands, pull_bands, sr_bands, atmos_flag, flag_prefix,
+                           flag_band_names, dswe_prefix, band_groups, export_columns)
+
+
+def _binary(condition, *inputs):
+  """ 1/0 array of a condition, masked where any of the inputs is masked """
+  out = condition.astype(float)
+  for x in inputs:
+    out[np.isnan(x)] = np.nan
+  return out
+
+
+def eq(x, value):
+  """ ee.Image.eq() """
+  return _binary(x == value, x)
+
+
+def And(a, b):
+  """ ee.Image.And() """
+  return _binary((a != 0) & (b != 0), a, b)
+
+
+def Or(a, b):
+  """ ee.Image.Or() """
+  return _binary((a != 0) | (b != 0), a, b)
+
+
+def self_mask(x):
+  """ ee.Image.selfMask() """
+  return np.where(x == 0, np.nan, x)
+
+
+def update_mask(x, mask):
+  """ ee.Image.updateMask() """
+  return np.where(np.isnan(mask) | (mask == 0), np.nan, x)
+
+
+def scale_bands(raw, sensor_group):
+  """ Rename, fill mask, scale and radsat mask the Collection 2 bands of an
+  image, as the pre-processing of the stacks in process_subset()
+
+  Args:
+      raw: dictionary of the Collection 2 band arrays (see c2_bands in
+      summary_bands.py) in digital numbers
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+
+  Returns:
+      dictionary of float arrays named as pull_bands, NaN where masked
+  """
+  names = dict(zip(c2_bands[sensor_group], pull_bands[sensor_group]))
+  bands = {name: np.array(raw[c2], dtype = float) for c2, name in names.items()}
+  # apply_fill_mask_*: fill values (0) of any SR band mask the pixel
+  mask = np.all([bands[name] > 0 for c2, name in names.items() if c2.startswith('SR_B')],
+                axis = 0)
+  # apply_scale_factors
+  for c2, name in names.items():
+    if c2.startswith('SR_B'):
+      bands[name] = bands[name] * 0.0000275 + (-0.2)
+    elif c2.startswith('ST_B'):
+      bands[name] = bands[name] * 0.00341802 + 149.0
+  # apply_rad_mask
+  mask &= bands['radsat_qa'] == 0
+  for name in bands:
+    bands[name][~mask] = np.nan
+  return bands
+
+
+def _bits(qa):
+  """ Integer values of a QA band, 0 where masked """
+  return np.nan_to_num(qa).astype(np.int64)
+
+
+def qa_layers(bands, sensor_group, hill_shade=None, hill_shadow=None):
+  """ Compute the QA and mask layers of an image, as qa_stack()
+
+  Args:
+      bands: output of scale_bands()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      hill_shade: optional array of the hill shade of the image (0-255), NaN
+      if not given
+      hill_shadow: optional array of the hill shadow of the image (1 where
+      illuminated), all illuminated if not given
+
+  Returns:
+      dictionary of arrays with the keys of qa_stack()
+  """
+  shape = bands['Blue'].shape
+  qa = _bits(bands['pixel_qa'])
+  # where the f mask is > 1 (clouds and cloud shadow), call that 1 (otherwise 0)
+  cf = (qa & ((1 << 1) | (1 << 3) | (1 << 4) | (1 << 5))) != 0
+  clouds = _binary(cf, bands['pixel_qa'])
+  if sensor_group == 'LS457':
+    atmos = _binary(bands['opacity_qa'] * 0.001 < 0.3, bands['opacity_qa'])
+  else:
+    # as add_sr_aero_mask(image).select('aero').eq(0) in qa_stack()
+    atmos = _binary((_bits(bands['aerosol_qa']) & (1 << 7)) != 0, bands['aerosol_qa'])
+  six = [bands[band] for band in ['Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2']]
+  real = self_mask(_binary(np.all([b > -0.01 for b in six], axis = 0), *six))
+  no_glint = self_mask(_binary(np.all([b < 0.2 for b in six], axis = 0), *six))
+  ir = [bands[band] for band in ['Nir', 'Swir1', 'Swir2']]
+  ir_glint = self_mask(_binary(np.all([b >= 0.1 for b in ir], axis = 0), *ir))
+  h = np.full(shape, np.nan) if hill_shade is None else np.array(hill_shade, dtype = float)
+  hs = np.ones(shape) if hill_shadow is None else np.array(hill_shadow, dtype = float)
+  # masked where any of the input bands is masked
+  d = _binary(np.ones(shape, dtype = bool), *six) * dswe_numpy(*six)
+
+  clear_qa = And(And(And(eq(clouds, 0), eq(atmos, 1)), eq(real, 1)), eq(no_glint, 1))
+  valid = And(And(eq(hs, 1), eq(clouds, 0)), eq(atmos, 1))
+  valid_qa = And(eq(hs, 1), clear_qa)
+  alg = update_mask(And(And(_binary(d > 1, d),
+                            _binary(bands['Green'] > 0.05, bands['Green'])),
+                        _binary(bands['Red'] < 0.04, bands['Red'])),
+                    clear_qa)
+  return {'clouds': clouds, 'atmos': atmos, 'real': real, 'no_glint': no_glint,
+          'ir_glint': ir_glint, 'hillShade': h, 'hillShadow': hs, 'dswe': d,
+          'algae': alg, 'valid': valid, 'valid_qa': valid_qa}
+
+
+def dswe_water(qa, dswe_variant):
+  """ Water definition of a DSWE variant, as dswe_water() in
+  run_GEE_per_pathrow.py """
+  d = qa['dswe']
+  if dswe_variant == 'DSWE1':
+    return eq(d, 1)
+  if dswe_variant == 'DSWE1a':
+    return Or(eq(d, 1), eq(qa['algae'], 1))
+  if dswe_variant == 'DSWE3':
+    return eq(d, 3)
+  raise ValueError('Unknown DSWE variant: ' + str(dswe_variant))
+
+
+def summary_arrays(bands, qa, sensor_group, variants):
+  """ Build the arrays summarized per site, as summary_image()
+
+  Args:
+      bands: output of scale_bands()
+      qa: output of qa_layers()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      variants: list of (DSWE variant, column prefix) tuples
+
+  Returns:
+      dictionary of arrays named as the bands of band_groups()
+  """
+  valid_qa = qa['valid_qa']
+  dswe_counts = {variant: self_mask(update_mask(dswe_water(qa, variant), valid_qa))
+                 for variant in ['DSWE1', 'DSWE1a', 'DSWE3']}
+  d = qa['dswe']
+  out = {'dswe_gt0': self_mask(update_mask(_binary(d > 0, d), valid_qa)),
+         'dswe1': dswe_counts['DSWE1'],
+         'dswe3': dswe_counts['DSWE3'],
+         'dswe1a': dswe_counts['DSWE1a'],
+         atmos_flag[sensor_group]: self_mask(eq(qa['atmos'], 0)),
+         'unreal_val': self_mask(eq(qa['real'], 0)),
+         'sun_glint': self_mask(eq(qa['no_glint'], 0)),
+         'ir_glint': self_mask(eq(qa['ir_glint'], 1)),
+         'clouds': qa['clouds'],
+         'hillShadow': qa['hillShadow'],
+         'hillShade': qa['hillShade']}
+
+  sum_bands = sr_bands[sensor_group] + ['SurfaceTemp']
+  for variant, prefix in variants:
+    # mask the image for the variant's water pixels
+    for band in sum_bands:
+      masked = update_mask(bands[band], dswe_counts[variant])
+      for stat in ['med_', 'sd_', 'mean_']:
+        out[prefix + stat + band] = masked
+    out[prefix + 'min_SurfaceTemp'] = out[prefix + 'med_SurfaceTemp']
+    # per-band flags, masked by the shared valid-pixel band and the water definition
+    flag_mask = And(qa['valid'], dswe_water(qa, variant))
+    flags = {}
+    for band in sr_bands[sensor_group]:
+      flags[flag_prefix[band] + '_zero'] = _binary(bands[band] < 0, bands[band])
+      flags[flag_prefix[band] + '_thresh'] = _binary(bands[band] < -0.01, bands[band])
+      if band != 'Aerosol':
+        flags[flag_prefix[band] + '_glint'] = _binary(bands[band] >= 0.2, bands[band])
+    for band in ['Nir', 'Swir1', 'Swir2']:
+      flags[flag_prefix[band] + '_ir_glint'] = _binary(bands[band] >= 0.1, bands[band])
+    for flag in flag_band_names(sensor_group):
+      out[prefix + 'pCount_' + flag] = self_mask(update_mask(flags[flag], flag_mask))
+  return out
+
+
+def buffer_pixels(x, y, geotransform, shape, radius):
+  """ Get the pixels of each site buffer: the pixels whose centers are within
+  `radius` of the site, as the pixels reduced by reduceRegions()
+
+  Args:
+      x, y: site coordinates in the CRS of the image (in meters)
+      geotransform: GDAL geotransform of the image (x origin, pixel width, 0,
+      y origin, 0, pixel height), north up
+      shape: (rows, columns) of the image
+      radius: buffer radius in meters
+
+  Returns:
+      list of arrays of the flat pixel indices of each site
+  """
+  x0, dx, _, y0, _, dy = geotransform
+  rows, cols = shape
+  pixels = []
+  for site_x, site_y in zip(x, y):
+    # only look at the window around the site
+    c_lo, c_hi = sorted([(site_x - radius - x0) / dx, (site_x + radius - x0) / dx])
+    r_lo, r_hi = sorted([(site_y - radius - y0) / dy, (site_y + radius - y0) / dy])
+    c = np.arange(max(int(math.floor(c_lo)), 0), min(int(math.ceil(c_hi)) + 1, cols))
+    r = np.arange(max(int(math.floor(r_lo)), 0), min(int(math.ceil(r_hi)) + 1, rows))
+    cc, rr = np.meshgrid(c, r)
+    inside = ((x0 + (cc + 0.5) * dx - site_x) ** 2 +
+              (y0 + (rr + 0.5) * dy - site_y) ** 2) <= radius ** 2
+    pixels.append((rr[inside] * cols + cc[inside]).astype(np.int64))
+  return pixels
+
+
+def _reduce(reducer, values, site, n_sites):
+  """ Apply an (unweighted) reducer to the values of all sites at once
+
+  Args:
+      reducer: 'median', 'min', 'stdDev', 'mean' or 'count'
+      values: values of the pixels of all sites, NaN where masked
+      site: site of each value
+      n_sites: number of sites
+
+  Returns:
+      array with the reduced value per site, NaN where a site has no unmasked
+      pixels (0 for counts)
+  """
+  keep = ~np.isnan(values)
+  values = values[keep]
+  site = site[keep]
+  counts = np.bincount(site, minlength = n_sites)
+  if reducer == 'count':
+    return counts
+  out = np.full(n_sites, np.nan)
+  has = counts > 0
+  if reducer == 'min':
+    mins = np.full(n_sites, np.inf)
+    np.minimum.at(mins, site, values)
+    out[has] = mins[has]
+    return out
+  if reducer == 'median':
+    order = np.lexsort((values, site))
+    ordered = values[order]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    low = starts + (counts - 1) // 2
+    high = starts + counts // 2
+    out[has] = (ordered[low[has]] + ordered[high[has]]) / 2
+    return out
+  means = np.bincount(site, weights = values, minlength = n_sites)[has] / counts[has]
+  if reducer == 'mean':
+    out[has] = means
+    return out
+  if reducer == 'stdDev':
+    mean_of_site = np.zeros(n_sites)
+    mean_of_site[has] = means
+    sq = np.bincount(site, weights = (values - mean_of_site[site]) ** 2, minlength = n_sites)
+    out[has] = np.sqrt(sq[has] / counts[has])
+    return out
+  raise ValueError('Unknown reducer: ' + str(reducer))
+
+
+def zonal_stats(arrays, groups, site_pixels):
+  """ Summarize the arrays per site, all sites of a band at once
+
+  Args:
+      arrays: output of summary_arrays()
+      groups: band groups and reducers, see band_groups() in summary_bands.py
+      site_pixels: output of buffer_pixels()
+
+  Returns:
+      dictionary of per-site arrays named as the export columns
+  """
+  n_sites = len(site_pixels)
+  index = np.concatenate(site_pixels) if n_sites > 0 else np.zeros(0, dtype = np.int64)
+  site = np.repeat(np.arange(n_sites), [len(p) for p in site_pixels])
+  stats = {}
+  for reducer, names, output_prefix in groups:
+    for name in names:
+      stats[output_prefix + name] = _reduce(reducer, arrays[name].ravel()[index], site, n_sites)
+  return stats
+
+
+def ref_pull_local(raw, sensor_group, site_ids, site_pixels, image_id,
+                   dswe_variants=('DSWE1',), hill_shade=None, hill_shadow=None):
+  """ Summarize one image for a set of sites, as the site exports of
+  process_subset(). A single DSWE variant gives the columns of its separate
+  export, several variants the prefixed columns of the combined export.
+
+  Args:
+      raw: dictionary of the Collection 2 band arrays, see scale_bands()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      site_ids: ids of the sites
+      site_pixels: pixels of each site, see buffer_pixels()
+      image_id: system:index of the image (e.g. 'LC08_027033_20200715')
+      dswe_variants: DSWE variants to summarize
+      hill_shade, hill_shadow: optional terrain arrays, see qa_layers()
+
+  Returns:
+      pandas DataFrame with the columns of the export, one row per site with
+      water pixels in any of the variants
+  """
+  if len(dswe_variants) == 1:
+    variants = [(dswe_variants[0], '')]
+  else:
+    variants = [(variant, dswe_prefix[variant]) for variant in dswe_variants]
+  prefixes = [prefix for _, prefix in variants]
+  bands = scale_bands(raw, sensor_group)
+  qa = qa_layers(bands, sensor_group, hill_shade, hill_shadow)
+  arrays = summary_arrays(bands, qa, sensor_group, variants)
+  stats = zonal_stats(arrays, band_groups(sensor_group, prefixes), site_pixels)
+  stats['system:index'] = [image_id + '_' + str(site_id) for site_id in site_ids]
+  df = DataFrame(stats, columns = export_columns(sensor_group, prefixes))
+  has_water = np.any([df[prefix + 'med_Blue'].notna() for prefix in prefixes], axis = 0)
+  return df[has_water].reset_index(drop = True)
+
+
+def read_chip(path):
+  """ Read a GeoTIFF chip of a Landsat Collection 2 Level 2 image, with the
+  Collection 2 band names as band descriptions (as exported from Earth Engine).
+  Needs rasterio.
+
+  Args:
+      path: path of the GeoTIFF
+
+  Returns:
+      tuple of the dictionary of band arrays (see scale_bands()) and the GDAL
+      geotransform of the chip (see buffer_pixels())
+  """
+  try:
+    import rasterio
+  except ImportError:
+    raise ImportError("Reading GeoTIFF chips requires rasterio (pip install rasterio)")
+  with rasterio.open(path) as src:
+    raw = {name: src.read(i + 1) for i, name in enumerate(src.descriptions)}
+    geotransform = src.transform.to_gdal()
+  return raw, geotransform
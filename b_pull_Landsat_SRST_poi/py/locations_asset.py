@@ -0,0 +1,129 @@
+import ee
+import threading
+
+from buffers import buffer_sites
+
+# guards the creation of the run's asset folder when several path-rows are
+# sent concurrently
+_folder_lock = threading.Lock()
+
+
+def locations_folder(ee_proj, proj, run_date):
+  """ Earth Engine asset folder holding the location tables of a run
+
+  Args:
+      ee_proj: Earth Engine project of the pull
+      proj: project name from the yml
+      run_date: run date of the pull, used for versioning
+
+  Returns:
+      asset id of the folder
+  """
+  return "projects/" + ee_proj + "/assets/" + proj + "_locations_v" + run_date
+
+
+def locations_asset_id(folder, pr):
+  """ Asset id of the location table of a path-row
+
+  Args:
+      folder: asset folder of the run, see locations_folder()
+      pr: WRS2 path-row
+
+  Returns:
+      asset id of the table
+  """
+  return folder + "/locations_" + str(pr)
+
+
+def asset_exists(asset_id, api=ee.data):
+  """ Check whether an Earth Engine asset exists
+
+  Args:
+      asset_id: asset id to check
+      api: module or object with a `getAsset()` function, defaults to ee.data
+
+  Returns:
+      boolean
+  """
+  try:
+    api.getAsset(asset_id)
+    return True
+  except ee.EEException:
+    return False
+
+
+def ensure_folder(folder, api=ee.data):
+  """ Create the asset folder of the run if it does not exist yet
+
+  Args:
+      folder: asset id of the folder
+      api: module or object with `getAsset()` and `createAsset()` functions,
+      defaults to ee.data
+
+  Returns:
+      None.
+  """
+  with _folder_lock:
+    if not asset_exists(folder, api):
+      api.createAsset({"type": "FOLDER"}, folder)
+
+
+def locations_table(df, pr, chunks, crs, buffer_distance=None, max_error=None,
+                    buffer_proj=None):
+  """ Build the location table of a path-row. Like csv_to_eeFeat(), the
+  coordinates and attributes are sent as flat lists and the features are built
+  server side. If `buffer_distance` is given, the sites are stored already
+  buffered, so the exports reading the table do not buffer them again.
+
+  Args:
+      df: locations of the path-row, in the order of the locations file
+      pr: WRS2 path-row
+      chunks: (start, end) row ranges of the site chunks of the path-row
+      crs: CRS of the coordinates
+      buffer_distance: optional buffer distance of the sites in meters
+      max_error, buffer_proj: maximum error and projection of the buffers, see
+      buffer_sites() in buffers.py
+
+  Returns:
+      ee.FeatureCollection of points (or buffered sites) with the properties
+      'id', 'WRS2_PR', 'chunk' and 'row' (the row in the locations file)
+  """
+  chunk_of_row = [0] * len(df)
+  for chunk, (start, end) in enumerate(chunks):
+    chunk_of_row[start:end] = [chunk] * (end - start)
+  coords = df[["Longitude", "Latitude"]].to_numpy(dtype = float).tolist()
+  rows = ee.List([list(row) for row in zip(coords, df["id"].astype(str).tolist(),
+                                            chunk_of_row, range(len(df)))])
+
+  def to_feature(row):
+    row = ee.List(row)
+    return (ee.Feature(ee.Geometry.Point(row.get(0), crs),
+                       {"id": row.get(1), "WRS2_PR": str(pr),
+                        "chunk": row.get(2), "row": row.get(3)})
+      .set("system:index", row.get(1)))
+
+  table = ee.FeatureCollection(rows.map(to_feature))
+  if buffer_distance is not None:
+    table = buffer_sites(table, buffer_distance, max_error, buffer_proj)
+  return table
+
+
+def locations_export(df, pr, chunks, crs, folder, description, buffer_distance=None,
+                     max_error=None, buffer_proj=None):
+  """ Create (but do not start) the export of a path-row's location table to
+  the run's asset folder
+
+  Args:
+      df, pr, chunks, crs: see locations_table()
+      folder: asset folder of the run, see locations_folder()
+      description: description of the export task
+      buffer_distance, max_error, buffer_proj: optional buffering of the
+      sites, see locations_table()
+
+  Returns:
+      ee.batch.Task
+  """
+  table = locations_table(df, pr, chunks, crs, buffer_distance, max_error, buffer_proj)
+  return ee.batch.Export.table.toAsset(collection = table,
+                                       description = description,
+                                       assetId = locations_asset_id(folder, pr))
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+
+from pandas import DataFrame, to_numeric
+
+# single file holding the locations of all path-rows, used instead of the
+# per-path-row locations_<PR>.csv files when `locations_store` is set in the yml
+STORE_FILE = "b_pull_Landsat_SRST_poi/out/locations/locations.feather"
+
+# columns read by the pull, and their types. The ids are stored as strings and
+# read back with the type read_csv() infers for the locations_<PR>.csv files,
+# see csv_ids()
+LOCATION_DTYPES = {"id": str, "Latitude": float, "Longitude": float}
+
+# key of the schema metadata holding the row range of each path-row
+OFFSETS_KEY = b"pathrow_offsets"
+
+# the memory-mapped store, shared by all path-rows of a Python session
+_store = {}
+_store_lock = threading.Lock()
+
+
+def _pyarrow():
+  try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+  except ImportError:
+    raise ImportError("The locations store requires pyarrow (pip install pyarrow)")
+  return pyarrow
+
+
+def write_locations_store(locations, fn=STORE_FILE):
+  """ Write the locations of all path-rows to the store, sorted by path-row.
+  The file is an uncompressed feather file so that it can be memory mapped,
+  and records the row range of each path-row in its schema metadata.
+
+  Args:
+      locations: pandas.DataFrame of the locations with 'WRS2_PR', one row per
+      location and path-row (see assign_pathrows.py)
+      fn: file path of the store
+
+  Returns:
+      file path of the store
+  """
+  pyarrow = _pyarrow()
+  locations = locations.astype(dict(LOCATION_DTYPES, WRS2_PR = str))
+  locations = locations.sort_values("WRS2_PR", kind = "stable").reset_index(drop = True)
+  offsets = pathrow_offsets(locations["WRS2_PR"])
+  table = pyarrow.Table.from_pandas(locations, preserve_index = False)
+  metadata = dict(table.schema.metadata or {})
+  metadata[OFFSETS_KEY] = json.dumps(offsets)
+  os.makedirs(os.path.dirname(fn), exist_ok = True)
+  pyarrow.feather.write_feather(table.replace_schema_metadata(metadata), fn,
+                                compression = "uncompressed")
+  return fn
+
+
+def pathrow_offsets(pathrows):
+  """ Row range of each path-row in a column sorted by path-row
+
+  Args:
+      pathrows: sequence of the WRS2 path-rows of the rows
+
+  Returns:
+      dictionary of the [start, end) row range of each path-row
+
+  Raises:
+      ValueError: if the rows of a path-row are not contiguous
+  """
+  offsets = {}
+  previous = None
+  for row, pr in enumerate(pathrows):
+    if pr != previous:
+      if pr in offsets:
+        raise ValueError("The locations store is not sorted by WRS2_PR (" + str(pr) + ")")
+      offsets[pr] = [row, row]
+      previous = pr
+    offsets[pr][1] = row + 1
+  return offsets
+
+
+def open_locations_store(fn=STORE_FILE):
+  """ Memory map the store. The mapped table is kept for the Python session
+  and only mapped again if the file changed. Stores written without the row
+  ranges of the path-rows (by write_locations_store.R) get them from one scan
+  of the sorted WRS2_PR column.
+
+  Args:
+      fn: file path of the store
+
+  Returns:
+      tuple of the pyarrow.Table and a dictionary of the (start, end) row
+      range of each path-row
+  """
+  pyarrow = _pyarrow()
+  key = (fn, os.path.getmtime(fn))
+  with _store_lock:
+    if key not in _store:
+      _store.clear()
+      source = pyarrow.memory_map(fn, "r")
+      table = pyarrow.ipc.open_file(source).read_all()
+      metadata = table.schema.metadata or {}
+      if OFFSETS_KEY in metadata:
+        offsets = json.loads(metadata[OFFSETS_KEY])
+      else:
+        offsets = pathrow_offsets(table["WRS2_PR"].to_pylist())
+      _store[key] = (table, {pr: tuple(rows) for pr, rows in offsets.items()})
+    return _store[key]
+
+
+def store_pathrows(fn=STORE_FILE):
+  """ List the path-rows with locations in the store
+
+  Args:
+      fn: file path of the store
+
+  Returns:
+      set of WRS2 path-rows
+  """
+  _, offsets = open_locations_store(fn)
+  return set(offsets)
+
+
+def csv_ids(ids):
+  """ Convert the ids read from the store to the type read_csv() infers for the
+  same ids in a locations_<PR>.csv file: integers or floats if every id is
+  numeric, strings otherwise
+
+  Args:
+      ids: pandas.Series of ids as strings
+
+  Returns:
+      pandas.Series
+  """
+  try:
+    return to_numeric(ids)
+  except (ValueError, TypeError):
+    return ids
+
+
+def read_pathrow_locations(pr, fn=STORE_FILE):
+  """ Read the locations of a path-row from the store. Only the columns in
+  LOCATION_DTYPES of the path-row's row range are copied out of the mapped
+  file.
+
+  Args:
+      pr: WRS2 path-row
+      fn: file path of the store
+
+  Returns:
+      pandas.DataFrame with the columns of LOCATION_DTYPES, in store order
+      (empty if the path-row has no locations), with the ids typed as in the
+      locations_<PR>.csv files (see csv_ids())
+  """
+  table, offsets = open_locations_store(fn)
+  if str(pr) not in offsets:
+    return DataFrame({column: [] for column in LOCATION_DTYPES}).astype(LOCATION_DTYPES)
+  start, end = offsets[str(pr)]
+  # both writers cast the id to strings and store the coordinates as doubles
+  locations = table.slice(start, end - start).select(list(LOCATION_DTYPES)).to_pandas()
+  locations["id"] = csv_ids(locations["id"])
+  return locations
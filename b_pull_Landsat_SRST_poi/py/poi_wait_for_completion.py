@@ -1,6 +1,12 @@
 import ee
 from pandas import read_csv
-import time
+import sys
+
+# make the helper modules in this folder importable when sourced from R
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from task_ledger import get_task_ledger
+from task_monitor import wait_for_run
 
 # get configs from yml file
 yml = read_csv("b_pull_Landsat_SRST_poi/mid/yml.csv")
@@ -8,25 +14,19 @@ yml = read_csv("b_pull_Landsat_SRST_poi/mid/yml.csv")
 eeproj = yml["ee_proj"][0]
 #initialize GEE with proj
 ee.Initialize(project = eeproj)
+# grab run date
+run_date = yml["run_date"][0]
+
+# wait for this run's tasks only, identified by the run date in the task 
+# description or by the task ids recorded in the task ledger
+ledger = get_task_ledger()
+ledger_ids = [task["task_id"] for task in ledger.tasks(run_date = run_date, states = ["READY", "RUNNING"])]
+final_states = wait_for_run(run_date, ledger_ids)
 
-# get a list of the 20 most recently submitted tasks
-ts = list(ee.batch.Task.list())[0:20]
-# set the counter to zero
-n_active = 0
-# for each of the tasks, see if any read running or ready, if so, add one 
-# to the counter
-for task in ts:
-   if ("RUNNING" in str(task) or "READY" in str(task)):
-       n_active += 1
-# loop to track if n_active is greater than zero
-while (n_active > 0):
-  # if it is, wait 2 minutes
-  time.sleep(120)
-  # and then repoeat!
-  ts = list(ee.batch.Task.list())
-  n_active = 0
-  for task in ts:
-    if ("RUNNING" in str(task) or "READY" in str(task)):
-      n_active += 1
+# record the final state of this run's tasks in the task ledger, with their run
+# time and EECU usage (used to size the site chunks of later runs)
+ledger.update_states([
+  dict(task, run_date = run_date) for task in ee.data.getTaskList()
+  if task["id"] in final_states])
 
 print('All tasks completed')
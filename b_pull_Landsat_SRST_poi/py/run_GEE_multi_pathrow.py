@@ -0,0 +1,97 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pandas import read_csv
+
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+
+# importing the per-pathrow script reads the yml and initializes Earth Engine
+# once for all path-rows
+import run_GEE_per_pathrow as per_pr
+from locations_store import store_pathrows
+
+
+def get_pathrow_list():
+  """ Get the list of path-rows to run. Uses the list written by the
+  `b_eeRun_all_poi` target if present, otherwise all path-rows in the
+  WRS_subset_list.csv written by `get_WRS_pathrow_poi()`.
+
+  Returns:
+      list of WRS2 path-rows as 6-character strings (PPPRRR)
+  """
+  pr_list_fn = "b_pull_Landsat_SRST_poi/out/pathrow_list.txt"
+  if os.path.exists(pr_list_fn):
+    with open(pr_list_fn, "r") as file:
+      prs = [line.strip() for line in file if line.strip() != ""]
+  else:
+    wrs_subset = read_csv("b_pull_Landsat_SRST_poi/out/WRS_subset_list.csv",
+                          dtype = {"PR": str})
+    prs = wrs_subset["PR"].tolist()
+  # pad to the 6 characters used in the location file names, dropping duplicates
+  return list(dict.fromkeys(pr.zfill(6) for pr in prs))
+
+
+def run_pathrow_safe(pr):
+  """ Run a single path-row, skipping path-rows without a location file or
+  without rows in the locations store (all locations were outside of the
+  path-row, see `check_if_fully_within_pr()`).
+
+  Args:
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+
+  Returns:
+      the path-row if exports were sent, None otherwise
+  """
+  if per_pr.locations_store:
+    if pr not in store_pathrows():
+      print("No locations for tile " + pr + " in the locations store, skipping")
+      return None
+  else:
+    locs_fn = os.path.join("b_pull_Landsat_SRST_poi/out/locations/", ("locations_" + pr + ".csv"))
+    if not os.path.exists(locs_fn):
+      print("No locations file for tile " + pr + ", skipping")
+      return None
+  per_pr.main(pr)
+  return pr
+
+
+def run_all_pathrows(prs, n_workers=4):
+  """ Build and send the exports of many path-rows in this Python session. The
+  image collections, feature collections and export tasks of up to `n_workers`
+  path-rows are constructed concurrently; all workers share one task monitor,
+  so the number of active tasks across all path-rows stays at or below
+  `max_active_tasks`.
+
+  Args:
+      prs: list of WRS2 path-rows
+      n_workers: number of path-rows to process concurrently
+
+  Returns:
+      list of path-rows that failed to submit, with the error
+  """
+  failed = []
+  with ThreadPoolExecutor(max_workers = n_workers) as pool:
+    futures = {pool.submit(run_pathrow_safe, pr): pr for pr in prs}
+    for n_done, future in enumerate(as_completed(futures), start = 1):
+      pr = futures[future]
+      try:
+        future.result()
+      except Exception as e:
+        print("Failed to send exports for tile " + pr + ": " + str(e))
+        failed.append((pr, str(e)))
+      print(f"Finished tile {pr} ({n_done}/{len(prs)})")
+  return failed
+
+
+# number of concurrent path-row workers (not present in yml files of older runs)
+if "n_workers" in per_pr.yml:
+  n_workers = int(per_pr.yml["n_workers"][0])
+else:
+  n_workers = 4
+
+failed_pathrows = run_all_pathrows(get_pathrow_list(), n_workers)
+
+if len(failed_pathrows) > 0:
+  raise RuntimeError("Exports could not be sent for tiles: " +
+                     ", ".join(pr for pr, _ in failed_pathrows))
@@ -3,15 +3,41 @@ import ee
 import time
 from datetime import date, datetime
 import os 
+import re
+import sys
 from pandas import read_csv
 import math
 
+# make the helper modules in this folder importable when sourced from R
+if "b_pull_Landsat_SRST_poi/py" not in sys.path:
+  sys.path.append("b_pull_Landsat_SRST_poi/py")
+from task_monitor import get_task_monitor, ACTIVE_STATES
+from task_ledger import get_task_ledger
+from chunk_planner import calibrate_cost, plan_chunks, recorded_chunks, hilbert_order
+from locations_asset import (locations_folder, locations_asset_id, asset_exists,
+                             ensure_folder, locations_export)
+from terrain import TerrainCache
+from incremental import (previous_metadata_files, previous_acquisitions, new_scenes, 
+                         DEFAULT_LOOKBACK_DAYS)
+from site_diff import read_site_history, site_history, write_site_history
+from lean_metadata import METADATA_PROPERTIES, write_metadata_sidecar
+from locations_store import read_pathrow_locations
+from buffers import max_error_for_vertices, utm_projection
+from graph_stats import graph_stats, format_graph_stats, REQUEST_LIMIT_BYTES
+from dswe import DSWE_CLASS_TABLE
+from summary_bands import (sr_bands, atmos_flag, flag_prefix, combined_dswe, 
+                           dswe_prefix, flag_band_names, band_groups, 
+                           export_columns, c2_bands, pull_bands)
+
 # LOAD ALL THE CUSTOM FUNCTIONS -----------------------------------------------
-# DSWE code begins ~ line 530
-# GEE pull code begins ~ line 1720
+# DSWE code begins ~ line 480
+# GEE pull code begins ~ line 1045
 
 def csv_to_eeFeat(df, proj, chunk, chunk_size):
-  """Function to create an eeFeature from the location data
+  """Function to create an eeFeature from the location data. The coordinates 
+  and ids of the chunk are sent as two flat lists and the point features are 
+  built server side, which keeps the request much smaller (and faster to 
+  build) than one client-side ee.Feature per site.
 
   Args:
       df: point locations .csv file with Latitude and Longitude
@@ -22,23 +48,19 @@ def csv_to_eeFeat(df, proj, chunk, chunk_size):
   Returns:
       ee.FeatureCollection of the points 
   """
-  features=[]
-  # Calculate start and end indices for the current chunk
-  range_min = chunk_size * chunk
-  range_max = min(chunk_size * (chunk + 1), len(df)) + range_min
-  for i in range(range_min, range_max):
-    try:
-      row = df.iloc[i]
-      x, y = row['Longitude'], row['Latitude']
-      latlong = [x, y]
-      loc_properties = {'system:index': str(row['id']), 'id': str(row['id'])}
-      g = ee.Geometry.Point(latlong, proj)
-      feature = ee.Feature(g, loc_properties)
-      features.append(feature)
-    except KeyError as e:
-      print(f"KeyError at index {i}, skipping to next iteration")
-      continue  # skip to the next iteration
-  return ee.FeatureCollection(features)
+  # rows of the current chunk
+  df = df.iloc[chunk_size * chunk:chunk_size * (chunk + 1)]
+  df = df.dropna(subset = ['Longitude', 'Latitude'])
+  coords = df[['Longitude', 'Latitude']].to_numpy(dtype = float).tolist()
+  ids = df['id'].astype(str).tolist()
+  
+  def to_feature(pair):
+    pair = ee.List(pair)
+    loc_id = pair.get(1)
+    return (ee.Feature(ee.Geometry.Point(pair.get(0), proj), {'id': loc_id})
+      .set('system:index', loc_id))
+  
+  return ee.FeatureCollection(ee.List(coords).zip(ee.List(ids)).map(to_feature))
 
 
 def apply_scale_factors(image):
@@ -63,9 +85,65 @@ def dp_buff(image):
       image: ee.Image of an ee.ImageCollection
 
   Returns:
-      ee.FeatureCollection of polygons resulting from buffered points
+      ee.FeatureCollection of polygons resulting from buffered points, within 
+      `buffer_max_error` of the buffer circle (see buffer_vertices in the yml)
+  """
+  return image.buffer(ee.Number.parse(str(buffer)), buffer_max_error)
+
+
+def sweep_buff(feat):
+  """ Buffer point locations by each radius of `buffer_sweep`, so that all 
+  radii are reduced in the same pass over each image. The buffered sites keep
+  the location id as their index and are tagged with their radius in the 
+  'buffer_m' property.
+  
+  Args:
+      feat: ee.FeatureCollection of point locations
+      
+  Returns:
+      ee.FeatureCollection of polygons, one per location and radius
+  """
+  def by_radius(radius):
+    max_error = max_error_for_vertices(radius, buffer_vertices) if buffer_vertices > 0 else None
+    return feat.map(lambda site: site.buffer(radius, max_error).set('buffer_m', radius))
+  return (ee.FeatureCollection([by_radius(radius) for radius in buffer_radii])
+    .flatten()
+    .map(lambda f: f.set('system:index', f.get('id'))))
+
+
+def buffer_locations(feat):
+  """ Buffer point locations by `site_buffer`, or by every radius of 
+  `buffer_sweep` if set in the yml (see sweep_buff())
+  
+  Args:
+      feat: ee.FeatureCollection of point locations
+      
+  Returns:
+      ee.FeatureCollection of polygons
   """
-  return image.buffer(ee.Number.parse(str(buffer)))
+  if len(buffer_radii) > 0:
+    return sweep_buff(feat)
+  return feat.map(dp_buff)
+
+
+def chunk_bounds(df, proj):
+  """ Bounding box of the buffered sites of a chunk, computed from the site 
+  coordinates, used to filter the scenes of the chunk instead of the union of 
+  all buffered sites. With a buffer sweep, the sites are buffered by the 
+  largest radius of the sweep.
+  
+  Args:
+      df: locations of the chunk with Latitude and Longitude
+      proj: CRS projection of the points
+      
+  Returns:
+      ee.Geometry.Polygon
+  """
+  coords = df[['Longitude', 'Latitude']].dropna().astype(float)
+  corners = [[coords['Longitude'].min(), coords['Latitude'].min()], 
+             [coords['Longitude'].max(), coords['Latitude'].max()]]
+  radius = max(buffer_radii) if len(buffer_radii) > 0 else float(buffer)
+  return ee.Geometry.MultiPoint(corners, proj).buffer(radius).bounds()
 
 
 def apply_rad_mask(image):
@@ -433,48 +511,14 @@ def DSWE(image):
    .And(swir1.lt(0.3))
    .And(swir2.lt(0.1))
    .And(nir.lt(0.25)))
+  # pack the tests as bits (t1 in bit 0 ... t5 in bit 4) and look up the class
+  # of each of the 32 codes in the table shared with dswe_numpy()
   t = (t1
-    .add(t2.multiply(10))
-    .add(t3.multiply(100))
-    .add(t4.multiply(1000))
-    .add(t5.multiply(10000)))
-  noWater = (t.eq(0)
-    .Or(t.eq(1))
-    .Or(t.eq(10))
-    .Or(t.eq(100))
-    .Or(t.eq(1000)))
-  hWater = (t.eq(1111)
-    .Or(t.eq(10111))
-    .Or(t.eq(11011))
-    .Or(t.eq(11101))
-    .Or(t.eq(11110))
-    .Or(t.eq(11111)))
-  mWater = (t.eq(111)
-    .Or(t.eq(1011))
-    .Or(t.eq(1101))
-    .Or(t.eq(1110))
-    .Or(t.eq(10011))
-    .Or(t.eq(10101))
-    .Or(t.eq(10110))
-    .Or(t.eq(11001))
-    .Or(t.eq(11010))
-    .Or(t.eq(11100)))
-  pWetland = t.eq(11000)
-  lWater = (t.eq(11)
-    .Or(t.eq(101))
-    .Or(t.eq(110))
-    .Or(t.eq(1001))
-    .Or(t.eq(1010))
-    .Or(t.eq(1100))
-    .Or(t.eq(10000))
-    .Or(t.eq(10001))
-    .Or(t.eq(10010))
-    .Or(t.eq(10100)))
-  iDswe = (noWater.multiply(0)
-    .add(hWater.multiply(1))
-    .add(mWater.multiply(2))
-    .add(pWetland.multiply(3))
-    .add(lWater.multiply(4)))
+    .add(t2.leftShift(1))
+    .add(t3.leftShift(2))
+    .add(t4.leftShift(3))
+    .add(t5.leftShift(4)))
+  iDswe = t.remap(list(range(32)), DSWE_CLASS_TABLE)
   return iDswe.rename('dswe')
 
 
@@ -529,1263 +573,476 @@ def remove_geo(image):
   return image.setGeometry(None)
 
 
-## Set up the reflectance pull
-def ref_pull_457_DSWE1(image, feat):
-  """ This function applies all functions to the Landsat 4-7 ee.ImageCollection, extracting
-  summary statistics for each geometry area where the DSWE value is 1, high confidence
-  water
-
+def summary_variants(dswe_variant):
+  """ List the DSWE variants summarized by a site export, with the prefix of 
+  their columns
+  
   Args:
-      image: ee.Image of an ee.ImageCollection
-      feat: ee.FeatureGeometry of the buffered locations
+      dswe_variant: DSWE variant of the export ('DSWE1', 'DSWE1a' or 'DSWE3'), 
+      or `combined_dswe` for the combined export of all configured variants
+      
+  Returns:
+      list of (DSWE variant, column prefix) tuples
+  """
+  if dswe_variant == combined_dswe:
+    return [(variant, dswe_prefix[variant]) for variant in configured_dswe_variants()]
+  return [(dswe_variant, '')]
 
+
+def summary_groups(sensor_group, dswe_variant):
+  """ List the band groups summarized per site and the reducer of each group, 
+  see band_groups() in summary_bands.py
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      dswe_variant: DSWE variant of the export, see summary_variants()
+      
   Returns:
-      summaries for band data within any given geometry area where the DSWE is 1
+      list of (ee.Reducer function name, band names, output prefix) tuples, in
+      export order
   """
-  # process image with cfmask
-  # where the mask is > 1 (clouds and cloud shadow)
-  # call that 1 (otherwise 0) and rename as clouds.
-  clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low opacity, realistic values, sun glint, ir glint
-  opac = add_opac_mask(image).select('opac').eq(1).rename('low_opac')
-  real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
-  no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
-  ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  # calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  # calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  # apply dswe function
-  d = DSWE(image).select('dswe')
+  return band_groups(sensor_group, [prefix for _, prefix in summary_variants(dswe_variant)])
 
-  # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # define dswe 1a where d is not 0 and red/green threshold met
-  grn_alg_thrsh = image.select('Green').gt(0.05)
-  red_alg_thrsh = image.select('Red').lt(0.04)
-  alg = (d.gt(1).rename('algae')
-    .And(grn_alg_thrsh.eq(1))
-    .And(red_alg_thrsh.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-    
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create masks for each band for <0 and <-0.01
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1)).selfMask()
-  
-  pixOut = (image.select(['Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2', 
-                        'SurfaceTemp'],
-                        ['med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                        'med_SurfaceTemp'])
-            .addBands(image.select(['SurfaceTemp'],
-                                    ['min_SurfaceTemp']))
-            .addBands(image.select(['Blue', 'Green', 'Red', 
-                                    'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                  ['sd_Blue', 'sd_Green', 'sd_Red', 
-                                  'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-            .addBands(image.select(['Blue', 'Green', 'Red', 'Nir', 
-                                    'Swir1', 'Swir2', 
-                                    'SurfaceTemp'],
-                                  ['mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 
-                                  'mean_Swir1', 'mean_Swir2', 
-                                  'mean_SurfaceTemp']))
-            # mask the image for dswe
-            .updateMask(dswe1) # high confidence water mask
-            # add bands back in for QA (prior to masking of dswe/hs/f/r)
-            .addBands(gt0) 
-            .addBands(dswe1)
-            .addBands(dswe3)
-            .addBands(dswe1a)
-            .addBands(opac.eq(0).selfMask().rename('high_opac'))
-            .addBands(real.eq(0).selfMask().rename('unreal_val'))
-            .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-            .addBands(ir_glint.eq(1).selfMask())
-            .addBands(blue_zero)
-            .addBands(blue_thresh)
-            .addBands(green_zero)
-            .addBands(green_thresh)
-            .addBands(red_zero)
-            .addBands(red_thresh)
-            .addBands(nir_zero)
-            .addBands(nir_thresh)
-            .addBands(swir1_zero)
-            .addBands(swir1_thresh)
-            .addBands(swir2_zero)
-            .addBands(swir2_thresh)
-            .addBands(blue_glint)
-            .addBands(green_glint)
-            .addBands(red_glint)
-            .addBands(nir_glint)
-            .addBands(swir1_glint)
-            .addBands(swir2_glint)
-            .addBands(nir_ir_glint)
-            .addBands(swir1_ir_glint)
-            .addBands(swir2_ir_glint)
-            .addBands(clouds) 
-            .addBands(hs)
-            .addBands(h)
-            ) 
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 
-              'high_opac', 'unreal_val',
-              'sun_glint', 'ir_glint',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
-  # Collect median reflectance and occurance values
-  # Make a cloud score, and get the water pixel count
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
-  out = lsout.map(remove_geo)
-  return out
 
+def site_export_selectors(sensor_group, dswe_variant):
+  """ List the columns of a site export, in export order
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      dswe_variant: DSWE variant of the export, see summary_variants()
+      
+  Returns:
+      list of column names
+  """
+  columns = export_columns(sensor_group, [prefix for _, prefix in summary_variants(dswe_variant)])
+  if len(buffer_radii) > 0:
+    # rows of a buffer sweep are told apart by their radius
+    columns.insert(1, 'buffer_m')
+  return columns
 
-## Set up the reflectance pull
-def ref_pull_457_DSWE1a(image, feat):
-  """ This function applies all functions to the Landsat 4-7 ee.ImageCollection, extracting
-  summary statistics for each geometry area where the DSWE value is 1 (high confidence water)
-  or where the algal mask threshold is met
 
+def site_row_filter(dswe_variant):
+  """ Filter that keeps the rows of a site export with water pixels in any of 
+  the summarized DSWE variants
+  
   Args:
-      image: ee.Image of an ee.ImageCollection
-      feat: ee.FeatureGeometry of the buffered locations
+      dswe_variant: DSWE variant of the export, see summary_variants()
+      
+  Returns:
+      ee.Filter
+  """
+  filters = [ee.Filter.notNull([prefix + 'med_Blue']) 
+             for _, prefix in summary_variants(dswe_variant)]
+  if len(filters) == 1:
+    return filters[0]
+  return ee.Filter.Or(*filters)
+
 
+def qa_stack(image, geo, sensor_group, terrain=None):
+  """ Compute the QA and mask layers of an image once, to be shared by the 
+  summaries of every DSWE variant
+  
+  Args:
+      image: ee.Image of a pre-processed Landsat stack
+      geo: geometry of the WRS tile, used to clip the DEM for hill shade/shadow
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      terrain: optional TerrainCache of the sites, used for the hill shade and
+      shadow instead of the DEM clipped to `geo`
+      
   Returns:
-      summaries for band data within any given geometry area where the DSWE value is 1 or where
-      the algal mask threshold is met
+      dictionary of single band ee.Images: 'clouds', 'atmos' (low opacity or 
+      aerosol), 'real', 'no_glint', 'ir_glint', 'hillShade', 'hillShadow', 
+      'dswe' and 'algae', and the shared valid-pixel bands 'valid' 
+      (illuminated, cloud free and passing the atmospheric mask) and 
+      'valid_qa' (valid, realistic values and no sun glint)
   """
-  # process image with cfmask
-  # where the mask is > 1 (clouds and cloud shadow)
-  # call that 1 (otherwise 0) and rename as clouds.
+  # where the f mask is > 1 (clouds and cloud shadow), call that 1 (otherwise 0) and rename as clouds.
   clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low opacity, realistic values, sun glint, ir glint
-  opac = add_opac_mask(image).select('opac').eq(1).rename('low_opac')
+  # add mask FOR low opacity/aerosol, realistic values, sun glint, ir glint
+  if sensor_group == 'LS457':
+    atmos = add_opac_mask(image).select('opac').eq(1).rename('low_opac')
+  else:
+    atmos = add_sr_aero_mask(image).select('aero').eq(0).rename('low_aero')
   real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
   no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
   ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  # calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  # calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  
+  if terrain is not None:
+    h = terrain.hill_shade(image)
+    hs = terrain.hill_shadow(image)
+  else:
+    # calculate hillshade
+    h = calc_hill_shades(image, geo).select('hillShade')
+    # calculate hillshadow
+    hs = calc_hill_shadows(image, geo).select('hillShadow')
   # apply dswe function
   d = DSWE(image).select('dswe')
   
-  # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # define dswe 1a where d is not 0 and red/green threshold met
+  # cloud, atmosphere, realistic value and glint masks
+  clear_qa = clouds.eq(0).And(atmos.eq(1)).And(real.eq(1)).And(no_glint.eq(1))
+  # shared valid-pixel bands: hs = 1, fully illuminated pixels
+  valid = hs.eq(1).And(clouds.eq(0)).And(atmos.eq(1))
+  valid_qa = hs.eq(1).And(clear_qa)
+  
+  # define algae where d is not 0 and red/green threshold met
   grn_alg_thrsh = image.select('Green').gt(0.05)
   red_alg_thrsh = image.select('Red').lt(0.04)
   alg = (d.gt(1).rename('algae')
     .And(grn_alg_thrsh.eq(1))
     .And(red_alg_thrsh.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-    
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create masks for each band for <0 and <-0.01
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-
-  pixOut = (image.select(['Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2',
-                        'SurfaceTemp'],
-                        ['med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2',
-                        'med_SurfaceTemp'])
-            .addBands(image.select(['SurfaceTemp'],
-                                    ['min_SurfaceTemp']))
-            .addBands(image.select(['Blue', 'Green', 'Red',
-                                    'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                  ['sd_Blue', 'sd_Green', 'sd_Red',
-                                  'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-            .addBands(image.select(['Blue', 'Green', 'Red', 'Nir',
-                                    'Swir1', 'Swir2',
-                                    'SurfaceTemp'],
-                                  ['mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir',
-                                  'mean_Swir1', 'mean_Swir2',
-                                  'mean_SurfaceTemp']))
-            # mask the image
-            .updateMask(dswe1a) # dswe1 with algal mask
-            # add bands for summaries
-            .addBands(gt0) 
-            .addBands(dswe1)
-            .addBands(dswe3)
-            .addBands(dswe1a)
-            .addBands(opac.eq(0).selfMask().rename('high_opac'))
-            .addBands(real.eq(0).selfMask().rename('unreal_val'))
-            .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-            .addBands(ir_glint.eq(1).selfMask())
-            .addBands(blue_zero)
-            .addBands(blue_thresh)
-            .addBands(green_zero)
-            .addBands(green_thresh)
-            .addBands(red_zero)
-            .addBands(red_thresh)
-            .addBands(nir_zero)
-            .addBands(nir_thresh)
-            .addBands(swir1_zero)
-            .addBands(swir1_thresh)
-            .addBands(swir2_zero)
-            .addBands(swir2_thresh)
-            .addBands(blue_glint)
-            .addBands(green_glint)
-            .addBands(red_glint)
-            .addBands(nir_glint)
-            .addBands(swir1_glint)
-            .addBands(swir2_glint)
-            .addBands(nir_ir_glint)
-            .addBands(swir1_ir_glint)
-            .addBands(swir2_ir_glint)
-            .addBands(clouds) 
-            .addBands(hs)
-            .addBands(h)
-            ) 
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 
-              'high_opac', 'unreal_val',
-              'sun_glint', 'ir_glint',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
-  # Collect median reflectance and occurance values
-  # Make a cloud score, and get the water pixel count
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
-  out = lsout.map(remove_geo)
-  return out
+    .updateMask(clear_qa))
+  
+  return {'clouds': clouds, 'atmos': atmos, 'real': real, 'no_glint': no_glint,
+          'ir_glint': ir_glint, 'hillShade': h, 'hillShadow': hs, 'dswe': d,
+          'algae': alg, 'valid': valid, 'valid_qa': valid_qa}
 
-def ref_pull_457_DSWE3(image, feat):
-  """ This function applies all functions to the Landsat 4-7 ee.ImageCollection, extracting
-  summary statistics for each geometry area where the DSWE value is 3 (high confidence
-  vegetated pixel)
 
+def dswe_water(qa, dswe_variant):
+  """ Water definition of a DSWE variant
+  
   Args:
-      image: ee.Image of an ee.ImageCollection
-      feat: ee.FeatureGeometry of the buffered locations
-
+      qa: QA layers of the image, output of qa_stack()
+      dswe_variant: DSWE variant ('DSWE1', 'DSWE1a' or 'DSWE3')
+      
   Returns:
-      summaries for band data within any given geometry area where the DSWE value is 3
+      ee.Image that is 1 where the pixel counts as water for the variant: DSWE 
+      1 (high confidence water), DSWE 1 or the algal threshold met (DSWE1a), 
+      or DSWE 3 (high confidence vegetated pixel)
   """
-  # process image with cfmask
-  # where the mask is > 1 (clouds and cloud shadow)
-  # call that 1 (otherwise 0) and rename as clouds.
-  clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low opacity, realistic values, sun glint, ir glint
-  opac = add_opac_mask(image).select('opac').eq(1).rename('low_opac')
-  real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
-  no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
-  ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  #calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  #calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  #apply dswe function
-  d = DSWE(image).select('dswe')
+  d = qa['dswe']
+  if dswe_variant == 'DSWE1':
+    return d.eq(1)
+  if dswe_variant == 'DSWE1a':
+    return d.eq(1).Or(qa['algae'].eq(1))
+  if dswe_variant == 'DSWE3':
+    return d.eq(3)
+  raise ValueError('Unknown DSWE variant: ' + str(dswe_variant))
+
+
+def summary_image(image, qa, sensor_group, dswe_variant):
+  """ Build the image of bands summarized per site: for each DSWE variant, the 
+  band values masked to the variant's water pixels and the per-band flags, 
+  plus the count and proportion bands shared by all variants
   
-    # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # define dswe 1a where d is not 0 and red/green threshold met
-  grn_alg_thrsh = image.select('Green').gt(0.05)
-  red_alg_thrsh = image.select('Red').lt(0.04)
-  alg = (d.gt(1).rename('algae')
-    .And(grn_alg_thrsh.eq(1))
-    .And(red_alg_thrsh.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-    
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, opac and real
-    .updateMask(clouds.eq(0))
-    .updateMask(opac.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
+  Args:
+      image: ee.Image of a pre-processed Landsat stack
+      qa: QA layers of the image, output of qa_stack()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      dswe_variant: DSWE variant of the export, see summary_variants()
+      
+  Returns:
+      ee.Image with the bands in the order of summary_groups()
+  """
+  d = qa['dswe']
+  valid_qa = qa['valid_qa']
+  # create additive masks for dswe>0 (water of any type), dswe==1 (confident 
+  # open water), dswe==3 (confident vegetated water) and dswe1a (dswe = 1 or 
+  # algal threshold met)
+  dswe_counts = {'DSWE1': dswe_water(qa, 'DSWE1').rename('dswe1').updateMask(valid_qa).selfMask(),
+                 'DSWE1a': dswe_water(qa, 'DSWE1a').rename('dswe1a').updateMask(valid_qa).selfMask(),
+                 'DSWE3': dswe_water(qa, 'DSWE3').rename('dswe3').updateMask(valid_qa).selfMask()}
+  gt0 = d.gt(0).rename('dswe_gt0').updateMask(valid_qa).selfMask()
   
-  # create masks for each band for <0 and <-0.01
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(opac.eq(1)).updateMask(d.eq(3)).selfMask()
-    
-  pixOut = (image.select(['Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2',
-                      'SurfaceTemp'],
-                      ['med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2',
-                      'med_SurfaceTemp'])
-          .addBands(image.select(['SurfaceTemp'],
-                                  ['min_SurfaceTemp']))
-          .addBands(image.select(['Blue', 'Green', 'Red',
-                                  'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                ['sd_Blue', 'sd_Green', 'sd_Red',
-                                'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-          .addBands(image.select(['Blue', 'Green', 'Red', 'Nir',
-                                  'Swir1', 'Swir2',
-                                  'SurfaceTemp'],
-                                ['mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir',
-                                'mean_Swir1', 'mean_Swir2',
-                                'mean_SurfaceTemp']))
-          # mask the image
-          .updateMask(dswe3) # vegetated water mask
-          # add bands for summaries
-          .addBands(gt0) 
-          .addBands(dswe1)
-          .addBands(dswe3)
-          .addBands(dswe1a)
-          .addBands(opac.eq(0).selfMask().rename('high_opac'))
-          .addBands(real.eq(0).selfMask().rename('unreal_val'))
-          .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-          .addBands(ir_glint.eq(1).selfMask())
-          .addBands(blue_zero)
-          .addBands(blue_thresh)
-          .addBands(green_zero)
-          .addBands(green_thresh)
-          .addBands(red_zero)
-          .addBands(red_thresh)
-          .addBands(nir_zero)
-          .addBands(nir_thresh)
-          .addBands(swir1_zero)
-          .addBands(swir1_thresh)
-          .addBands(swir2_zero)
-          .addBands(swir2_thresh)
-          .addBands(blue_glint)
-          .addBands(green_glint)
-          .addBands(red_glint)
-          .addBands(nir_glint)
-          .addBands(swir1_glint)
-          .addBands(swir2_glint)
-          .addBands(nir_ir_glint)
-          .addBands(swir1_ir_glint)
-          .addBands(swir2_ir_glint)
-          .addBands(clouds) 
-          .addBands(hs)
-          .addBands(h)
-          ) 
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 
-              'high_opac', 'unreal_val',
-              'sun_glint', 'ir_glint',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
-  # Collect median reflectance and occurance values
-  # Make a cloud score, and get the water pixel count
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
-  out = lsout.map(remove_geo)
-  return out
-
+  # QA bands (prior to masking of dswe/hs/f/r)
+  pixOut = (gt0
+            .addBands(dswe_counts['DSWE1'])
+            .addBands(dswe_counts['DSWE3'])
+            .addBands(dswe_counts['DSWE1a'])
+            .addBands(qa['atmos'].eq(0).selfMask().rename(atmos_flag[sensor_group]))
+            .addBands(qa['real'].eq(0).selfMask().rename('unreal_val'))
+            .addBands(qa['no_glint'].eq(0).selfMask().rename('sun_glint'))
+            .addBands(qa['ir_glint'].eq(1).selfMask())
+            .addBands(qa['clouds'])
+            .addBands(qa['hillShadow'])
+            .addBands(qa['hillShade'])
+            )
+  
+  bands = sr_bands[sensor_group]
+  sum_bands = bands + ['SurfaceTemp']
+  glint_bands = [band for band in bands if band != 'Aerosol']
+  ir_bands = ['Nir', 'Swir1', 'Swir2']
+  flag_names = flag_band_names(sensor_group)
+  for variant, prefix in summary_variants(dswe_variant):
+    values = (image.select(sum_bands, [prefix + 'med_' + band for band in sum_bands])
+              .addBands(image.select(['SurfaceTemp'], [prefix + 'min_SurfaceTemp']))
+              .addBands(image.select(sum_bands, [prefix + 'sd_' + band for band in sum_bands]))
+              .addBands(image.select(sum_bands, [prefix + 'mean_' + band for band in sum_bands]))
+              # mask the image for the variant's water pixels
+              .updateMask(dswe_counts[variant]))
+    # create masks for each band for <0 and <-0.01, >=0.2 and ir bands >=0.1, 
+    # all masked once by the shared valid-pixel band and the water definition
+    flags = (image.select(bands).lt(0)
+        .rename([flag_prefix[band] + '_zero' for band in bands])
+      .addBands(image.select(bands).lt(-0.01)
+        .rename([flag_prefix[band] + '_thresh' for band in bands]))
+      .addBands(image.select(glint_bands).gte(0.2)
+        .rename([flag_prefix[band] + '_glint' for band in glint_bands]))
+      .addBands(image.select(ir_bands).gte(0.1)
+        .rename([flag_prefix[band] + '_ir_glint' for band in ir_bands]))
+      .updateMask(qa['valid'].And(dswe_water(qa, variant)))
+      .selfMask()
+      # named as their export column, they are counted without output prefix
+      .select(flag_names, [prefix + 'pCount_' + flag for flag in flag_names]))
+    pixOut = pixOut.addBands(values).addBands(flags)
+  
+  # the combined reducer matches bands by position, order them as the reducer
+  band_order = []
+  for _, group_bands, _ in summary_groups(sensor_group, dswe_variant):
+    band_order += group_bands
+  return pixOut.select(band_order)
 
-def ref_pull_89_DSWE1(image, feat):
-  """ This function applies all functions to the Landsat 8 and 9 ee.ImageCollection, extracting
-  summary statistics for each geometry area where DSWE is 1, high confidence water
 
+def summary_reducer(pixOut, sensor_group, dswe_variant):
+  """ Build the combined reducer of the site summaries
+  
   Args:
-      image: ee.Image of an ee.ImageCollection
-      feat: ee.FeatureGeometry of the buffered locations
-
+      pixOut: ee.Image to summarize, output of summary_image()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      dswe_variant: DSWE variant of the export, see summary_variants()
+      
   Returns:
-      summaries for band data within any given geometry area where the DSWE is 1
+      ee.Reducer
   """
-  # where the f mask is > 1 (clouds and cloud shadow), call that 1 (otherwise 0) and rename as clouds.
-  clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low aerosol, realistic values, sun glint, ir glint
-  aero = add_sr_aero_mask(image).select('aero').eq(0).rename('low_aero')
-  real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
-  no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
-  ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  # calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  # calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  # calculage DSWE
-  d = DSWE(image).select('dswe')
+  combinedReducer = None
+  for reducer, group_bands, output_prefix in summary_groups(sensor_group, dswe_variant):
+    group_reducer = (getattr(ee.Reducer, reducer)().unweighted()
+      .forEachBand(pixOut.select(group_bands)))
+    if combinedReducer is None:
+      combinedReducer = group_reducer
+    else:
+      combinedReducer = combinedReducer.combine(group_reducer, 
+                                                outputPrefix = output_prefix, 
+                                                sharedInputs = False)
+  return combinedReducer
+
+
+def sites_in_footprint(image, feat):
+  """ Subset the buffered locations to those that intersect the footprint of an
+  image, so that sites at the edge of (or outside) a scene are not reduced. 
+  The footprint is the scene outline from the image metadata, not its valid 
+  pixels: sites in masked areas inside the outline, such as the Landsat 7 
+  SLC-off gaps, are not pruned here. They are still reduced, over no pixels, 
+  and their rows are dropped by site_row_filter().
   
-  # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # define dswe 1a where d is not 0 and red/green threshold met
-  grn_alg_thrsh = image.select('Green').gt(0.05)
-  red_alg_thrsh = image.select('Red').lt(0.04)
-  alg = (d.gt(1).rename('algae')
-    .And(grn_alg_thrsh.eq(1))
-    .And(red_alg_thrsh.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-    
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create masks for each band for <0 and <-0.01
-  aero_zero = image.select('Aerosol').lt(0).rename('aero_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  aero_thresh = image.select('Aerosol').lt(-0.01).rename('aero_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1)).selfMask()
-
-  pixOut = (image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2', 
-                      'SurfaceTemp'],
-                      ['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                      'med_SurfaceTemp'])
-          .addBands(image.select(['SurfaceTemp'],
-                                  ['min_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red', 
-                                  'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                ['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 
-                                'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir', 
-                                  'Swir1', 'Swir2', 
-                                  'SurfaceTemp'],
-                                ['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 
-                                'mean_Swir1', 'mean_Swir2', 
-                                'mean_SurfaceTemp']))
-          # mask the image
-          .updateMask(dswe1) # high confidence water mask
-          # add bands back in for QA (prior to masking of dswe/hs/f/r)
-          .addBands(gt0) 
-          .addBands(dswe1)
-          .addBands(dswe3)
-          .addBands(dswe1a)
-          .addBands(aero.eq(0).selfMask().rename('high_aero'))
-          .addBands(real.eq(0).selfMask().rename('unreal_val'))
-          .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-          .addBands(ir_glint.eq(1).selfMask())
-          .addBands(aero_zero)
-          .addBands(aero_thresh)
-          .addBands(blue_zero)
-          .addBands(blue_thresh)
-          .addBands(green_zero)
-          .addBands(green_thresh)
-          .addBands(red_zero)
-          .addBands(red_thresh)
-          .addBands(nir_zero)
-          .addBands(nir_thresh)
-          .addBands(swir1_zero)
-          .addBands(swir1_thresh)
-          .addBands(swir2_zero)
-          .addBands(swir2_thresh)
-          .addBands(blue_glint)
-          .addBands(green_glint)
-          .addBands(red_glint)
-          .addBands(nir_glint)
-          .addBands(swir1_glint)
-          .addBands(swir2_glint)
-          .addBands(nir_ir_glint)
-          .addBands(swir1_ir_glint)
-          .addBands(swir2_ir_glint)
-          .addBands(clouds) 
-          .addBands(hs)
-          .addBands(h)
-          ) 
-  
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 'high_aero', 'unreal_val',
-              'sun_glint', 'ir_glint', 'aero_zero', 'aero_thresh',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
+  Args:
+      image: ee.Image of an ee.ImageCollection
+      feat: ee.FeatureCollection of the buffered locations
+      
+  Returns:
+      ee.FeatureCollection
+  """
+  return feat.filterBounds(image.geometry())
+
+
+def images_with_clear_sites(stack, feat, scale, min_clear):
+  """ Lightweight first pass over a stack: keep only the images where at least 
+  one site has more than `min_clear` of its buffer free of fill, clouds, 
+  dilated clouds, cloud shadow and snow, according to QA_PIXEL read at a coarse 
+  `scale`. The remaining images are returned unchanged, with the largest clear 
+  fraction of any site in the 'max_clear' property.
   
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
-  out = lsout.map(remove_geo)
-  return out
+  Args:
+      stack: ee.ImageCollection with the 'QA_PIXEL' band (before renaming)
+      feat: ee.FeatureCollection of the buffered locations
+      scale: resolution of the first pass in meters
+      min_clear: clear fraction of a site buffer (0-1) that must be exceeded
+      
+  Returns:
+      ee.ImageCollection
+  """
+  # fill (bit 0), dilated clouds (1), clouds (3), cloud shadow (4), snow (5)
+  not_clear = (1 << 0) | (1 << 1) | (1 << 3) | (1 << 4) | (1 << 5)
+  def add_max_clear(image):
+    clear = image.select('QA_PIXEL').bitwiseAnd(not_clear).eq(0).rename('clear')
+    # the default (weighted) mean also counts the pixels that only partly 
+    # overlap a buffer, so buffers smaller than `scale` are not missed
+    site_clear = clear.reduceRegions(sites_in_footprint(image, feat), ee.Reducer.mean(), scale)
+    return image.set('max_clear', site_clear.aggregate_max('mean'))
+  return stack.map(add_max_clear).filter(ee.Filter.gt('max_clear', min_clear))
 
 
-def ref_pull_89_DSWE1a(image, feat):
-  """ This function applies all functions to the Landsat 8 and 9 ee.ImageCollection, extracting
-  summary statistics for each geometry area where the DSWE value is 1 (high confidence water)
-  or the algal threshold has been met
+## Set up the reflectance pull
+def ref_pull(image, feat, geo, sensor_group, dswe_variant, terrain=None):
+  """ This function applies all functions to an image of the Landsat 4-7 or 
+  Landsat 8, 9 ee.ImageCollection, extracting summary statistics for each 
+  geometry area where the pixels count as water for the DSWE variant (see 
+  dswe_water()). For the combined export (`combined_dswe`), all configured 
+  variants are summarized in one pass, with prefixed columns. Only the sites 
+  within the image's footprint are reduced (see sites_in_footprint()).
 
   Args:
       image: ee.Image of an ee.ImageCollection
       feat: ee.FeatureGeometry of the buffered locations
+      geo: geometry of the WRS tile, used to clip the DEM for hill shade/shadow
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      dswe_variant: DSWE variant ('DSWE1', 'DSWE1a' or 'DSWE3') or 
+      `combined_dswe`
+      terrain: optional TerrainCache of the sites, see qa_stack()
 
   Returns:
-      summaries for band data within any given geometry area where the DSWE value is 1 or the algal
-      threshold has been met
+      summaries for band data within any given geometry area
   """
-  # where the f mask is > 1 (clouds and cloud shadow), call that 1 (otherwise 0) and rename as clouds.
-  clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low aerosol, realistic values, sun glint, ir glint
-  aero = add_sr_aero_mask(image).select('aero').eq(0).rename('low_aero')
-  real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
-  no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
-  ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  #calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  #calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  # calculage DSWE
-  d = DSWE(image).select('dswe')
-  
-  # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-    
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-  
-  # define dswe 1a where d is not 0 and red/green threshold met
-  grn_alg_thrsh = image.select('Green').gt(0.05)
-  red_alg_thrsh = image.select('Red').lt(0.04)
-  alg = (d.gt(1).rename('algae')
-    .And(grn_alg_thrsh.eq(1))
-    .And(red_alg_thrsh.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-    
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-  
-  # create masks for each band for <0 and <-0.01
-  aero_zero = image.select('Aerosol').lt(0).rename('aero_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  aero_thresh = image.select('Aerosol').lt(-0.01).rename('aero_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(1).Or(alg.eq(1))).selfMask()
-  
-  pixOut = (image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2',
-                      'SurfaceTemp'],
-                      ['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2',
-                      'med_SurfaceTemp'])
-          .addBands(image.select(['SurfaceTemp'],
-                                  ['min_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red',
-                                  'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                ['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red',
-                                'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir',
-                                  'Swir1', 'Swir2',
-                                  'SurfaceTemp'],
-                                ['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir',
-                                'mean_Swir1', 'mean_Swir2',
-                                'mean_SurfaceTemp']))
-          # mask the image
-          .updateMask(dswe1a) # high confidence water + algal mask
-          # add bands back in for QA (prior to masking of dswe/hs/f/r)
-          .addBands(gt0) 
-          .addBands(dswe1)
-          .addBands(dswe3)
-          .addBands(dswe1a)
-          .addBands(aero.eq(0).selfMask().rename('high_aero'))
-          .addBands(real.eq(0).selfMask().rename('unreal_val'))
-          .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-          .addBands(ir_glint.eq(1).selfMask())
-          .addBands(aero_zero)
-          .addBands(aero_thresh)
-          .addBands(blue_zero)
-          .addBands(blue_thresh)
-          .addBands(green_zero)
-          .addBands(green_thresh)
-          .addBands(red_zero)
-          .addBands(red_thresh)
-          .addBands(nir_zero)
-          .addBands(nir_thresh)
-          .addBands(swir1_zero)
-          .addBands(swir1_thresh)
-          .addBands(swir2_zero)
-          .addBands(swir2_thresh)
-          .addBands(blue_glint)
-          .addBands(green_glint)
-          .addBands(red_glint)
-          .addBands(nir_glint)
-          .addBands(swir1_glint)
-          .addBands(swir2_glint)
-          .addBands(nir_ir_glint)
-          .addBands(swir1_ir_glint)
-          .addBands(swir2_ir_glint)
-          .addBands(clouds) 
-          .addBands(hs)
-          .addBands(h)
-          ) 
-  
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 'high_aero', 'unreal_val',
-              'sun_glint', 'ir_glint', 'aero_zero', 'aero_thresh',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
+  qa = qa_stack(image, geo, sensor_group, terrain)
+  pixOut = summary_image(image, qa, sensor_group, dswe_variant)
+  # Collect median reflectance and occurance values
+  # Make a cloud score, and get the water pixel count
+  lsout = (pixOut.reduceRegions(sites_in_footprint(image, feat), 
+                                summary_reducer(pixOut, sensor_group, dswe_variant), 30))
   out = lsout.map(remove_geo)
   return out
 
 
-def ref_pull_89_DSWE3(image, feat):
-  """ This function applies all functions to the Landsat 8 and 9 ee.ImageCollection, extracting
-  summary statistics for each geometry area where the DSWE value is 3 (high confidence vegetated
-  pixels)
-
+def start_export(task, description, pr, chunk, dswe_variant, sensor_group, 
+                 site_range=None):
+  """ Start an export task, hand it to the shared task monitor and record it in
+  the local task ledger. If `graph_stats` is set in the yml, the size of the 
+  task's serialized expression graph is reported and recorded first.
+  
   Args:
-      image: ee.Image of an ee.ImageCollection
-      feat: ee.FeatureGeometry of the buffered locations
-
+      task: ee.batch.Task created by ee.batch.Export.table.toDrive()
+      description: description of the export task (the exported file name)
+      chunk: site chunk of the export, None for metadata exports
+      dswe_variant: DSWE variant of the export (e.g. 'DSWE1'), None for metadata
+      sensor_group: Landsat sensor group of the export ('LS457' or 'LS89')
+      site_range: (start, end) row range of the path-row locations in the 
+      export, None for metadata exports
+      
   Returns:
-      summaries for band data within any given geometry area where the DSWE value is 3
+      boolean; True if the task was started, False if it was skipped because 
+      the export is already running or complete (resume mode)
   """
-  # where the f mask is > 1 (clouds and cloud shadow), call that 1 (otherwise 0) and rename as clouds.
-  clouds = add_cf_mask(image).select('cfmask').gte(1).rename('clouds')
-  # add mask FOR low aerosol, realistic values, sun glint, ir glint
-  aero = add_sr_aero_mask(image).select('aero').eq(0).rename('low_aero')
-  real = add_realistic_mask_457(image).select('real').eq(1).rename('is_real')
-  no_glint = add_sun_glint_mask(image).select('no_glint').eq(1)
-  ir_glint = add_ir_glint_flag(image).select('ir_glint').eq(1)
-  #calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  #calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  # calculate DSWE
-  d = DSWE(image).select('dswe')
+  if description in completed_exports:
+    print('Skipping ' + description + ', export is already running or complete')
+    return False
+  stats = None
+  if report_graph_stats:
+    # measured locally, before the task is sent
+    stats = graph_stats(task)
+    print('Graph of ' + description + ': ' + format_graph_stats(stats))
+    if stats['graph_bytes'] > REQUEST_LIMIT_BYTES:
+      print('Warning: the request of ' + description + ' is larger than the Earth Engine limit of ' + 
+            str(REQUEST_LIMIT_BYTES) + ' bytes')
+  # wait until there are fewer than `max_active_tasks` tasks running or ready 
+  # (across all path-rows being submitted from this Python session), the shared 
+  # monitor returns as soon as a slot frees up
+  monitor = get_task_monitor()
+  monitor.wait_for_slot(max_active_tasks)
+  try:
+    task.start()
+  except Exception:
+    monitor.release()
+    raise
+  monitor.register(task)
+  get_task_ledger().record_submission(task_id = task.id,
+                                      description = description,
+                                      run_date = run_date,
+                                      pathrow = pr,
+                                      chunk = chunk,
+                                      dswe = dswe_variant,
+                                      sensor = sensor_group,
+                                      site_start = None if site_range is None else site_range[0],
+                                      site_end = None if site_range is None else site_range[1],
+                                      n_scenes = scene_counts.get(pr, {}).get(sensor_group),
+                                      graph_bytes = None if stats is None else stats['graph_bytes'],
+                                      graph_nodes = None if stats is None else stats['nodes'])
+  return True
+
+
+def get_completed_exports():
+  """ Get the descriptions of this run's exports that are already running or 
+  complete, according to the local task ledger, the GEE task list and (if 
+  configured) the files already exported to the run's Drive folder. Used to 
+  resume a pull without resubmitting finished pieces.
   
-  # create additive masks for dswe>0 (water of any type)
-  # hs = 1, fully illuminated pixels
-  gt0 = (d.gt(0).rename('dswe_gt0')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-  # create additive masks for dswe==1 (confident open water)
-  # hs = 1, fully illuminated pixels
-  dswe1 = (d.eq(1).rename('dswe1')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-  # create additive masks for dswe==3 (confident vegetated water)
-  # hs = 1, fully illuminated pixels
-  dswe3 = (d.eq(3).rename('dswe3')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
-  # define dswe 1a where d is not 0 and red/green threshold met
-  grn_alg_thrsh = image.select('Green').gt(0.05)
-  red_alg_thrsh = image.select('Red').lt(0.04)
-  alg = (d.gt(1).rename('algae')
-    .And(grn_alg_thrsh.eq(1))
-    .And(red_alg_thrsh.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    )
-  # create additive mask for dswe1a: dswe = 1 or algal threshold met
-  # hs = 1, fully illuminated pixels
-  dswe1a = (d.eq(1)
-    .Or(alg.eq(1))
-    .rename('dswe1a')
-    .updateMask(hs.eq(1))
-    # add cloud, aero and real
-    .updateMask(clouds.eq(0))
-    .updateMask(aero.eq(1))
-    .updateMask(real.eq(1))
-    .updateMask(no_glint.eq(1))
-    .selfMask()
-    )
+  Returns:
+      set of export descriptions
+  """
+  resume_states = ACTIVE_STATES + ("COMPLETED",)
+  # start with the ledger, then let the (fresher) task list override states
+  states = {row['task_id']: (row['description'], row['state']) 
+            for row in get_task_ledger().tasks(run_date = run_date)}
+  for task_id, description, state in get_task_monitor().snapshot():
+    if description is not None and run_date in description:
+      states[task_id] = (description, state)
+  completed = set(description for description, state in states.values() 
+                  if state in resume_states)
+  # add any files already in the Drive folder
+  if resume_check_drive and os.path.exists(exported_fn):
+    exported = read_csv(exported_fn, dtype = str)
+    completed.update(name[:-len('.csv')] if name.endswith('.csv') else name 
+                     for name in exported['name'])
+  return completed
+
+
+def site_export_description(sensor_group, dswe_variant, pr, chunk, part=None):
+  """ Create the (deterministic) description of a site export, which is also 
+  the name of the exported file
   
-  # create masks for each band for <0 and <-0.01
-  aero_zero = image.select('Aerosol').lt(0).rename('aero_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  aero_thresh = image.select('Aerosol').lt(-0.01).rename('aero_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  blue_zero = image.select('Blue').lt(0).rename('blue_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  blue_thresh = image.select('Blue').lt(-0.01).rename('blue_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_zero = image.select('Green').lt(0).rename('green_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_thresh = image.select('Green').lt(-0.01).rename('green_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_zero = image.select('Red').lt(0).rename('red_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_thresh = image.select('Red').lt(-0.01).rename('red_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_zero = image.select('Nir').lt(0).rename('nir_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_thresh = image.select('Nir').lt(-0.01).rename('nir_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_zero = image.select('Swir1').lt(0).rename('swir1_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_thresh = image.select('Swir1').lt(-0.01).rename('swir1_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_zero = image.select('Swir2').lt(0).rename('swir2_zero').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_thresh = image.select('Swir2').lt(-0.01).rename('swir2_thresh').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  
-  # create masks for each band for >=0.2
-  blue_glint = image.select('Blue').gte(0.2).rename('blue_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  green_glint = image.select('Green').gte(0.2).rename('green_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  red_glint = image.select('Red').gte(0.2).rename('red_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  nir_glint = image.select('Nir').gte(0.2).rename('nir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_glint = image.select('Swir1').gte(0.2).rename('swir1_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_glint = image.select('Swir2').gte(0.2).rename('swir2_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  
-  # create masks for ir bands >=0.1
-  nir_ir_glint = image.select('Nir').gte(0.1).rename('nir_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir1_ir_glint = image.select('Swir1').gte(0.1).rename('swir1_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()
-  swir2_ir_glint = image.select('Swir2').gte(0.1).rename('swir2_ir_glint').updateMask(hs.eq(1)).updateMask(clouds.eq(0)).updateMask(aero.eq(1)).updateMask(d.eq(3)).selfMask()  
-  
-  #calculate hillshade
-  h = calc_hill_shades(image, wrs.geometry()).select('hillShade')
-  #calculate hillshadow
-  hs = calc_hill_shadows(image, wrs.geometry()).select('hillShadow')
-  pixOut = (image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2',
-                      'SurfaceTemp'],
-                      ['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2',
-                      'med_SurfaceTemp'])
-          .addBands(image.select(['SurfaceTemp'],
-                                  ['min_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red',
-                                  'Nir', 'Swir1', 'Swir2', 'SurfaceTemp'],
-                                ['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red',
-                                'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp']))
-          .addBands(image.select(['Aerosol', 'Blue', 'Green', 'Red', 'Nir',
-                                  'Swir1', 'Swir2',
-                                  'SurfaceTemp'],
-                                ['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir',
-                                'mean_Swir1', 'mean_Swir2',
-                                'mean_SurfaceTemp']))
-          # mask image
-          .updateMask(dswe3) # dswe3 mask
-          # add bands back in for QA (prior to masking of dswe/hs/f/r)
-          .addBands(gt0) 
-          .addBands(dswe1)
-          .addBands(dswe3)
-          .addBands(dswe1a)
-          .addBands(aero.eq(0).selfMask().rename('high_aero'))
-          .addBands(real.eq(0).selfMask().rename('unreal_val'))
-          .addBands(no_glint.eq(0).selfMask().rename('sun_glint'))
-          .addBands(ir_glint.eq(1).selfMask())
-          .addBands(aero_zero)
-          .addBands(aero_thresh)
-          .addBands(blue_zero)
-          .addBands(blue_thresh)
-          .addBands(green_zero)
-          .addBands(green_thresh)
-          .addBands(red_zero)
-          .addBands(red_thresh)
-          .addBands(nir_zero)
-          .addBands(nir_thresh)
-          .addBands(swir1_zero)
-          .addBands(swir1_thresh)
-          .addBands(swir2_zero)
-          .addBands(swir2_thresh)
-          .addBands(blue_glint)
-          .addBands(green_glint)
-          .addBands(red_glint)
-          .addBands(nir_glint)
-          .addBands(swir1_glint)
-          .addBands(swir2_glint)
-          .addBands(nir_ir_glint)
-          .addBands(swir1_ir_glint)
-          .addBands(swir2_ir_glint)
-          .addBands(clouds) 
-          .addBands(hs)
-          .addBands(h)
-          ) 
-  
-  combinedReducer = (ee.Reducer.median().unweighted()
-      .forEachBand(pixOut.select(['med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 
-            'med_Nir', 'med_Swir1', 'med_Swir2', 'med_SurfaceTemp']))
-    .combine(ee.Reducer.min().unweighted()
-      .forEachBand(pixOut.select(['min_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.stdDev().unweighted()
-      .forEachBand(pixOut.select(['sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp'])), 
-      sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 
-              'mean_Nir', 'mean_Swir1', 'mean_Swir2', 'mean_SurfaceTemp'])), sharedInputs = False)
-    .combine(ee.Reducer.count().unweighted()
-      .forEachBand(pixOut.select(['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', 'high_aero', 'unreal_val',
-              'sun_glint', 'ir_glint', 'aero_zero', 'aero_thresh',
-              'blue_zero', 'blue_thresh', 'green_zero', 'green_thresh', 'red_zero', 'red_thresh',
-              'nir_zero', 'nir_thresh', 'swir1_zero', 'swir1_thresh', 'swir2_zero', 'swir2_thresh',
-              'blue_glint', 'green_glint', 'red_glint', 'nir_glint', 'swir1_glint', 'swir2_glint',
-              'nir_ir_glint', 'swir1_ir_glint', 'swir2_ir_glint'])), 
-      outputPrefix = 'pCount_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['clouds', 'hillShadow'])), 
-      outputPrefix = 'prop_', sharedInputs = False)
-    .combine(ee.Reducer.mean().unweighted()
-      .forEachBand(pixOut.select(['hillShade'])), 
-      outputPrefix = 'mean_', sharedInputs = False)
-    )
-  lsout = (pixOut.reduceRegions(feat, combinedReducer, 30))
-  out = lsout.map(remove_geo)
-  return out
+  Args:
+      sensor_group: Landsat sensor group of the export ('LS457' or 'LS89')
+      dswe_variant: DSWE variant of the export (e.g. 'DSWE1')
+      pr: WRS2 path-row of the export
+      chunk: site chunk of the export
+      part: optional part of a chunk that was split on resubmission (e.g. 
+      's1of2' for the first half of the sites, 't2of2' for the second half of 
+      the time window)
+      
+  Returns:
+      export description as a string
+  """
+  if part is not None:
+    chunk = str(chunk) + '_' + part
+  return (proj+'_site_'+sensor_group+'_C2_SRST_'+dswe_variant+'_'+str(pr)+'_'+
+          str(chunk)+'_v'+run_date)
 
 
-def maximum_no_of_tasks(MaxNActive, waitingPeriod):
-  """ Function to limit the number of tasks sent to Earth Engine at one time to avoid time out errors
+def parse_site_export_description(description):
+  """ Split a site export description into its parts, the inverse of 
+  `site_export_description()`
   
   Args:
-      MaxNActive: maximum number of tasks that can be active in Earth Engine at one time
-      waitingPeriod: time to wait between checking if tasks are completed, in seconds
+      description: export description of a site export
       
   Returns:
-      None.
+      dictionary with the keys 'sensor_group', 'dswe_variant', 'pr', 'chunk' and
+      'part', or None if the description is not a site export of this run
+  """
+  match = re.search(r'_site_(LS457|LS89)_C2_SRST_(DSWE1a|DSWE1|DSWE3|' + combined_dswe + r')_(\d{6})_(\d+)(?:_([st]\d+of\d+))?_v' + re.escape(run_date) + '$', 
+                    description)
+  if match is None:
+    return None
+  return {'sensor_group': match.group(1), 'dswe_variant': match.group(2),
+          'pr': match.group(3), 'chunk': int(match.group(4)), 
+          'part': match.group(5)}
+
+
+def configured_dswe_variants():
+  """ List the DSWE variants to acquire per the DSWE_setting in the yml
+  
+  Returns:
+      list of DSWE variants (e.g. ['DSWE1', 'DSWE1a'])
   """
-  ##maintain a maximum number of active tasks
-  ## initialize submitting jobs
-  ts = list(ee.batch.Task.list())
-  NActive = 0
-  for task in ts:
-     if ('RUNNING' in str(task) or 'READY' in str(task)):
-         NActive += 1
-  ## wait if the number of current active tasks reach the maximum number
-  ## defined in MaxNActive
-  while (NActive >= MaxNActive):
-    # if reach or over maximum no. of active tasks, wait for a certain amount 
-    # of time ('waitingPeriod') and check again
-    time.sleep(waitingPeriod) 
-    ts = list(ee.batch.Task.list())
-    NActive = 0
-    for task in ts:
-      if ('RUNNING' in str(task) or 'READY' in str(task)):
-        NActive += 1
-  return()
+  variants = []
+  if '1' in dswe:
+    variants.append('DSWE1')
+  if '1a' in dswe:
+    variants.append('DSWE1a')
+  if '3' in dswe:
+    variants.append('DSWE3')
+  return variants
+
+
+def export_dswe_variants():
+  """ List the DSWE variants of the site exports: the configured DSWE variants,
+  or a single combined export (`combined_dswe`) of all configured variants if
+  `combine_dswe` is set in the yml
+  
+  Returns:
+      list of DSWE variants
+  """
+  variants = configured_dswe_variants()
+  if combine_dswe and len(variants) > 1:
+    return [combined_dswe]
+  return variants
 
 
 ##############################################
@@ -1831,81 +1088,229 @@ except AttributeError:
 # get extent info
 extent = yml["extent"][0]
 
-# get current tile
-with open("b_pull_Landsat_SRST_poi/out/current_pathrow.txt", "r") as file:
-  pr = file.read()
-
-# create file name of location data
-locs_fn = os.path.join("b_pull_Landsat_SRST_poi/out/locations/", ("locations_" + pr + ".csv"))
-
-# read in locations file
-locations_subset = read_csv(locs_fn)
+# get resume settings (not present in yml files of older runs)
+resume = "resume" in yml and str(yml["resume"][0]) == "True"
+resume_check_drive = "resume_check_drive" in yml and str(yml["resume_check_drive"][0]) == "True"
+exported_fn = "b_pull_Landsat_SRST_poi/mid/exported_files.csv"
+
+# if resuming, get the exports that do not need to be resubmitted
+if resume:
+  completed_exports = get_completed_exports()
+else:
+  completed_exports = set()
+
+# maximum number of tasks that can be active in Earth Engine at one time
+max_active_tasks = 10
+
+# number of sites sent per export task (the maximum, if sizing chunks adaptively)
+site_chunk_size = 5000
+
+# size the site chunks from the estimated cost of each export (not present in 
+# yml files of older runs)
+adaptive_chunks = "adaptive_chunks" in yml and str(yml["adaptive_chunks"][0]) == "True"
+if "chunk_target_minutes" in yml:
+  chunk_target_seconds = float(yml["chunk_target_minutes"][0]) * 60
+else:
+  chunk_target_seconds = 3600
+
+# read the sites from a per-run table asset instead of sending them with every 
+# export (not present in yml files of older runs)
+locations_asset = "locations_asset" in yml and str(yml["locations_asset"][0]) == "True"
+locations_asset_folder = locations_folder(eeproj, proj, run_date)
+
+# summarize all DSWE variants in one pass and send one export per chunk and 
+# sensor group (not present in yml files of older runs)
+combine_dswe = "combine_dswe" in yml and str(yml["combine_dswe"][0]) == "True"
+
+# compute hill shade/shadow from the DEM restricted to the sites of the 
+# path-row, loaded once per path-row, optionally with the sun angles rounded to 
+# bins of terrain_bin_degrees (lossy, off by default; not present in yml files 
+# of older runs)
+terrain_cache = "terrain_cache" in yml and str(yml["terrain_cache"][0]) == "True"
+if "terrain_bin_degrees" in yml:
+  terrain_bin_degrees = float(yml["terrain_bin_degrees"][0])
+else:
+  terrain_bin_degrees = 0
+
+# measure the serialized expression graph of each export before sending it, 
+# print a summary and record its size in the task ledger (not present in yml 
+# files of older runs)
+report_graph_stats = "graph_stats" in yml and str(yml["graph_stats"][0]) == "True"
+
+# only send the images where at least one site is clear enough, according to 
+# QA_PIXEL read at prefilter_scale, through the full pull (not present in yml 
+# files of older runs)
+cloud_prefilter = "cloud_prefilter" in yml and str(yml["cloud_prefilter"][0]) == "True"
+if "prefilter_scale" in yml:
+  prefilter_scale = float(yml["prefilter_scale"][0])
+else:
+  prefilter_scale = 120
+if "prefilter_min_clear" in yml:
+  prefilter_min_clear = float(yml["prefilter_min_clear"][0])
+else:
+  prefilter_min_clear = 0
+
+# only pull the scenes that earlier runs (in previous_run_dates) did not 
+# acquire, so the outputs of this run can be appended to theirs (not present in 
+# yml files of older runs)
+incremental = "incremental" in yml and str(yml["incremental"][0]) == "True"
+if "previous_run_date" in yml:
+  # an empty setting is read as NaN
+  previous_run_dates = [run.strip() for run in str(yml["previous_run_date"][0]).split(",") 
+                        if run.strip() not in ["", "nan"]]
+else:
+  previous_run_dates = []
+if "incremental_lookback_days" in yml:
+  incremental_lookback_days = int(yml["incremental_lookback_days"][0])
+else:
+  incremental_lookback_days = DEFAULT_LOOKBACK_DAYS
+
+# only pull the sites that are new or moved since the latest run in 
+# previous_run_dates, over the full time range (not present in yml files of 
+# older runs)
+site_diff = "site_diff" in yml and str(yml["site_diff"][0]) == "True"
+if site_diff and incremental:
+  raise ValueError('site_diff and incremental can not be combined in one run, ' + 
+                   'pull the new sites and the new scenes in separate runs')
+if site_diff and len(previous_run_dates) == 0:
+  raise ValueError('site_diff requires the previous_run_date setting')
+
+# export only the scenes used by the site exports and the image properties in
+# METADATA_PROPERTIES, and optionally write them to a local feather file as 
+# well (not present in yml files of older runs)
+lean_metadata = "lean_metadata" in yml and str(yml["lean_metadata"][0]) == "True"
+metadata_sidecar = "metadata_sidecar" in yml and str(yml["metadata_sidecar"][0]) == "True"
+
+# chunk the sites of a path-row along a Hilbert curve and filter each chunk's 
+# scenes by the bounding box of its sites (not present in yml files of older 
+# runs)
+spatial_chunks = "spatial_chunks" in yml and str(yml["spatial_chunks"][0]) == "True"
+
+# approximate the site buffers by polygons of buffer_vertices vertices (0 keeps 
+# the Earth Engine default error), and optionally store the buffered sites in 
+# the location table assets (not present in yml files of older runs)
+buffer_vertices = int(yml["buffer_vertices"][0]) if "buffer_vertices" in yml else 0
+if buffer_vertices > 0:
+  buffer_max_error = max_error_for_vertices(float(buffer), buffer_vertices)
+else:
+  buffer_max_error = None
+precompute_buffers = "precompute_buffers" in yml and str(yml["precompute_buffers"][0]) == "True"
+if precompute_buffers and not locations_asset:
+  raise ValueError('precompute_buffers requires locations_asset, the buffered sites ' + 
+                   'are stored in the location table assets')
+
+# buffer radii (in meters) of a buffer sweep, reduced in one pass instead of 
+# `site_buffer` (not present in yml files of older runs)
+if "buffer_sweep" in yml and str(yml["buffer_sweep"][0]).strip() not in ["", "nan"]:
+  buffer_radii = [float(radius) for radius in str(yml["buffer_sweep"][0]).split(",")]
+else:
+  buffer_radii = []
+if len(buffer_radii) > 0 and precompute_buffers:
+  raise ValueError('buffer_sweep can not be combined with precompute_buffers, the location ' + 
+                   'table assets hold the buffers of site_buffer only')
+
+# read the locations of each path-row from the single locations store instead 
+# of its locations_<PR>.csv file (not present in yml files of older runs)
+locations_store = "locations_store" in yml and str(yml["locations_store"][0]) == "True"
+
+# number of scenes per sensor group of each path-row, filled by 
+# plan_site_chunks() when sizing chunks adaptively and by run_pathrow() in 
+# incremental runs
+scene_counts = {}
 
 ##############################################
 ##---- CREATING EE FEATURECOLLECTIONS   ----##
 ##############################################
 
-wrs = (ee.FeatureCollection('projects/ee-ls-c2-srst/assets/WRS2_descending')
-  .filterMetadata('PR', 'equals', pr))
-
-# store path and row for subsetting the stacks so there is not overlap between PR pulls
-w_p = int(str(pr)[:3])
-w_r = int(str(pr)[-3:])
-
-#grab images and apply scaling factors
-l7 = (ee.ImageCollection("LANDSAT/LE07/C02/T1_L2")
-    .filter(ee.Filter.eq("WRS_PATH", w_p))
-    .filter(ee.Filter.eq("WRS_ROW", w_r))
-    .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
-    .filterDate(yml_start, yml_end)
-    .filterDate('1999-05-28', '2019-12-31')) # truncated to reflect drift issues
-l5 = (ee.ImageCollection("LANDSAT/LT05/C02/T1_L2")
-    .filter(ee.Filter.eq("WRS_PATH", w_p))
-    .filter(ee.Filter.eq("WRS_ROW", w_r))
-    .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
-    .filterDate(yml_start, "2011-11-18")) # end of science mission
-l4 = (ee.ImageCollection("LANDSAT/LT04/C02/T1_L2")
-    .filter(ee.Filter.eq("WRS_PATH", w_p))
-    .filter(ee.Filter.eq("WRS_ROW", w_r))
-    .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
-    .filterDate(yml_start, "1993-12-14")) # end of science mission
-    
-# merge collections by image processing groups
-ls457 = ee.ImageCollection(l4.merge(l5).merge(l7))
-    
-# existing band names
-bn457 = (["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B7", 
-  "QA_PIXEL", "SR_ATMOS_OPACITY", "QA_RADSAT", "ST_B6"])
-  
-# new band names
-bns457 = (["Blue", "Green", "Red", "Nir", "Swir1", "Swir2", 
-  "pixel_qa", "opacity_qa", "radsat_qa", "SurfaceTemp"])
-  
-
-
-#grab images and apply scaling factors
-l8 = (ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-    .filter(ee.Filter.eq("WRS_PATH", w_p))
-    .filter(ee.Filter.eq("WRS_ROW", w_r))
-    .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
-    .filterDate(yml_start, yml_end))
-l9 = (ee.ImageCollection("LANDSAT/LC09/C02/T1_L2")
-    .filter(ee.Filter.eq("WRS_PATH", w_p))
-    .filter(ee.Filter.eq("WRS_ROW", w_r))
-    .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
-    .filterDate(yml_start, yml_end))
-
-# merge collections by image processing groups
-ls89 = ee.ImageCollection(l8.merge(l9))
-    
-# existing band names
-bn89 = (["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B6", "SR_B7", 
-  "QA_PIXEL", "SR_QA_AEROSOL", "QA_RADSAT", "ST_B10"])
+# existing and new band names, see summary_bands.py
+bn457 = c2_bands['LS457']
+bns457 = pull_bands['LS457']
+bn89 = c2_bands['LS89']
+bns89 = pull_bands['LS89']
+
+
+def get_pathrow_stacks(pr):
+  """ Get the WRS2 tile and the Landsat image stacks for a path-row
+  
+  Args:
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      
+  Returns:
+      tuple of the WRS2 tile ee.FeatureCollection, the Landsat 4, 5, 7 
+      ee.ImageCollection and the Landsat 8, 9 ee.ImageCollection
+  """
+  wrs = (ee.FeatureCollection('projects/ee-ls-c2-srst/assets/WRS2_descending')
+    .filterMetadata('PR', 'equals', pr))
+  
+  # store path and row for subsetting the stacks so there is not overlap between PR pulls
+  w_p = int(str(pr)[:3])
+  w_r = int(str(pr)[-3:])
+  
+  #grab images and apply scaling factors
+  l7 = (ee.ImageCollection("LANDSAT/LE07/C02/T1_L2")
+      .filter(ee.Filter.eq("WRS_PATH", w_p))
+      .filter(ee.Filter.eq("WRS_ROW", w_r))
+      .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
+      .filterDate(yml_start, yml_end)
+      .filterDate('1999-05-28', '2019-12-31')) # truncated to reflect drift issues
+  l5 = (ee.ImageCollection("LANDSAT/LT05/C02/T1_L2")
+      .filter(ee.Filter.eq("WRS_PATH", w_p))
+      .filter(ee.Filter.eq("WRS_ROW", w_r))
+      .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
+      .filterDate(yml_start, "2011-11-18")) # end of science mission
+  l4 = (ee.ImageCollection("LANDSAT/LT04/C02/T1_L2")
+      .filter(ee.Filter.eq("WRS_PATH", w_p))
+      .filter(ee.Filter.eq("WRS_ROW", w_r))
+      .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
+      .filterDate(yml_start, "1993-12-14")) # end of science mission
+      
+  # merge collections by image processing groups
+  ls457 = ee.ImageCollection(l4.merge(l5).merge(l7))
   
-# new band names
-bns89 = (["Aerosol", "Blue", "Green", "Red", "Nir", "Swir1", "Swir2",
-  "pixel_qa", "aerosol_qa", "radsat_qa", "SurfaceTemp"])
- 
+  #grab images and apply scaling factors
+  l8 = (ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
+      .filter(ee.Filter.eq("WRS_PATH", w_p))
+      .filter(ee.Filter.eq("WRS_ROW", w_r))
+      .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
+      .filterDate(yml_start, yml_end))
+  l9 = (ee.ImageCollection("LANDSAT/LC09/C02/T1_L2")
+      .filter(ee.Filter.eq("WRS_PATH", w_p))
+      .filter(ee.Filter.eq("WRS_ROW", w_r))
+      .filter(ee.Filter.lt("CLOUD_COVER", ee.Number.parse(str(cloud_thresh))))
+      .filterDate(yml_start, yml_end))
+  
+  # merge collections by image processing groups
+  ls89 = ee.ImageCollection(l8.merge(l9))
+  
+  if incremental:
+    ls457 = incremental_stack(ls457, 'LS457', pr)
+    ls89 = incremental_stack(ls89, 'LS89', pr)
+  
+  return wrs, ls457, ls89
+
+
+def incremental_stack(stack, sensor_group, pr):
+  """ Subset a Landsat stack of a path-row to the scenes that the earlier runs 
+  in `previous_run_dates` did not acquire, according to their downloaded 
+  metadata exports (see incremental.py). If none of the earlier runs acquired a 
+  scene of the path-row and sensor group, the full stack is returned.
+  
+  Args:
+      stack: ee.ImageCollection from get_pathrow_stacks()
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      
+  Returns:
+      ee.ImageCollection
+  """
+  acquired = previous_acquisitions(previous_metadata_files(proj, previous_run_dates, 
+                                                           sensor_group, pr), 
+                                   incremental_lookback_days)
+  if acquired is None:
+    print('No earlier ' + sensor_group + ' metadata for tile ' + str(pr) + ', pulling the full record')
+    return stack
+  since, acquired_ids = acquired
+  return new_scenes(stack, since, acquired_ids)
 
 
 ##########################################
@@ -1913,354 +1318,542 @@ bns89 = (["Aerosol", "Blue", "Green", "Red", "Nir", "Swir1", "Swir2",
 ##########################################
 
 # Map the pull function over the 5000 or so created sites, as needed
-def process_subset(df_subset, chunk, chunk_size):
+def process_subset(df_subset, chunk, chunk_size, pr, wrs, ls457, ls89, 
+                   exports=None, part=None, terrain=None):
   """
-  This function processes a subset of the DataFrame.
-  Replace this with your actual processing function.
+  This function processes a subset of the DataFrame, sending the site exports 
+  of one chunk of a path-row to GEE.
+  
+  Args:
+      df_subset: subset of the path-row locations for this chunk
+      chunk: iteration through the dataframe (defined in process chunks)
+      chunk_size: number of sites in chunk
+      pr: WRS2 path-row
+      wrs, ls457, ls89: WRS2 tile and Landsat stacks from get_pathrow_stacks()
+      exports: optional list of (sensor group, DSWE variant) tuples to send, 
+      defaults to all configured exports
+      part: optional part of the chunk, see site_export_description()
+      terrain: optional TerrainCache of the path-row, see pathrow_terrain()
+      
+  Returns:
+      None.
   """
   
-  # Check how many existing tasks are running and take a break of 120 secs if 
-  # it's more than 10, and keep checking to not overload the GEE server
-  maximum_no_of_tasks(10, 120)
-
-  locs_feature = csv_to_eeFeat(df_subset, yml['location_crs'][0], chunk, chunk_size)
+  if exports is None:
+    exports = [(sensor_group, dswe_variant) 
+               for sensor_group in ['LS457', 'LS89'] 
+               for dswe_variant in export_dswe_variants()]
+  
+  # if resuming and every export of this chunk is already running or complete,
+  # skip the chunk entirely
+  chunk_exports = [site_export_description(sensor_group, dswe_variant, pr, chunk, part) 
+                   for sensor_group, dswe_variant in exports]
+  if all(description in completed_exports for description in chunk_exports):
+    print('Skipping chunk ' + str(chunk + 1) + ' at tile ' + str(pr) + ', all exports are already running or complete')
+    return
+  
+  # row range of the chunk in the path-row locations, recorded in the ledger
+  site_range = (int(df_subset.index[0]), int(df_subset.index[-1]) + 1)
+  
+  if locations_asset:
+    # filter the path-row's location table server side, by row so that parts 
+    # of split chunks are selected as well
+    locs_feature = (ee.FeatureCollection(locations_asset_id(locations_asset_folder, pr))
+      .filter(ee.Filter.rangeContains('row', site_range[0], site_range[1] - 1))
+      .map(lambda f: f.set('system:index', f.get('id'))))
+  else:
+    # df_subset only holds the sites of this chunk (or part of a chunk)
+    locs_feature = csv_to_eeFeat(df_subset, yml['location_crs'][0], 0, len(df_subset))
   
   geo = wrs.geometry()
   
   ## get locs feature and buffer ##
-  feat = (locs_feature
-    .filterBounds(geo)
-    .map(dp_buff))
-  
-  ##########################################
-  ##---- LANDSAT 457 ACQUISITION      ----##
-  ##########################################
-  
-  ## pre-process 457 stack
-  #snip the ls data by the geometry of the location points    
-  locs_stack_ls457 = (ls457
-    .filterBounds(feat.geometry()) 
-    # apply fill mask and scaling factors
-    .map(apply_fill_mask_457)
-    .map(apply_scale_factors))
-  
-  # rename bands for ease
-  locs_stack_ls457 = locs_stack_ls457.select(bn457, bns457)
-  
-  # apply masks that require above rename
-  locs_stack_ls457 = (locs_stack_ls457
-    .map(apply_rad_mask))
-  
-  # pull DSWE1 variations as configured
-  if '1' in dswe:
-    # pull DSWE1 and DSWE1 with algal mask if configured
-    if '1a' in dswe:
-      locs_out_457_D1 = locs_stack_ls457.map(lambda image: ref_pull_457_DSWE1(image, feat)).flatten()
-      locs_out_457_D1 = locs_out_457_D1.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_457_D1 = proj+'_site_LS457_C2_SRST_DSWE1_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_457_D1 = (ee.batch.Export.table.toDrive(collection = locs_out_457_D1,
-                                              description = locs_srname_457_D1,
-                                              folder = folder_version,
-                                              fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_opac', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 
-                                              'pCount_swir1_glint', 'pCount_swir2_glint', 
-                                              'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-      #Send next task.                                        
-      locs_dataOut_457_D1.start()
-      print('Task sent: Landsat 4, 5, 7 DSWE 1 acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
-      locs_out_457_D1a = locs_stack_ls457.map(lambda image: ref_pull_457_DSWE1a(image, feat)).flatten()
-      locs_out_457_D1a = locs_out_457_D1a.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_457_D1a = proj+'_site_LS457_C2_SRST_DSWE1a_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_457_D1a = (ee.batch.Export.table.toDrive(collection = locs_out_457_D1a,
-                                              description = locs_srname_457_D1a,
-                                              folder = folder_version,
-                                              fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_opac', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 
-                                              'pCount_swir1_glint', 'pCount_swir2_glint', 
-                                              'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-      #Send next task.                                        
-      locs_dataOut_457_D1a.start()
-      print('Task sent: Landsat 4, 5, 7 DSWE 1a acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
-    
-    else: 
-      # only pull DSWE1
-      locs_out_457_D1 = locs_stack_ls457.map(lambda image: ref_pull_457_DSWE1(image, feat)).flatten()
-      locs_out_457_D1 = locs_out_457_D1.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_457_D1 = proj+'_site_LS457_C2_SRST_DSWE1_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_457_D1 = (ee.batch.Export.table.toDrive(collection = locs_out_457_D1,
-                                              description = locs_srname_457_D1,
-                                              folder = folder_version,
-                                              fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_opac', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 
-                                              'pCount_swir1_glint', 'pCount_swir2_glint', 
-                                              'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-      #Send next task.                                        
-      locs_dataOut_457_D1.start()
-      print('Task sent: Landsat 4, 5, 7 DSWE 1 acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
-    
-  else: print('Not configured to acquire DSWE 1 or DSWE 1a stack for Landsat 4, 5, 7 for site configuration')
+  feat = locs_feature.filterBounds(geo)
+  # the sites of the location table asset are already buffered if 
+  # `precompute_buffers` is set
+  if not precompute_buffers:
+    feat = buffer_locations(feat)
   
-  # pull DSWE3 variants if configured
-  if '3' in dswe:
-    # pull DSWE3
-    locs_out_457_D3 = locs_stack_ls457.map(lambda image: ref_pull_457_DSWE3(image, feat)).flatten()
-    locs_out_457_D3 = locs_out_457_D3.filter(ee.Filter.notNull(['med_Blue']))
-    locs_srname_457_D3 = proj+'_site_LS457_C2_SRST_DSWE3_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-    locs_dataOut_457_D3 = (ee.batch.Export.table.toDrive(collection = locs_out_457_D3,
-                                            description = locs_srname_457_D3,
-                                            folder = folder_version,
-                                            fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_opac', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 
-                                              'pCount_swir1_glint', 'pCount_swir2_glint', 
-                                              'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-    #Send next task.                                        
-    locs_dataOut_457_D3.start()
-    print('Task sent: Landsat 4, 5, 7 DSWE 3 acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
-    
-  else: print('Not configured to acquire DSWE 3 stack for Landsat 4, 5, 7 for site configuration')
-  
-  #########################################
-  ##---- LANDSAT 89 SITE ACQUISITION ----##
-  #########################################
-  
-  # pre-process the ls89 stack
-  # snip the ls data by the geometry of the location points    
-  locs_stack_ls89 = (ls89
-    .filterBounds(feat.geometry()) 
-    # apply fill mask and scaling factors
-    .map(apply_fill_mask_89)
-    .map(apply_scale_factors))
-    
-  # rename bands for ease
-  locs_stack_ls89 = locs_stack_ls89.select(bn89, bns89)
+  # pre-processing and naming of each sensor group's stack
+  stacks = {'LS457': (ls457, apply_fill_mask_457, bn457, bns457),
+            'LS89': (ls89, apply_fill_mask_89, bn89, bns89)}
+  sensor_names = {'LS457': 'Landsat 4, 5, 7', 'LS89': 'Landsat 8, 9'}
   
-  # apply masks that require above rename
-  locs_stack_ls89 = (locs_stack_ls89
-    .map(apply_rad_mask))
+  for sensor_group in ['LS457', 'LS89']:
+    dswe_variants = [variant for group, variant in exports if group == sensor_group]
+    if len(dswe_variants) == 0:
+      continue
+    stack, apply_fill_mask, bn, bns = stacks[sensor_group]
     
-  if '1' in dswe:
-    if '1a' in dswe:
-      locs_out_89_D1 = locs_stack_ls89.map(lambda image: ref_pull_89_DSWE1(image, feat)).flatten()
-      locs_out_89_D1 = locs_out_89_D1.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_89_D1 = proj+'_site_LS89_C2_SRST_DSWE1_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_89_D1 = (ee.batch.Export.table.toDrive(collection = locs_out_89_D1,
-                                              description = locs_srname_89_D1,
+    ## pre-process stack
+    # snip the ls data by the geometry of the location points, which also drops
+    # the images that would not have any site to reduce (images that only touch
+    # the bounding box are reduced over no sites, see sites_in_footprint())
+    if spatial_chunks:
+      # the sites of a chunk cover a compact area, so their bounding box is 
+      # nearly as selective and much cheaper than the union of the buffers
+      locs_stack = stack.filterBounds(chunk_bounds(df_subset, yml['location_crs'][0]))
+    else:
+      locs_stack = stack.filterBounds(feat.geometry())
+    if cloud_prefilter:
+      # drop the images where every site is under cloud before the full pull
+      locs_stack = images_with_clear_sites(locs_stack, feat, prefilter_scale, prefilter_min_clear)
+    locs_stack = (locs_stack
+      # apply fill mask and scaling factors
+      .map(apply_fill_mask)
+      .map(apply_scale_factors)
+      # rename bands for ease
+      .select(bn, bns)
+      # apply masks that require above rename
+      .map(apply_rad_mask))
+    
+    for dswe_variant in dswe_variants:
+      locs_out = (locs_stack
+        .map(lambda image: ref_pull(image, feat, geo, sensor_group, dswe_variant, terrain))
+        .flatten()
+        .filter(site_row_filter(dswe_variant)))
+      locs_srname = site_export_description(sensor_group, dswe_variant, pr, chunk, part)
+      locs_dataOut = (ee.batch.Export.table.toDrive(collection = locs_out,
+                                              description = locs_srname,
                                               folder = folder_version,
                                               fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_aero', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_aero_zero', 'pCount_aero_thresh',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 'pCount_swir1_glint',
-                                              'pCount_swir2_glint', 'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
+                                              selectors = site_export_selectors(sensor_group, dswe_variant)))
       #Send next task.                                        
-      locs_dataOut_89_D1.start()
-      print('Task sent: Landsat 8, 9 DSWE 1  acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
+      if start_export(locs_dataOut, locs_srname, pr, chunk, dswe_variant, sensor_group, site_range):
+        dswe_label = ', '.join(variant.replace('DSWE', 'DSWE ') for variant, _ in summary_variants(dswe_variant))
+        print('Task sent: ' + sensor_names[sensor_group] + ' ' + dswe_label + 
+              ' acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
+
+
+def pathrow_terrain(df):
+  """ Load the terrain of a path-row's sites once for all of its chunks and 
+  images, if `terrain_cache` is set
+  
+  Args:
+      df: locations of the path-row with Latitude and Longitude
       
-      locs_out_89_D1a = locs_stack_ls89.map(lambda image: ref_pull_89_DSWE1a(image, feat)).flatten()
-      locs_out_89_D1a = locs_out_89_D1a.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_89_D1a = proj+'_site_LS89_C2_SRST_DSWE1a_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_89_D1a = (ee.batch.Export.table.toDrive(collection = locs_out_89_D1a,
-                                              description = locs_srname_89_D1a,
-                                              folder = folder_version,
-                                              fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_aero', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_aero_zero', 'pCount_aero_thresh',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 'pCount_swir1_glint',
-                                              'pCount_swir2_glint', 'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-      #Send next task.                                        
-      locs_dataOut_89_D1a.start()
-      print('Task sent: Landsat 8, 9 DSWE 1a acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
+  Returns:
+      TerrainCache of the bounding box of the buffered sites, or None
+  """
+  if not terrain_cache or len(df) == 0:
+    return None
+  return TerrainCache(chunk_bounds(df, yml['location_crs'][0]), terrain_bin_degrees)
+
+
+def plan_site_chunks(pr, n_sites, ls457, ls89):
+  """ Get the row ranges of the site chunks of a path-row. By default, chunks 
+  are `site_chunk_size` sites. If `adaptive_chunks` is set in the yml, chunks 
+  are sized so that each export takes about `chunk_target_minutes`, estimated 
+  from the number of scenes in the path-row's stacks and the run time of past 
+  exports recorded in the task ledger (see chunk_planner.py). Chunks already 
+  recorded in the ledger for this run are kept, so that a resumed run skips 
+  the same chunks.
+  
+  Args:
+      pr: WRS2 path-row
+      n_sites: number of locations in the path-row
+      ls457, ls89: Landsat stacks from get_pathrow_stacks()
       
-    else:
-      locs_out_89_D1 = locs_stack_ls89.map(lambda image: ref_pull_89_DSWE1(image, feat)).flatten()
-      locs_out_89_D1 = locs_out_89_D1.filter(ee.Filter.notNull(['med_Blue']))
-      locs_srname_89_D1 = proj+'_site_LS89_C2_SRST_DSWE1_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-      locs_dataOut_89_D1 = (ee.batch.Export.table.toDrive(collection = locs_out_89_D1,
-                                              description = locs_srname_89_D1,
-                                              folder = folder_version,
-                                              fileFormat = 'csv',
-                                              selectors = ['system:index',
-                                              'med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_aero', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_aero_zero', 'pCount_aero_thresh',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 'pCount_swir1_glint',
-                                              'pCount_swir2_glint', 'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-      #Send next task.                                        
-      locs_dataOut_89_D1.start()
-      print('Task sent: Landsat 8, 9 DSWE 1 acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
+  Returns:
+      list of (start, end) row ranges of the locations, one per chunk
+  """
+  if not adaptive_chunks:
+    return [(start, min(start + site_chunk_size, n_sites)) 
+            for start in range(0, n_sites, site_chunk_size)]
   
-  else: print('Not configured to acquire DSWE 1 stack for Landsat 8, 9 for site configuration')
+  ledger = get_task_ledger()
+  # the scenes may already have been counted by run_pathrow() (incremental runs)
+  if pr not in scene_counts:
+    scene_counts[pr] = ee.Dictionary({'LS457': ls457.size(), 'LS89': ls89.size()}).getInfo()
+  n_scenes = scene_counts[pr]
   
-  if '3' in dswe:
-    locs_out_89_D3 = locs_stack_ls89.map(lambda image: ref_pull_89_DSWE3(image, feat)).flatten()
-    locs_out_89_D3 = locs_out_89_D3.filter(ee.Filter.notNull(['med_Blue']))
-    locs_srname_89_D3 = proj+'_site_LS89_C2_SRST_DSWE3_'+str(pr)+'_'+str(chunk)+'_v'+run_date
-    locs_dataOut_89_D3 = (ee.batch.Export.table.toDrive(collection = locs_out_89_D3,
-                                            description = locs_srname_89_D3,
-                                            folder = folder_version,
-                                            fileFormat = 'csv',
-                                            selectors = ['system:index',
-                                              'med_Aerosol', 'med_Blue', 'med_Green', 'med_Red', 'med_Nir', 'med_Swir1', 'med_Swir2', 
-                                              'med_SurfaceTemp', 'min_SurfaceTemp',
-                                              'sd_Aerosol', 'sd_Blue', 'sd_Green', 'sd_Red', 'sd_Nir', 'sd_Swir1', 'sd_Swir2', 'sd_SurfaceTemp',
-                                              'mean_Aerosol', 'mean_Blue', 'mean_Green', 'mean_Red', 'mean_Nir', 'mean_Swir1', 'mean_Swir2', 
-                                              'mean_SurfaceTemp',
-                                              'pCount_dswe_gt0', 'pCount_dswe1', 'pCount_dswe3', 'pCount_dswe1a',
-                                              'pCount_high_aero', 'pCount_unreal_val', 'pCount_sun_glint', 'pCount_ir_glint',
-                                              'pCount_aero_zero', 'pCount_aero_thresh',
-                                              'pCount_blue_zero', 'pCount_blue_thresh', 'pCount_green_zero', 'pCount_green_thresh', 
-                                              'pCount_red_zero', 'pCount_red_thresh', 'pCount_nir_zero', 'pCount_nir_thresh', 
-                                              'pCount_swir1_zero', 'pCount_swir1_thresh', 'pCount_swir2_zero', 'pCount_swir2_thresh', 
-                                              'pCount_blue_glint', 'pCount_green_glint', 'pCount_red_glint', 'pCount_nir_glint', 'pCount_swir1_glint',
-                                              'pCount_swir2_glint', 'pCount_nir_ir_glint', 'pCount_swir1_ir_glint', 'pCount_swir2_ir_glint',
-                                              'prop_clouds','prop_hillShadow','mean_hillShade']))
-    #Send next task.                                        
-    locs_dataOut_89_D3.start()
-    print('Task sent: Landsat 8, 9 DSWE 3 acquisitions for site configuration at tile ' + str(pr) + ' chunk ' + str(chunk + 1))
-  
-  else: print('Not configured to acquire DSWE 3 stack for Landsat 8,9 for sites')
-
-
-def process_dataframe_in_chunks(df, chunk_size=5000):
+  chunks = recorded_chunks(ledger.tasks(run_date = run_date, pathrow = pr)) or []
+  start = chunks[-1][1] if len(chunks) > 0 else 0
+  if start < n_sites:
+    seconds_per_site_scene, eecu_per_site_scene = calibrate_cost(ledger.tasks(states = ['COMPLETED']))
+    chunks += [(start + chunk_start, start + chunk_end) 
+               for chunk_start, chunk_end in plan_chunks(n_sites - start, n_scenes, 
+                                                         seconds_per_site_scene, 
+                                                         chunk_target_seconds, 
+                                                         max_sites = site_chunk_size)]
+    # report the estimated cost of the largest chunk
+    est_sites = max(chunk_end - chunk_start for chunk_start, chunk_end in chunks)
+    est_site_scenes = est_sites * max(n_scenes.values())
+    est_eecu = ('' if eecu_per_site_scene is None 
+                else ', ' + str(round(est_site_scenes * eecu_per_site_scene)) + ' EECU-seconds')
+    print('Tile ' + str(pr) + ': ' + str(len(chunks)) + ' chunks of up to ' + str(est_sites) + 
+          ' sites, ' + str(n_scenes['LS457']) + ' LS457 and ' + str(n_scenes['LS89']) + 
+          ' LS89 scenes, estimated ' + str(round(est_site_scenes * seconds_per_site_scene / 60)) + 
+          ' minutes per export' + est_eecu)
+  return chunks
+
+
+def upload_locations_asset(df, pr, chunks):
+  """ Export the locations of a path-row to a table asset in the run's asset 
+  folder (with the columns 'id', 'WRS2_PR', 'chunk' and 'row'), and wait for the 
+  export to finish so that the site exports can read from it. Skipped if the 
+  asset already exists, e.g. when resuming a run. If `precompute_buffers` is 
+  set in the yml, the sites are buffered once in the UTM zone of their mean 
+  coordinates (see utm_epsg() in buffers.py) and stored as polygons, which all 
+  chunks, sensor groups and DSWE variants then reuse.
+  
+  Args:
+      df: locations of the path-row
+      pr: WRS2 path-row
+      chunks: (start, end) row ranges of the site chunks, see plan_site_chunks()
+      
+  Returns:
+      None.
+  """
+  if asset_exists(locations_asset_id(locations_asset_folder, pr)):
+    return
+  ensure_folder(locations_asset_folder)
+  description = proj + '_locations_' + str(pr) + '_v' + run_date
+  if precompute_buffers:
+    coords = df[['Longitude', 'Latitude']].dropna().astype(float)
+    task = locations_export(df, pr, chunks, yml['location_crs'][0], 
+                            locations_asset_folder, description, 
+                            buffer_distance = float(buffer), 
+                            max_error = buffer_max_error, 
+                            buffer_proj = utm_projection(coords['Longitude'], 
+                                                         coords['Latitude']))
+  else:
+    task = locations_export(df, pr, chunks, yml['location_crs'][0], 
+                            locations_asset_folder, description)
+  monitor = get_task_monitor()
+  if start_export(task, description, pr, None, None, None):
+    task_id = task.id
+    print('Task sent: location table asset for tile ' + str(pr))
+  else:
+    # already running from an earlier attempt (resume mode), wait for that task
+    monitor.resync()
+    task_id = next((task_id for task_id, task_description, state in monitor.snapshot() 
+                    if task_description == description and state in ACTIVE_STATES), None)
+    if task_id is None:
+      return
+  state = monitor.wait_for_tasks([task_id])[task_id]
+  if state != 'COMPLETED':
+    raise RuntimeError('Location table asset export for tile ' + str(pr) + ' ended as ' + state)
+
+
+def process_dataframe_in_chunks(df, pr, wrs, ls457, ls89, chunk_size=5000, chunks=None, 
+                                terrain=None):
     """
     Process a DataFrame in chunks of specified size.
     
     Args:
     df (pandas.DataFrame): The input DataFrame
+    pr (str): WRS2 path-row of the locations
+    wrs, ls457, ls89: WRS2 tile and Landsat stacks from get_pathrow_stacks()
     chunk_size (int): The number of rows in each chunk (default: 5000)
+    chunks (list): optional (start, end) row ranges of the chunks, e.g. from 
+    plan_site_chunks(), which take precedence over chunk_size
+    terrain (TerrainCache): optional terrain of the path-row, shared by all 
+    chunks, see pathrow_terrain()
     
     Returns:
     list: A list of results from processing each chunk
     """
 
-    # Calculate the number of chunks
-    num_chunks = len(df) // chunk_size + (1 if len(df) % chunk_size != 0 else 0)
+    if chunks is None:
+        chunks = [(start, min(start + chunk_size, len(df))) 
+                  for start in range(0, len(df), chunk_size)]
+    num_chunks = len(chunks)
     
-    for i in range(num_chunks):
-        # Calculate start and end indices for the current chunk
-        start_idx = i * chunk_size
-        end_idx = min((i + 1) * chunk_size, len(df))
-        
+    for i, (start_idx, end_idx) in enumerate(chunks):
         # Subset the DataFrame
         df_subset = df.iloc[start_idx:end_idx]
         
         # Process the subset and store the result
-        result = process_subset(df_subset, i, chunk_size)
+        result = process_subset(df_subset, i, end_idx - start_idx, pr, wrs, ls457, ls89, 
+                                terrain = terrain)
 
-        print(f"Processed chunk {i+1}/{num_chunks}")
+        print(f"Processed chunk {i+1}/{num_chunks} of tile {pr}")
     
     return ()
 
-# and then actualy process the chunks!
-process_dataframe_in_chunks(locations_subset)
-   
-
-##############################################
-##---- LANDSAT 457 METADATA ACQUISITION ----##
-##############################################
 
-## get metadata ##
-meta_srname_457 = proj+"_metadata_LS457_C2_"+str(pr)+"_v"+run_date
-meta_dataOut_457 = (ee.batch.Export.table.toDrive(collection = ls457,
-                                        description = meta_srname_457,
-                                        folder = folder_version,
-                                        fileFormat = "csv"))
-
-#Send next task.                                        
-meta_dataOut_457.start()
+def metadata_stack(stack, df, chunks):
+  """ Subset a Landsat stack to the images of the metadata export. If 
+  `lean_metadata` is set in the yml, only the images that intersect the 
+  bounding box of one of the site chunks (see chunk_bounds()) are kept, which 
+  covers the images of all chunks' site exports without building the union of 
+  the path-row's site buffers.
+  
+  Args:
+      stack: Landsat stack from get_pathrow_stacks()
+      df: locations of the path-row pulled by this run
+      chunks: (start, end) row ranges of the site chunks, see plan_site_chunks()
+      
+  Returns:
+      ee.ImageCollection
+  """
+  if not lean_metadata:
+    return stack
+  bounds = [ee.Filter.bounds(chunk_bounds(df.iloc[start:end], yml['location_crs'][0])) 
+            for start, end in (chunks or [(0, len(df))])]
+  if len(bounds) == 1:
+    return stack.filter(bounds[0])
+  return stack.filter(ee.Filter.Or(*bounds))
+
+
+def metadata_selectors(sensor_group):
+  """ Columns of a metadata export: the image properties in METADATA_PROPERTIES
+  if `lean_metadata` is set in the yml, otherwise None (all properties)
+  """
+  if not lean_metadata:
+    return None
+  return METADATA_PROPERTIES[sensor_group]
 
 
-#############################################
-##---- LANDSAT 89 METADATA ACQUISITION ----##
-#############################################
+def export_metadata(pr, ls457, ls89, df=None, chunks=None):
+  """ Send the Landsat 4, 5, 7 and Landsat 8, 9 metadata exports of a path-row.
+  If `lean_metadata` is set in the yml, only the images used by the site 
+  exports and the image properties in METADATA_PROPERTIES are exported, and if 
+  `metadata_sidecar` is set, these are also written to a local feather file 
+  (see lean_metadata.py).
+  
+  Args:
+      pr: WRS2 path-row
+      ls457, ls89: Landsat stacks from get_pathrow_stacks()
+      df: locations of the path-row pulled by this run, only used if 
+      `lean_metadata` is set
+      chunks: (start, end) row ranges of the site chunks of `df`, only used 
+      if `lean_metadata` is set
+      
+  Returns:
+      None.
+  """
+  ##############################################
+  ##---- LANDSAT 457 METADATA ACQUISITION ----##
+  ##############################################
+  
+  ## get metadata ##
+  meta_srname_457 = proj+"_metadata_LS457_C2_"+str(pr)+"_v"+run_date
+  meta_457 = metadata_stack(ls457, df, chunks)
+  meta_dataOut_457 = (ee.batch.Export.table.toDrive(collection = meta_457,
+                                          description = meta_srname_457,
+                                          folder = folder_version,
+                                          fileFormat = "csv",
+                                          selectors = metadata_selectors('LS457')))
+  
+  #Send next task.                                        
+  if start_export(meta_dataOut_457, meta_srname_457, pr, None, None, 'LS457') and metadata_sidecar:
+    write_metadata_sidecar(meta_457, METADATA_PROPERTIES['LS457'], meta_srname_457, run_date)
+  
+  
+  #############################################
+  ##---- LANDSAT 89 METADATA ACQUISITION ----##
+  #############################################
+  
+  
+  ## get metadata ##
+  meta_srname_89 = proj+"_metadata_LS89_C2_"+str(pr)+"_v"+run_date
+  meta_89 = metadata_stack(ls89, df, chunks)
+  meta_dataOut_89 = (ee.batch.Export.table.toDrive(collection = meta_89,
+                                          description = meta_srname_89,
+                                          folder = folder_version,
+                                          fileFormat = "csv",
+                                          selectors = metadata_selectors('LS89')))
+  
+  #Send next task.                                        
+  if start_export(meta_dataOut_89, meta_srname_89, pr, None, None, 'LS89') and metadata_sidecar:
+    write_metadata_sidecar(meta_89, METADATA_PROPERTIES['LS89'], meta_srname_89, run_date)
+  
+  print("Task sent: metadata acquisition for tile " +str(pr))
 
 
-## get metadata ##
-meta_srname_89 = proj+"_metadata_LS89_C2_"+str(pr)+"_v"+run_date
-meta_dataOut_89 = (ee.batch.Export.table.toDrive(collection = ls89,
-                                        description = meta_srname_89,
-                                        folder = folder_version,
-                                        fileFormat = "csv"))
+def pathrow_locations(pr, record_history=False):
+  """ Read the locations of a path-row pulled by this run (from its locations 
+  file, or from the locations store if `locations_store` is set in the yml, see 
+  locations_store.py), in the row order the chunks are taken from (file order, 
+  or along a Hilbert curve if `spatial_chunks` is set in the yml). Every site 
+  is pulled, except in site_diff runs, where only the sites that are new or 
+  moved since the latest previous run are pulled (see site_diff.py).
+  
+  Args:
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      record_history: whether to write the site history of the path-row for 
+      this run, which records the run that holds the history of each site
+      
+  Returns:
+      pandas.DataFrame of the locations
+  """
+  if locations_store:
+    # only the path-row's rows of the memory-mapped store are read
+    locations = read_pathrow_locations(pr)
+  else:
+    # create file name of location data
+    locs_fn = os.path.join("b_pull_Landsat_SRST_poi/out/locations/", ("locations_" + pr + ".csv"))
+    
+    # read in locations file
+    locations = read_csv(locs_fn)
+  
+  previous_history = None
+  if site_diff:
+    previous_history = read_site_history(max(previous_run_dates), pr)
+    if previous_history is None and record_history:
+      print('No site history of run ' + max(previous_run_dates) + ' for tile ' + str(pr) + ', pulling all sites')
+  history = site_history(locations, run_date, previous_history)
+  if record_history:
+    write_site_history(history, run_date, pr)
+  if site_diff:
+    locations = locations[(history['change'] != 'unchanged').to_numpy()].reset_index(drop = True)
+  if spatial_chunks:
+    # chunks are runs of consecutive rows, so order the sites along a Hilbert 
+    # curve to make each chunk cover a compact area
+    order = hilbert_order(locations['Longitude'].astype(float).tolist(), 
+                          locations['Latitude'].astype(float).tolist())
+    locations = locations.iloc[order].reset_index(drop = True)
+  return locations
+
+
+def run_pathrow(pr):
+  """ Send all site and metadata exports for a single path-row. The config 
+  variables are read once when this module is loaded, so this can be called 
+  for many path-rows (including from several threads, see 
+  run_GEE_multi_pathrow.py) without re-initializing Earth Engine.
+  
+  Args:
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      
+  Returns:
+      None.
+  """
+  pr = str(pr).strip()
+  
+  locations_subset = pathrow_locations(pr, record_history = True)
+  if site_diff:
+    if len(locations_subset) == 0:
+      print('No new or moved sites at tile ' + str(pr) + ' since run ' + max(previous_run_dates) + ', skipping')
+      return
+    print('Tile ' + str(pr) + ': ' + str(len(locations_subset)) + ' new or moved sites')
+  
+  wrs, ls457, ls89 = get_pathrow_stacks(pr)
+  
+  if incremental:
+    scene_counts[pr] = ee.Dictionary({'LS457': ls457.size(), 'LS89': ls89.size()}).getInfo()
+    if sum(scene_counts[pr].values()) == 0:
+      print('No new scenes at tile ' + str(pr) + ' since the earlier runs, skipping')
+      return
+  
+  chunks = plan_site_chunks(pr, len(locations_subset), ls457, ls89)
+  
+  if locations_asset:
+    upload_locations_asset(locations_subset, pr, chunks)
+  
+  # and then actualy process the chunks!
+  process_dataframe_in_chunks(locations_subset, pr, wrs, ls457, ls89, chunks = chunks, 
+                              terrain = pathrow_terrain(locations_subset))
+  
+  export_metadata(pr, ls457, ls89, locations_subset, chunks)
 
-#Send next task.                                        
-meta_dataOut_89.start()
 
-print("Task sent: metadata acquisition for tile " +str(pr))
+def chunk_part(df_subset, ls457, ls89, part=None):
+  """ Select the sites or the time window of a part of a split chunk
+  
+  Args:
+      df_subset: locations of the chunk
+      ls457, ls89: Landsat stacks of the path-row from get_pathrow_stacks()
+      part: part of the chunk, see site_export_description(). 'sIofN' is the 
+      I-th of N groups of the chunk's sites, 'tIofN' the I-th of N windows of 
+      the time range of the pull
+      
+  Returns:
+      tuple of the locations and the two Landsat stacks of the part
+  """
+  if part is None:
+    return df_subset, ls457, ls89
+  match = re.match(r'([st])(\d+)of(\d+)$', part)
+  i, n_parts = int(match.group(2)) - 1, int(match.group(3))
+  if match.group(1) == 's':
+    part_size = math.ceil(len(df_subset) / n_parts)
+    return df_subset.iloc[i * part_size:(i + 1) * part_size], ls457, ls89
+  start = datetime.strptime(yml_start, "%Y-%m-%d")
+  window = (datetime.strptime(yml_end, "%Y-%m-%d") - start) / n_parts
+  part_start = (start + window * i).strftime("%Y-%m-%d")
+  # the end date is exclusive, as in get_pathrow_stacks()
+  if i == n_parts - 1:
+    part_end = yml_end
+  else:
+    part_end = (start + window * (i + 1)).strftime("%Y-%m-%d")
+  return df_subset, ls457.filterDate(part_start, part_end), ls89.filterDate(part_start, part_end)
+
+
+def resubmit_export(description, split=False, n_parts=2):
+  """ Resubmit a failed site export. If `split` is True, the export is sent as 
+  `n_parts` smaller tasks: the chunk's sites are divided into `n_parts` 
+  groups, or, if the chunk has fewer than `n_parts` * 100 sites, the time 
+  window of the pull is divided instead (see chunk_part()). Exports that are 
+  already a part of a split chunk are sent again with the sites and time 
+  window of the part, and not split again.
+  
+  Args:
+      description: description of the failed export
+      split: boolean; whether to send the export as smaller tasks (for 
+      exports that failed because of memory limits or time outs)
+      n_parts: number of tasks to split the export into
+      
+  Returns:
+      list of the descriptions of the resubmitted exports, empty if the 
+      description is not a site export of this run
+  """
+  export = parse_site_export_description(description)
+  if export is None:
+    return []
+  pr = export['pr']
+  chunk = export['chunk']
+  
+  locations = pathrow_locations(pr)
+  # use the chunk ranges recorded in the ledger (chunks may have been sized 
+  # adaptively), falling back to fixed chunks
+  chunks = recorded_chunks(get_task_ledger().tasks(run_date = run_date, pathrow = pr))
+  if chunks is not None and chunk < len(chunks):
+    chunk_start, chunk_end = chunks[chunk]
+  else:
+    chunk_start, chunk_end = chunk * site_chunk_size, (chunk + 1) * site_chunk_size
+  df_subset = locations.iloc[chunk_start:chunk_end]
+  
+  wrs, ls457, ls89 = get_pathrow_stacks(pr)
+  exports = [(export['sensor_group'], export['dswe_variant'])]
+  # the terrain of the whole path-row, as in the original export
+  terrain = pathrow_terrain(locations)
+  
+  if export['part'] is not None:
+    # parts of a split chunk are sent again with their sites and time window
+    parts = [export['part']]
+  elif split:
+    # send fewer sites per task, or a shorter time window for small chunks
+    kind = 's' if len(df_subset) >= n_parts * 100 else 't'
+    parts = [kind + str(i + 1) + 'of' + str(n_parts) for i in range(n_parts)]
+  else:
+    parts = [None]
+  
+  resubmitted = []
+  for part in parts:
+    part_subset, part_457, part_89 = chunk_part(df_subset, ls457, ls89, part)
+    process_subset(part_subset, chunk, len(part_subset), pr, wrs, part_457, part_89, 
+                   exports, part, terrain)
+    resubmitted.append(site_export_description(*exports[0], pr, chunk, part))
+  return resubmitted
+
+
+def main(pr=None):
+  """ Send all site and metadata exports of a path-row. Called explicitly after 
+  the module is loaded, by run_GEE_per_pathrow.R (after `source_python()`) 
+  and by run_GEE_multi_pathrow.py, so that loading the module only reads the 
+  config and defines the functions.
+  
+  Args:
+      pr: WRS2 path-row as a 6-character string (PPPRRR), defaults to the 
+      current path-row written by run_GEE_per_pathrow.R
+      
+  Returns:
+      None.
+  """
+  if pr is None:
+    # get current tile
+    with open("b_pull_Landsat_SRST_poi/out/current_pathrow.txt", "r") as file:
+      pr = file.read()
+  
+  run_pathrow(pr)
@@ -0,0 +1,98 @@
+import os
+
+from pandas import read_csv
+
+# folder of the per-run site histories, relative to the repository root
+HISTORY_FOLDER = "b_pull_Landsat_SRST_poi/out/locations/"
+
+# sites whose coordinates changed by more than this (in the units of the
+# location CRS) since the previous run are treated as moved
+COORD_TOLERANCE = 1e-6
+
+HISTORY_COLUMNS = ["id", "Latitude", "Longitude", "history_run", "change"]
+
+
+def site_history_file(run_date, pr, folder=HISTORY_FOLDER):
+  """ File path of the site history of a path-row for a run
+
+  Args:
+      run_date: run date of the pull
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      folder: folder of the site histories
+
+  Returns:
+      file path
+  """
+  return os.path.join(folder, "v" + run_date, "site_history_" + pr + ".csv")
+
+
+def read_site_history(run_date, pr, folder=HISTORY_FOLDER):
+  """ Read the site history of a path-row written by an earlier run
+
+  Args:
+      run_date: run date of the earlier run
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      folder: folder of the site histories
+
+  Returns:
+      pandas.DataFrame with HISTORY_COLUMNS, or None if the run did not write
+      one for the path-row
+  """
+  fn = site_history_file(run_date, pr, folder)
+  if not os.path.exists(fn):
+    return None
+  return read_csv(fn, dtype = {"id": str, "history_run": str})
+
+
+def site_history(locations, run_date, previous=None, tolerance=COORD_TOLERANCE):
+  """ Record which run holds the acquisition history of each site. Sites of
+  the previous run's history with the same coordinates keep the run they were
+  recorded in; new sites and sites that moved are assigned to `run_date`.
+
+  Args:
+      locations: pandas.DataFrame of the path-row locations with the columns
+      'id', 'Latitude' and 'Longitude'
+      run_date: run date of the current run
+      previous: site history of the previous run, see read_site_history(), or
+      None if all sites are pulled in this run
+      tolerance: coordinate difference above which a site has moved
+
+  Returns:
+      pandas.DataFrame with HISTORY_COLUMNS, one row per location (in the
+      order of `locations`); 'change' is 'new', 'moved' or 'unchanged'
+  """
+  history = locations[["id", "Latitude", "Longitude"]].copy()
+  history["id"] = history["id"].astype(str)
+  history["history_run"] = run_date
+  history["change"] = "new"
+  if previous is None:
+    return history[HISTORY_COLUMNS]
+  previous = previous.drop_duplicates(subset = "id").set_index("id")
+  # previous coordinates and run of each location, NaN for new sites
+  prev = previous.reindex(history["id"])
+  prev.index = history.index
+  known = prev["history_run"].notna()
+  same_place = (((prev["Latitude"] - history["Latitude"]).abs() <= tolerance) &
+                ((prev["Longitude"] - history["Longitude"]).abs() <= tolerance))
+  history.loc[known & ~same_place, "change"] = "moved"
+  history.loc[known & same_place, "change"] = "unchanged"
+  history.loc[known & same_place, "history_run"] = prev["history_run"]
+  return history[HISTORY_COLUMNS]
+
+
+def write_site_history(history, run_date, pr, folder=HISTORY_FOLDER):
+  """ Write the site history of a path-row for a run
+
+  Args:
+      history: output of site_history()
+      run_date: run date of the current run
+      pr: WRS2 path-row as a 6-character string (PPPRRR)
+      folder: folder of the site histories
+
+  Returns:
+      file path of the written history
+  """
+  fn = site_history_file(run_date, pr, folder)
+  os.makedirs(os.path.dirname(fn), exist_ok = True)
+  history.to_csv(fn, index = False)
+  return fn
@@ -0,0 +1,111 @@
+# Names of the bands summarized per site and of the resulting export columns,
+# shared by the Earth Engine pull (run_GEE_per_pathrow.py) and the local NumPy
+# pipeline (local_pipeline.py)
+
+# Collection 2 Level 2 band names read per sensor group
+c2_bands = {'LS457': ["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B7", 
+                      "QA_PIXEL", "SR_ATMOS_OPACITY", "QA_RADSAT", "ST_B6"],
+            'LS89': ["SR_B1", "SR_B2", "SR_B3", "SR_B4", "SR_B5", "SR_B6", "SR_B7", 
+                     "QA_PIXEL", "SR_QA_AEROSOL", "QA_RADSAT", "ST_B10"]}
+
+# names the Collection 2 bands are renamed to, in the same order
+pull_bands = {'LS457': ["Blue", "Green", "Red", "Nir", "Swir1", "Swir2", 
+                        "pixel_qa", "opacity_qa", "radsat_qa", "SurfaceTemp"],
+              'LS89': ["Aerosol", "Blue", "Green", "Red", "Nir", "Swir1", "Swir2",
+                       "pixel_qa", "aerosol_qa", "radsat_qa", "SurfaceTemp"]}
+
+# Landsat surface reflectance bands summarized per sensor group
+sr_bands = {'LS457': ['Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2'],
+            'LS89': ['Aerosol', 'Blue', 'Green', 'Red', 'Nir', 'Swir1', 'Swir2']}
+
+# name of the count of pixels failing the atmospheric mask per sensor group
+atmos_flag = {'LS457': 'high_opac', 'LS89': 'high_aero'}
+
+# band name prefixes of the per-band flags
+flag_prefix = {'Aerosol': 'aero', 'Blue': 'blue', 'Green': 'green', 'Red': 'red',
+               'Nir': 'nir', 'Swir1': 'swir1', 'Swir2': 'swir2'}
+
+# DSWE variant of the combined export of all configured DSWE variants, and the
+# prefixes of the variant-specific columns in the combined export
+combined_dswe = 'DSWEmulti'
+dswe_prefix = {'DSWE1': 'd1_', 'DSWE1a': 'd1a_', 'DSWE3': 'd3_'}
+
+
+def flag_band_names(sensor_group):
+  """ List the per-band flag names (e.g. 'blue_zero', 'nir_ir_glint') of a 
+  sensor group, in export order
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      
+  Returns:
+      list of band names
+  """
+  bands = sr_bands[sensor_group]
+  names = []
+  for band in bands:
+    names += [flag_prefix[band] + '_zero', flag_prefix[band] + '_thresh']
+  names += [flag_prefix[band] + '_glint' for band in bands if band != 'Aerosol']
+  names += [flag_prefix[band] + '_ir_glint' for band in ['Nir', 'Swir1', 'Swir2']]
+  return names
+
+
+def shared_count_names(sensor_group):
+  """ List the bands counted per site (exported as pCount_<band>) that do not 
+  depend on the DSWE variant, in export order
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      
+  Returns:
+      list of band names
+  """
+  return ['dswe_gt0', 'dswe1', 'dswe3', 'dswe1a', atmos_flag[sensor_group], 
+          'unreal_val', 'sun_glint', 'ir_glint']
+
+
+def band_groups(sensor_group, prefixes):
+  """ List the band groups summarized per site and the reducer of each group. 
+  The variant-specific bands are named with the prefix of their DSWE variant, 
+  the bands shared by all variants are reduced once.
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      prefixes: column prefixes of the summarized DSWE variants, [''] for an 
+      export of a single variant
+      
+  Returns:
+      list of (reducer name, band names, output prefix) tuples, in export 
+      order. Reducer names are those of ee.Reducer ('median', 'min', 'stdDev',
+      'mean' and 'count').
+  """
+  bands = sr_bands[sensor_group] + ['SurfaceTemp']
+  groups = []
+  for prefix in prefixes:
+    groups += [('median', [prefix + 'med_' + band for band in bands], ''),
+               ('min', [prefix + 'min_SurfaceTemp'], ''),
+               ('stdDev', [prefix + 'sd_' + band for band in bands], ''),
+               ('mean', [prefix + 'mean_' + band for band in bands], '')]
+  groups.append(('count', shared_count_names(sensor_group), 'pCount_'))
+  for prefix in prefixes:
+    groups.append(('count', [prefix + 'pCount_' + flag for flag in flag_band_names(sensor_group)], ''))
+  groups += [('mean', ['clouds', 'hillShadow'], 'prop_'),
+             ('mean', ['hillShade'], 'mean_')]
+  return groups
+
+
+def export_columns(sensor_group, prefixes):
+  """ List the columns of a site export, in export order
+  
+  Args:
+      sensor_group: Landsat sensor group ('LS457' or 'LS89')
+      prefixes: column prefixes of the summarized DSWE variants, see 
+      band_groups()
+      
+  Returns:
+      list of column names
+  """
+  columns = ['system:index']
+  for _, bands, output_prefix in band_groups(sensor_group, prefixes):
+    columns += [output_prefix + band for band in bands]
+  return columns
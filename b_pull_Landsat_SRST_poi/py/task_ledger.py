@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# default location of the ledger, relative to the repository root (the working
+# directory of the {targets} pipeline)
+DEFAULT_LEDGER_PATH = "b_pull_Landsat_SRST_poi/out/GEE_task_ledger.sqlite"
+
+# columns stored for every export task
+LEDGER_COLUMNS = ["task_id", "description", "run_date", "pathrow", "chunk", "dswe",
+                  "sensor", "submitted", "state", "error_message", "updated",
+                  "site_start", "site_end", "n_scenes", "runtime_s", "eecu_s",
+                  "graph_bytes", "graph_nodes"]
+
+# columns added after the first version of the ledger, added to existing
+# ledgers on open
+_ADDED_COLUMNS = {"site_start": "INTEGER", "site_end": "INTEGER",
+                  "n_scenes": "INTEGER", "runtime_s": "REAL", "eecu_s": "REAL",
+                  "graph_bytes": "INTEGER", "graph_nodes": "INTEGER"}
+
+
+def _now():
+  """ Current UTC time as an ISO 8601 string """
+  return datetime.now(timezone.utc).isoformat(timespec = "seconds")
+
+
+def _runtime(status):
+  """ Run time of a finished task in seconds, from its task status, or None """
+  if status.get("start_timestamp_ms") is None or status.get("update_timestamp_ms") is None:
+    return None
+  if str(getattr(status["state"], "value", status["state"])) != "COMPLETED":
+    return None
+  return (status["update_timestamp_ms"] - status["start_timestamp_ms"]) / 1000
+
+
+class TaskLedger:
+  """ Local SQLite record of every export task sent to Earth Engine. One row is
+  stored per task id with the information needed to reconcile a run (path-row,
+  chunk, DSWE variant, sensor group) and the last known state of the task, so
+  that checking a multi-week pull is a local, indexed query instead of a scan of
+  the (10-day) Earth Engine task history.
+
+  Args:
+      path: file path of the SQLite database, created if it does not exist
+  """
+
+  def __init__(self, path=DEFAULT_LEDGER_PATH):
+    self.path = path
+    self._lock = threading.Lock()
+    self._con = sqlite3.connect(path, check_same_thread = False)
+    self._con.row_factory = sqlite3.Row
+    with self._lock, self._con:
+      self._con.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+          task_id TEXT PRIMARY KEY,
+          description TEXT NOT NULL,
+          run_date TEXT,
+          pathrow TEXT,
+          chunk INTEGER,
+          dswe TEXT,
+          sensor TEXT,
+          submitted TEXT,
+          state TEXT,
+          error_message TEXT,
+          updated TEXT
+        )""")
+      existing = [row["name"] for row in self._con.execute("PRAGMA table_info(tasks)")]
+      for column, column_type in _ADDED_COLUMNS.items():
+        if column not in existing:
+          self._con.execute("ALTER TABLE tasks ADD COLUMN " + column + " " + column_type)
+      self._con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_description ON tasks (description)")
+      self._con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_run_state ON tasks (run_date, state)")
+      self._con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_run_pathrow ON tasks (run_date, pathrow)")
+
+  def record_submission(self, task_id, description, run_date, pathrow=None,
+                        chunk=None, dswe=None, sensor=None, state="READY",
+                        site_start=None, site_end=None, n_scenes=None,
+                        graph_bytes=None, graph_nodes=None):
+    """ Add a newly started export task to the ledger.
+
+    Args:
+        task_id: Earth Engine task id
+        description: export description (also the exported file name)
+        run_date: run date of the pull, used for versioning
+        pathrow: WRS2 path-row of the export
+        chunk: site chunk of the export, None for metadata exports
+        dswe: DSWE variant of the export (e.g. 'DSWE1'), None for metadata exports
+        sensor: sensor group of the export ('LS457' or 'LS89')
+        state: state of the task at submission
+        site_start, site_end: row range of the path-row locations in the
+        export, None for metadata exports
+        n_scenes: number of Landsat scenes in the export's stack, if known
+        graph_bytes, graph_nodes: size and number of nodes of the export's
+        serialized expression, if measured (see graph_stats.py)
+
+    Returns:
+        None.
+    """
+    now = _now()
+    with self._lock, self._con:
+      self._con.execute(
+        """INSERT OR REPLACE INTO tasks
+           (task_id, description, run_date, pathrow, chunk, dswe, sensor,
+            submitted, state, error_message, updated, site_start, site_end,
+            n_scenes, graph_bytes, graph_nodes)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)""",
+        (task_id, description, run_date, None if pathrow is None else str(pathrow),
+         chunk, dswe, sensor, now, state, now, site_start, site_end, n_scenes,
+         graph_bytes, graph_nodes))
+
+  def update_states(self, updates):
+    """ Update the state (and error message) of many tasks in one transaction.
+    Tasks not yet in the ledger are added if their description is provided.
+
+    Args:
+        updates: iterable of dictionaries with the keys 'id' and 'state', and
+        optionally 'description', 'error_message', 'run_date' and the run time
+        and EECU usage keys 'start_timestamp_ms', 'update_timestamp_ms' and
+        'batch_eecu_usage_seconds' (the format of ee.data.getTaskList() and
+        ee.batch.Task.status())
+
+    Returns:
+        None.
+    """
+    now = _now()
+    rows = [(u["id"], u.get("description") or "", u.get("run_date"),
+             str(getattr(u["state"], "value", u["state"])), u.get("error_message"),
+             now, _runtime(u), u.get("batch_eecu_usage_seconds")) for u in updates]
+    with self._lock, self._con:
+      self._con.executemany(
+        """INSERT INTO tasks (task_id, description, run_date, state, error_message,
+                              updated, runtime_s, eecu_s)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(task_id) DO UPDATE SET
+             state = excluded.state,
+             error_message = COALESCE(excluded.error_message, tasks.error_message),
+             updated = excluded.updated,
+             runtime_s = COALESCE(excluded.runtime_s, tasks.runtime_s),
+             eecu_s = COALESCE(excluded.eecu_s, tasks.eecu_s)""",
+        rows)
+
+  def update_state(self, task_id, state, error_message=None, description=None):
+    """ Update the state of a single task, see `update_states()`.
+    """
+    self.update_states([{"id": task_id, "state": state,
+                         "error_message": error_message,
+                         "description": description}])
+
+  def tasks(self, run_date=None, states=None, pathrow=None):
+    """ Query the ledger.
+
+    Args:
+        run_date: optional run date to filter by
+        states: optional list of task states to filter by
+        pathrow: optional WRS2 path-row to filter by
+
+    Returns:
+        list of dictionaries, one per task, with the keys in LEDGER_COLUMNS
+    """
+    query = "SELECT * FROM tasks WHERE 1 = 1"
+    params = []
+    if run_date is not None:
+      query += " AND run_date = ?"
+      params.append(run_date)
+    if states is not None:
+      query += " AND state IN (" + ", ".join("?" * len(states)) + ")"
+      params.extend(states)
+    if pathrow is not None:
+      query += " AND pathrow = ?"
+      params.append(str(pathrow))
+    with self._lock:
+      return [dict(row) for row in self._con.execute(query, params)]
+
+  def close(self):
+    """ Close the database connection """
+    with self._lock:
+      self._con.close()
+
+
+# ledgers opened in this Python session, by path
+_shared_ledgers = {}
+
+
+def get_task_ledger(path=DEFAULT_LEDGER_PATH):
+  """ Get the ledger at `path` shared by all writers in this Python session,
+  opening it on first use.
+
+  Args:
+      path: file path of the SQLite database
+
+  Returns:
+      TaskLedger
+  """
+  if path not in _shared_ledgers:
+    _shared_ledgers[path] = TaskLedger(path)
+  return _shared_ledgers[path]
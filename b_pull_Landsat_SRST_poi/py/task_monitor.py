@@ -0,0 +1,351 @@
+import random
+import threading
+import time
+
+# states that count against the number of concurrently active tasks
+ACTIVE_STATES = ("READY", "RUNNING")
+# states a task will never leave once reached
+TERMINAL_STATES = ("COMPLETED", "FAILED", "CANCELLED")
+
+
+def task_state(state):
+  """ Normalize an Earth Engine task state to a plain string. Depending on the
+  version of the earthengine-api, `ee.batch.Task.state` is either a string or a
+  string enum.
+
+  Args:
+      state: the task state as stored on an ee.batch.Task or returned by
+      ee.batch.Task.status()
+
+  Returns:
+      the state as a string (e.g. 'READY', 'RUNNING', 'COMPLETED')
+  """
+  return str(getattr(state, "value", state))
+
+
+# phrases of the Earth Engine error messages of failed tasks and the type of
+# error they indicate, checked in order. Memory errors are checked first, as
+# their messages can also mention that the computation timed out; both are
+# resubmitted as smaller tasks. Quota errors are transient and resubmitted as
+# is, anything else is an error in the request ('user').
+TASK_ERROR_PHRASES = [
+  ("user memory limit exceeded", "memory"),
+  ("memory capacity exceeded", "memory"),
+  ("out of memory", "memory"),
+  ("computation timed out", "timeout"),
+  ("timed out", "timeout"),
+  ("deadline exceeded", "timeout"),
+  ("too many concurrent aggregations", "quota"),
+  ("too many tasks", "quota"),
+  ("too many requests", "quota"),
+  ("quota exceeded", "quota"),
+  ("rate limit", "quota"),
+  ("resource exhausted", "quota"),
+  ("earth engine capacity exceeded", "quota"),
+]
+
+
+def classify_task_error(error_message):
+  """ Classify the error message of a failed Earth Engine task by the first
+  phrase of TASK_ERROR_PHRASES it contains
+
+  Args:
+      error_message: the 'error_message' of the task status
+
+  Returns:
+      one of 'memory', 'timeout', 'quota' or 'user'
+  """
+  message = (error_message or "").lower()
+  for phrase, error_type in TASK_ERROR_PHRASES:
+    if phrase in message:
+      return error_type
+  return "user"
+
+
+class TaskMonitor:
+  """ Keeps a single, shared view of Earth Engine task states so that submitters
+  do not have to re-list the entire task history every time they check for a
+  free slot. The full task list is only downloaded on the first refresh and then
+  every `resync_interval` seconds (to pick up tasks submitted elsewhere); in
+  between, only the tasks known to be active are polled for their state. Any
+  thread waiting in `wait_for_slot()` is woken as soon as a refresh shows that a
+  slot has freed up.
+
+  Args:
+      task_source: object with a `list()` method returning task objects that have
+      `id`, `state` and `status()` members. Defaults to ee.batch.Task, but can be
+      swapped for an in-process fake.
+      poll_interval: minimum time between refreshes of the active tasks, in seconds
+      resync_interval: time between full downloads of the task list, in seconds
+  """
+
+  def __init__(self, task_source=None, poll_interval=15, resync_interval=600):
+    if task_source is None:
+      # imported here so that the monitor can run against a fake without the
+      # earthengine-api
+      import ee
+      task_source = ee.batch.Task
+    self.task_source = task_source
+    self.poll_interval = poll_interval
+    self.resync_interval = resync_interval
+    self._cond = threading.Condition()
+    self._tasks = {}
+    self._states = {}
+    self._reserved = 0
+    self._refreshing = False
+    self._last_refresh = None
+    self._last_resync = None
+
+  def resync(self):
+    """ Download the full task list and replace the current view with it.
+    """
+    tasks = list(self.task_source.list())
+    with self._cond:
+      for task in tasks:
+        self._tasks[task.id] = task
+        self._states[task.id] = task_state(task.state)
+      self._last_resync = self._last_refresh = time.monotonic()
+      self._cond.notify_all()
+
+  def refresh(self):
+    """ Update the state of every task currently known to be active. Falls back
+    to a full `resync()` on first use and every `resync_interval` seconds.
+    """
+    if (self._last_resync is None or
+        time.monotonic() - self._last_resync >= self.resync_interval):
+      self.resync()
+      return
+    with self._cond:
+      active = [(task_id, self._tasks[task_id])
+                for task_id, state in self._states.items()
+                if state in ACTIVE_STATES]
+    updates = {}
+    for task_id, task in active:
+      updates[task_id] = task_state(task.status()["state"])
+    with self._cond:
+      self._states.update(updates)
+      self._last_refresh = time.monotonic()
+      self._cond.notify_all()
+
+  def register(self, task):
+    """ Add a newly started task to the view, consuming a slot reserved by
+    `wait_for_slot()` if there is one.
+
+    Args:
+        task: ee.batch.Task that has been started
+    """
+    with self._cond:
+      self._tasks[task.id] = task
+      self._states[task.id] = task_state(getattr(task, "state", None) or "READY")
+      if self._states[task.id] == "UNSUBMITTED":
+        self._states[task.id] = "READY"
+      if self._reserved > 0:
+        self._reserved -= 1
+
+  def release(self):
+    """ Give back a slot reserved by `wait_for_slot()` that was not used (e.g.
+    the task failed to start).
+    """
+    with self._cond:
+      if self._reserved > 0:
+        self._reserved -= 1
+      self._cond.notify_all()
+
+  def count_active(self):
+    """ Count tasks in an active state plus any reserved slots.
+
+    Returns:
+        integer number of active tasks
+    """
+    with self._cond:
+      n_active = sum(1 for state in self._states.values() if state in ACTIVE_STATES)
+      return n_active + self._reserved
+
+  def state_of(self, task_id):
+    """ Get the last seen state of a task.
+
+    Args:
+        task_id: Earth Engine task id
+
+    Returns:
+        the state as a string, or None if the task is not in the view
+    """
+    with self._cond:
+      return self._states.get(task_id)
+
+  def snapshot(self):
+    """ Get the current view of all tasks, downloading the task list first if
+    the monitor has not been refreshed yet.
+
+    Returns:
+        list of (task id, description, state) tuples
+    """
+    if self._last_resync is None:
+      self.resync()
+    with self._cond:
+      return [(task_id, (getattr(self._tasks[task_id], "config", None) or {}).get("description"),
+               state)
+              for task_id, state in self._states.items()]
+
+  def poll(self, task_ids, max_status_calls=50):
+    """ Update the state of the given tasks that are still active. If more than
+    `max_status_calls` of them are active, a single `resync()` is cheaper than
+    one status request per task and is used instead.
+
+    Args:
+        task_ids: iterable of Earth Engine task ids
+        max_status_calls: maximum number of per-task status requests
+
+    Returns:
+        None.
+    """
+    with self._cond:
+      active = [(task_id, self._tasks[task_id]) for task_id in task_ids
+                if task_id in self._tasks and self._states.get(task_id) not in TERMINAL_STATES]
+    if len(active) > max_status_calls:
+      self.resync()
+      return
+    updates = {}
+    for task_id, task in active:
+      updates[task_id] = task_state(task.status()["state"])
+    with self._cond:
+      self._states.update(updates)
+      self._last_refresh = time.monotonic()
+      self._cond.notify_all()
+
+  def wait_for_tasks(self, task_ids, poll_interval=None):
+    """ Block until all of the given (registered) tasks are in a terminal state.
+
+    Args:
+        task_ids: iterable of Earth Engine task ids
+        poll_interval: time between checks in seconds, defaults to the
+        monitor's poll_interval
+
+    Returns:
+        dictionary of task id to final state
+    """
+    task_ids = list(task_ids)
+    while True:
+      states = {task_id: self.state_of(task_id) for task_id in task_ids}
+      if all(state in TERMINAL_STATES for state in states.values()):
+        return states
+      time.sleep(poll_interval or self.poll_interval)
+      self.poll(task_ids)
+
+  def wait_for_slot(self, max_active, reserve=True):
+    """ Block until fewer than `max_active` tasks are active. Only one waiting
+    thread refreshes the view at a time, all others are notified when the
+    refresh has finished.
+
+    Args:
+        max_active: maximum number of tasks that can be active at one time
+        reserve: boolean; if True, a slot is held until the next `register()`
+        or `release()` call so that concurrent submitters do not overshoot
+        `max_active`
+
+    Returns:
+        None.
+    """
+    while True:
+      with self._cond:
+        if self._last_refresh is not None and self.count_active() < max_active:
+          if reserve:
+            self._reserved += 1
+          return
+        if self._last_refresh is None:
+          wait = 0
+        else:
+          wait = self.poll_interval - (time.monotonic() - self._last_refresh)
+        if self._refreshing or wait > 0:
+          self._cond.wait(self.poll_interval if self._refreshing else wait)
+          continue
+        self._refreshing = True
+      try:
+        self.refresh()
+      finally:
+        with self._cond:
+          self._refreshing = False
+          self._cond.notify_all()
+
+
+def _format_duration(seconds):
+  """ Format a number of seconds as h:mm:ss """
+  seconds = int(round(seconds))
+  return "%d:%02d:%02d" % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def wait_for_run(run_date, task_ids=(), monitor=None, min_interval=15,
+                 max_interval=300, backoff=1.5, jitter=0.2):
+  """ Block until every task of a run is in a terminal state. The run's tasks
+  are those with `run_date` in their description plus any `task_ids` (e.g. from
+  the task ledger); tasks of other runs or projects in the account are ignored.
+  The time between checks starts at `min_interval` and grows by `backoff` after
+  every check in which no task finished (up to `max_interval`), with random
+  jitter so that several waiters do not poll in lockstep. Progress and an
+  estimated time to completion are printed after every check.
+
+  Args:
+      run_date: run date of the pull, as used in the export descriptions
+      task_ids: optional iterable of additional task ids to wait for
+      monitor: TaskMonitor to use, defaults to the shared monitor
+      min_interval: shortest time between checks, in seconds
+      max_interval: longest time between checks, in seconds
+      backoff: factor the interval grows by when nothing finished
+      jitter: maximum relative deviation of each wait from the interval
+
+  Returns:
+      dictionary of task id to final state for all tasks of the run
+  """
+  monitor = monitor if monitor is not None else get_task_monitor()
+  monitor.resync()
+  task_ids = set(task_ids)
+  tracked = [task_id for task_id, description, _ in monitor.snapshot()
+             if run_date in (description or "") or task_id in task_ids]
+  missing = task_ids.difference(tracked)
+  if len(missing) > 0:
+    print(str(len(missing)) + " task(s) of this run are no longer in the GEE task list and are not waited for")
+  start = time.monotonic()
+  done_at_start = None
+  interval = min_interval
+  while True:
+    states = {task_id: monitor.state_of(task_id) for task_id in tracked}
+    n_done = sum(1 for state in states.values() if state in TERMINAL_STATES)
+    n_left = len(states) - n_done
+    if done_at_start is None:
+      done_at_start = n_done
+    if n_left == 0:
+      print("All " + str(len(states)) + " tasks of run " + run_date + " have finished")
+      return states
+    elapsed = time.monotonic() - start
+    n_finished = n_done - done_at_start
+    if n_finished > 0:
+      eta = ", ETA " + _format_duration(elapsed / n_finished * n_left)
+    else:
+      eta = ""
+    print("%d/%d tasks of run %s finished (%d running or queued), waited %s%s" %
+          (n_done, len(states), run_date, n_left, _format_duration(elapsed), eta))
+    time.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+    monitor.poll(tracked)
+    n_done_now = sum(1 for task_id in tracked if monitor.state_of(task_id) in TERMINAL_STATES)
+    if n_done_now > n_done:
+      interval = min_interval
+    else:
+      interval = min(interval * backoff, max_interval)
+
+
+# module-level monitor, shared by every submitter in this Python session (the
+# module stays loaded between `source_python()` calls from R)
+_shared_monitor = None
+
+
+def get_task_monitor():
+  """ Get the task monitor shared by all submitters in this Python session,
+  creating it on first use.
+
+  Returns:
+      TaskMonitor
+  """
+  global _shared_monitor
+  if _shared_monitor is None:
+    _shared_monitor = TaskMonitor()
+  return _shared_monitor
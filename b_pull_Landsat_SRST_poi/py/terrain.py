@@ -0,0 +1,107 @@
+import math
+
+import ee
+
+# DEM used for the hill shade and hill shadow of each image
+DEM_ID = "MERIT/DEM/v1_0_3"
+
+# distance around the site buffers within which terrain is kept, in meters, so
+# that terrain near (but outside of) a site can still cast shadows on it. This
+# is the same margin the WRS tile was buffered by when the DEM was clipped per
+# image.
+TERRAIN_MARGIN = 3000
+
+
+def bin_angle(angle, bin_degrees):
+  """ Round a sun angle to the center of its bin
+
+  Args:
+      angle: sun angle in degrees, as a number or ee.Number
+      bin_degrees: width of the bins in degrees, 0 or None to keep the angle
+
+  Returns:
+      ee.Number
+  """
+  angle = ee.Number(angle)
+  if not bin_degrees:
+    return angle
+  return angle.divide(bin_degrees).round().multiply(bin_degrees)
+
+
+class TerrainCache:
+  """ Terrain of the sites of one path-row, shared by all chunks and images of
+  the path-row. The DEM is loaded and clipped to the area of the sites (plus
+  `margin`) once, instead of being reloaded and clipped to the whole WRS tile
+  for every image, and its slope and aspect are computed once for the hill
+  shade of every image. If `bin_degrees` is set, the sun angles of an image
+  are rounded to bins of that width, so images with nearly identical sun
+  geometry request identical illumination images, which Earth Engine computes
+  once and reuses. Binning is lossy: the hill shade and shadow of an image are
+  those of the center of its bin. With `bin_degrees` 0 (the default) the exact
+  sun angles are used.
+
+  Args:
+      region: ee.Geometry covering the buffered sites, e.g. their bounding box
+      (see chunk_bounds() in run_GEE_per_pathrow.py)
+      bin_degrees: width of the SUN_AZIMUTH/SUN_ELEVATION bins in degrees, 0 to
+      use the exact sun angles of each image
+      margin: distance around `region` within which terrain is kept, in meters
+  """
+
+  def __init__(self, region, bin_degrees=0, margin=TERRAIN_MARGIN):
+    self.bin_degrees = bin_degrees
+    self.dem = ee.Image(DEM_ID).clip(ee.Geometry(region).buffer(margin))
+    # slope and aspect in radians, the parts of the hill shade that do not
+    # depend on the sun
+    products = ee.Terrain.products(self.dem)
+    self.slope = products.select('slope').multiply(math.pi / 180)
+    self.aspect = products.select('aspect').multiply(math.pi / 180)
+
+  def sun_angles(self, image):
+    """ Binned sun azimuth and elevation of an image
+
+    Args:
+        image: ee.Image with 'SUN_AZIMUTH' and 'SUN_ELEVATION' properties
+
+    Returns:
+        tuple of ee.Numbers (azimuth, elevation)
+    """
+    return (bin_angle(image.get('SUN_AZIMUTH'), self.bin_degrees),
+            bin_angle(image.get('SUN_ELEVATION'), self.bin_degrees))
+
+  def hill_shade(self, image):
+    """ Hill shade per pixel, see calc_hill_shades() in run_GEE_per_pathrow.py
+
+    Args:
+        image: ee.Image of an ee.ImageCollection
+
+    Returns:
+        a band named 'hillShade', 0-255
+    """
+    azimuth, elevation = self.sun_angles(image)
+    # same illumination model as ee.Terrain.hillshade(), from the cached slope
+    # and aspect
+    zenith = ee.Number(90).subtract(elevation).multiply(math.pi / 180)
+    azimuth = ee.Number(azimuth).multiply(math.pi / 180)
+    return (self.slope.cos().multiply(zenith.cos())
+      .add(self.slope.sin().multiply(zenith.sin())
+           .multiply(self.aspect.multiply(-1).add(azimuth).cos()))
+      .multiply(255)
+      .clamp(0, 255)
+      .round()
+      .toByte()
+      .rename(['hillShade']))
+
+  def hill_shadow(self, image):
+    """ Hill shadow per pixel, see calc_hill_shadows() in run_GEE_per_pathrow.py
+
+    Args:
+        image: ee.Image of an ee.ImageCollection
+
+    Returns:
+        a band named 'hillShadow', 1 where pixels are illuminated and 0 where
+        they are shadowed
+    """
+    azimuth, elevation = self.sun_angles(image)
+    return (ee.Terrain.hillShadow(self.dem, azimuth, ee.Number(90).subtract(elevation), 30)
+      .rename(['hillShadow']))
@@ -0,0 +1,49 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# make the modules of b_pull_Landsat_SRST_poi/py importable, wherever pytest is
+# run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope = "module")
+def ee_offline():
+  """ Earth Engine initialized against the static algorithm list that ships
+  with earthengine-api, so graphs can be built and serialized without
+  credentials. Nothing is sent to Earth Engine. """
+  ee = pytest.importorskip("ee")
+  apitestcase = pytest.importorskip("ee.apitestcase")
+  with pytest.MonkeyPatch.context() as mp:
+    mp.setattr(ee.data, "_install_cloud_api_resource", lambda: None)
+    mp.setattr(ee.data, "getAlgorithms", apitestcase.GetAlgorithms)
+    ee.Initialize(None, "", project = "offline-test")
+    yield ee
+  ee.Reset()
+
+
+# the settings of the yml that run_GEE_per_pathrow.py reads on import
+YML = {"ee_proj": "offline-test", "proj": "LSC2_poi", "proj_folder": "ls_c2_srst_poi",
+       "run_date": "2025-02-12", "start_date": "1983-01-01", "end_date": "2024-12-31",
+       "extent": "site", "site_buffer": 120, "cloud_filter": "True", "cloud_thresh": 90,
+       "DSWE_setting": "1, 1a, 3", "location_crs": "EPSG:4326"}
+
+
+@pytest.fixture(scope = "module")
+def per_pr(ee_offline, tmp_path_factory):
+  """ run_GEE_per_pathrow, loaded with a minimal yml and Earth Engine
+  initialized offline """
+  run_dir = tmp_path_factory.mktemp("run")
+  os.makedirs(run_dir / "b_pull_Landsat_SRST_poi" / "mid")
+  with open(run_dir / "b_pull_Landsat_SRST_poi" / "mid" / "yml.csv", "w") as file:
+    file.write(",".join(YML) + "\n" + ",".join('"' + str(value) + '"' for value in YML.values()) + "\n")
+  with pytest.MonkeyPatch.context() as mp:
+    mp.chdir(run_dir)
+    # the module initializes Earth Engine with the configured project on import
+    mp.setattr(ee_offline, "Initialize", lambda *args, **kwargs: None)
+    sys.modules.pop("run_GEE_per_pathrow", None)
+    module = importlib.import_module("run_GEE_per_pathrow")
+    yield module
+    sys.modules.pop("run_GEE_per_pathrow", None)
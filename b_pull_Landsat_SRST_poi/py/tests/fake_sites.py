@@ -0,0 +1,24 @@
+""" Synthetic site locations shared by the tests and the benchmarks """
+import numpy as np
+from pandas import DataFrame
+
+# a WRS2 tile sized box in Colorado (inside path-row 034032)
+LONGITUDE_RANGE = (-105.5, -103.5)
+LATITUDE_RANGE = (39.0, 41.0)
+
+
+def fake_locations(n_sites, seed=1, lon_range=LONGITUDE_RANGE, lat_range=LATITUDE_RANGE):
+  """ Random site locations in a box, with lakeSR-like ids
+
+  Args:
+      n_sites: number of sites
+      seed: seed of the random generator
+      lon_range, lat_range: (min, max) longitude and latitude of the box
+
+  Returns:
+      pandas.DataFrame with the columns 'Longitude', 'Latitude' and 'id'
+  """
+  rng = np.random.default_rng(seed)
+  return DataFrame({'Longitude': rng.uniform(*lon_range, n_sites),
+                    'Latitude': rng.uniform(*lat_range, n_sites),
+                    'id': [str(i) + '_' + str(i * 7) for i in range(n_sites)]})
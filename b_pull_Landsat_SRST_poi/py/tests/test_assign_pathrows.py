@@ -0,0 +1,72 @@
+""" Path-row assignment on synthetic square footprints: two overlapping
+footprints in the north, the second crossing the boundary of UTM zones 13 and
+14, and one south of the equator """
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+geopandas = pytest.importorskip("geopandas")
+shapely = pytest.importorskip("shapely")
+pytest.importorskip("pyproj")
+
+from assign_pathrows import assign_pathrows, buffers_within, candidate_pairs, utm_epsg
+
+BUFFER = 1000
+
+TILES = np.array([shapely.box(-105, 40, -103, 42),
+                  # crosses the zone boundary at 102 W
+                  shapely.box(-103.5, 40, -101.5, 42),
+                  shapely.box(20, -11, 22, -9)])
+PATHROWS = ["033032", "032032", "180067"]
+
+# one site per case:
+#   a  in the first footprint
+#   b  in the overlap of the first two footprints
+#   c  in the first footprint, its buffer crossing the western edge
+#   d  in the second footprint, east of the zone boundary
+#   e  in the southern footprint
+#   f  in no footprint
+#   g  without coordinates
+LOCATIONS = DataFrame({"id": ["a", "b", "c", "d", "e", "f", "g"],
+                       "Latitude": [41, 41, 41, 41.5, -10, 0, np.nan],
+                       "Longitude": [-104, -103.25, -104.995, -101.7, 21, 0, np.nan]})
+
+
+def site_coordinates():
+  located = LOCATIONS.dropna()
+  return located["Longitude"].to_numpy(dtype = float), located["Latitude"].to_numpy(dtype = float)
+
+
+def test_utm_epsg():
+  # the mean of the vertices (including the closing vertex) of the footprint
+  # crossing the zone boundary is in zone 13
+  np.testing.assert_array_equal(utm_epsg(TILES), [32613, 32613, 32734])
+
+
+def test_candidate_pairs():
+  site, tile = candidate_pairs(*site_coordinates(), TILES)
+  assert list(zip(site.tolist(), tile.tolist())) == [(0, 0), (1, 0), (1, 1), (2, 0), (3, 1),
+                                                     (4, 2)]
+
+
+def test_buffers_within():
+  lon, lat = site_coordinates()
+  site, tile = candidate_pairs(lon, lat, TILES)
+  within = buffers_within(lon, lat, TILES, site, tile, BUFFER)
+  # only the buffer crossing the edge of its footprint is not within it
+  assert within.tolist() == [True, True, True, False, True, True]
+  # about 420 m from the edge, so a smaller buffer is within
+  assert buffers_within(lon, lat, TILES, site, tile, 300).all()
+
+
+def test_assign_pathrows():
+  wrs = geopandas.GeoDataFrame({"PR": PATHROWS}, geometry = TILES, crs = 4326)
+  assigned, pathrows = assign_pathrows(LOCATIONS, wrs, BUFFER)
+  assert list(assigned.columns) == ["id", "WRS2_PR", "Latitude", "Longitude"]
+  # sites in the overlap of two footprints are assigned to both, as by
+  # check_if_fully_within_pr.R
+  assert list(zip(assigned["id"], assigned["WRS2_PR"])) == [("a", "033032"), ("b", "033032"),
+                                                            ("b", "032032"), ("d", "032032"),
+                                                            ("e", "180067")]
+  # path-rows that intersect any site, whether or not a buffer is within them
+  assert pathrows == PATHROWS
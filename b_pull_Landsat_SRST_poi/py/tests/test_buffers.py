@@ -0,0 +1,24 @@
+""" Buffer polygon complexity and the UTM zone of the precomputed buffers """
+import pytest
+
+pytest.importorskip("ee")
+
+from buffers import max_error_for_vertices, utm_epsg, vertices_for_max_error
+
+
+def test_vertices_round_trip():
+  for n_vertices in [8, 16, 32, 64]:
+    max_error = max_error_for_vertices(120, n_vertices)
+    assert vertices_for_max_error(120, max_error) == n_vertices
+
+
+def test_utm_epsg_from_mean_site_coordinates():
+  # the mean longitude (-104.5) is in zone 13, although one site is in zone 14
+  assert utm_epsg([-105.5, -103.5], [39.5, 40.5]) == "EPSG:32613"
+  assert utm_epsg([147.0], [-42.0]) == "EPSG:32755"
+  assert utm_epsg([-177.0], [0.0]) == "EPSG:32601"
+
+
+def test_utm_epsg_stays_in_valid_zones():
+  assert utm_epsg([-180.0], [10.0]) == "EPSG:32601"
+  assert utm_epsg([180.0], [10.0]) == "EPSG:32660"
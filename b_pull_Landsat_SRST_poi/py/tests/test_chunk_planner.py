@@ -0,0 +1,92 @@
+""" Cost-based and spatial site chunking """
+import math
+import random
+
+from chunk_planner import (DEFAULT_SECONDS_PER_SITE_SCENE, MIN_CALIBRATION_TASKS,
+                           calibrate_cost, plan_chunks, recorded_chunks, hilbert_key,
+                           hilbert_order)
+
+
+def ledger_row(chunk, site_start, site_end, state="COMPLETED", n_scenes=100,
+               runtime_s=None, eecu_s=None):
+  return {"chunk": chunk, "site_start": site_start, "site_end": site_end, "state": state,
+          "n_scenes": n_scenes, "runtime_s": runtime_s, "eecu_s": eecu_s}
+
+
+def test_calibrate_cost():
+  assert calibrate_cost([]) == (DEFAULT_SECONDS_PER_SITE_SCENE, None)
+  # 1000 site scenes per export
+  rows = [ledger_row(i, 0, 10, runtime_s = 2.0, eecu_s = 4.0) for i in range(MIN_CALIBRATION_TASKS)]
+  rows.append(ledger_row(9, 0, 10, state = "FAILED", runtime_s = 100.0))
+  assert calibrate_cost(rows) == (0.002, 0.004)
+  # too few completed exports to calibrate
+  assert calibrate_cost(rows[:MIN_CALIBRATION_TASKS - 1])[0] == DEFAULT_SECONDS_PER_SITE_SCENE
+
+
+def test_plan_chunks_covers_all_sites_evenly():
+  chunks = plan_chunks(10500, {"LS457": 400, "LS89": 800}, 0.001, target_seconds = 3600)
+  # 4500 sites per chunk at most, spread evenly over 3 chunks
+  assert chunks == [(0, 3500), (3500, 7000), (7000, 10500)]
+  assert plan_chunks(0, {"LS89": 800}, 0.001) == []
+
+
+def test_plan_chunks_limits():
+  # very expensive path-rows are not split below min_sites
+  assert plan_chunks(250, {"LS89": 10 ** 6}, 1.0, min_sites = 100) == [(0, 125), (125, 250)]
+  assert plan_chunks(299, {"LS89": 10 ** 6}, 1.0, min_sites = 100) == [(0, 150), (150, 299)]
+  # unless the path-row has fewer sites
+  assert plan_chunks(60, {"LS89": 10 ** 6}, 1.0, min_sites = 100) == [(0, 60)]
+  # cheap path-rows are not merged above max_sites
+  assert len(plan_chunks(12000, {"LS89": 1}, 1e-9, max_sites = 5000)) == 3
+  # no scenes counted
+  assert plan_chunks(50, {}, 0.001) == [(0, 50)]
+
+
+def test_recorded_chunks():
+  rows = [ledger_row(1, 500, 1000), ledger_row(0, 0, 500),
+          # parts of a split chunk
+          ledger_row(2, 1000, 1250), ledger_row(2, 1250, 1500),
+          # metadata exports have no chunk
+          ledger_row(None, None, None)]
+  assert recorded_chunks(rows) == [(0, 500), (500, 1000), (1000, 1500)]
+  # chunks missing from the ledger
+  assert recorded_chunks([ledger_row(1, 500, 1000)]) is None
+  assert recorded_chunks([]) is None
+
+
+def test_hilbert_key_visits_neighbouring_cells():
+  order = 4
+  n = 1 << order
+  cells = sorted(((x, y) for x in range(n) for y in range(n)),
+                 key = lambda cell: hilbert_key(cell[0], cell[1], order))
+  # every cell once, each step to an adjacent cell
+  assert sorted(hilbert_key(x, y, order) for x, y in cells) == list(range(n * n))
+  assert all(abs(x1 - x2) + abs(y1 - y2) == 1
+             for (x1, y1), (x2, y2) in zip(cells, cells[1:]))
+
+
+def test_hilbert_order_is_a_permutation_with_nan_last():
+  rng = random.Random(1)
+  xs = [rng.uniform(-105, -103) for _ in range(200)] + [math.nan, 0.0]
+  ys = [rng.uniform(39, 41) for _ in range(200)] + [40.0, math.nan]
+  order = hilbert_order(xs, ys)
+  assert sorted(order) == list(range(202))
+  assert order[-2:] == [200, 201]
+  assert hilbert_order([], []) == []
+  assert hilbert_order([math.nan], [math.nan]) == [0]
+
+
+def test_hilbert_order_makes_compact_chunks():
+  rng = random.Random(2)
+  xs = [rng.uniform(0, 1) for _ in range(4000)]
+  ys = [rng.uniform(0, 1) for _ in range(4000)]
+
+  def mean_bbox_area(order):
+    areas = []
+    for start in range(0, len(order), 250):
+      chunk = order[start:start + 250]
+      areas.append((max(xs[i] for i in chunk) - min(xs[i] for i in chunk)) *
+                   (max(ys[i] for i in chunk) - min(ys[i] for i in chunk)))
+    return sum(areas) / len(areas)
+
+  assert mean_bbox_area(hilbert_order(xs, ys)) < 0.25 * mean_bbox_area(list(range(4000)))
@@ -0,0 +1,83 @@
+""" The bit-packed DSWE lookup (DSWE_CLASS_TABLE, used by DSWE() as an
+ee.Image.remap and by dswe_numpy()) must classify exactly like the original
+decimal code / eq chain of DSWE(), which is written out below.
+"""
+import numpy as np
+import pytest
+
+from dswe import DECIMAL_CODE_CLASSES, DSWE_CLASS_TABLE, decimal_code, dswe_numpy
+
+
+def baseline_dswe(blue, green, red, nir, swir1, swir2):
+  """ DSWE() of run_GEE_per_pathrow.py before the lookup table: decimal test
+  code and one eq() chain per class """
+  with np.errstate(divide = "ignore", invalid = "ignore"):
+    mndwi = (green - swir1) / (green + swir1)
+    ndvi = (nir - red) / (nir + red)
+  mbsrv = green + red
+  mbsrn = nir + swir1
+  awesh = blue + 2.5 * green + (-1.5) * mbsrn + (-0.25) * swir2
+  t1 = mndwi > 0.124
+  t2 = mbsrv > mbsrn
+  t3 = awesh > 0
+  t4 = (mndwi > -0.44) & (swir1 < 0.09) & (nir < 0.15) & (ndvi < 0.7)
+  t5 = (mndwi > -0.5) & (blue < 0.1) & (swir1 < 0.3) & (swir2 < 0.1) & (nir < 0.25)
+  t = (t1.astype(int) + t2.astype(int) * 10 + t3.astype(int) * 100 +
+       t4.astype(int) * 1000 + t5.astype(int) * 10000)
+  no_water = np.isin(t, [0, 1, 10, 100, 1000])
+  h_water = np.isin(t, [1111, 10111, 11011, 11101, 11110, 11111])
+  m_water = np.isin(t, [111, 1011, 1101, 1110, 10011, 10101, 10110, 11001, 11010, 11100])
+  p_wetland = t == 11000
+  l_water = np.isin(t, [11, 101, 110, 1001, 1010, 1100, 10000, 10001, 10010, 10100])
+  return (no_water * 0 + h_water * 1 + m_water * 2 + p_wetland * 3 + l_water * 4)
+
+
+def reflectance(n_pixels=200000, seed=1):
+  """ Fixed scaled reflectance arrays (blue, green, red, nir, swir1, swir2)
+  with water-like, vegetation-like and bright pixels and some NaN inputs """
+  rng = np.random.default_rng(seed)
+  bands = rng.uniform(-0.02, 0.45, (6, n_pixels))
+  # dark pixels, where the partial surface water tests pass
+  dark = rng.random(n_pixels) < 0.5
+  bands[:, dark] *= 0.3
+  # masked inputs, one band at a time and all bands together
+  for band in range(6):
+    bands[band, rng.integers(0, n_pixels, 500)] = np.nan
+  bands[:, :100] = np.nan
+  return tuple(bands)
+
+
+def test_class_table_matches_decimal_codes():
+  assert len(DSWE_CLASS_TABLE) == 32
+  classes = {code: dswe_class for dswe_class, codes in DECIMAL_CODE_CLASSES.items()
+             for code in codes}
+  # every decimal code of the five tests has exactly one class
+  assert sorted(classes) == sorted(decimal_code(bit_code) for bit_code in range(32))
+  assert sum(len(codes) for codes in DECIMAL_CODE_CLASSES.values()) == 32
+  for bit_code in range(32):
+    assert DSWE_CLASS_TABLE[bit_code] == classes[decimal_code(bit_code)]
+
+
+@pytest.mark.parametrize("bit_code, expected", [(0, 0), (0b01111, 1), (0b00111, 2),
+                                                 (0b11000, 3), (0b10000, 4), (0b11111, 1)])
+def test_class_table_examples(bit_code, expected):
+  assert DSWE_CLASS_TABLE[bit_code] == expected
+
+
+def test_dswe_numpy_matches_baseline():
+  bands = reflectance()
+  expected = baseline_dswe(*bands)
+  result = dswe_numpy(*bands)
+  # the arrays hit every class
+  assert set(np.unique(expected)) == {0, 1, 2, 3, 4}
+  np.testing.assert_array_equal(result, expected)
+
+
+def test_dswe_numpy_nan_inputs():
+  bands = reflectance()
+  nan_pixels = np.isnan(np.stack(bands)).any(axis = 0)
+  assert nan_pixels.sum() > 100
+  np.testing.assert_array_equal(dswe_numpy(*bands)[nan_pixels],
+                                baseline_dswe(*bands)[nan_pixels])
+  # comparisons with NaN fail, so all-NaN pixels get the class of code 0
+  assert (dswe_numpy(*bands)[:100] == DSWE_CLASS_TABLE[0]).all()
@@ -0,0 +1,69 @@
+""" Size of the site export graphs. The site exports of one chunk of synthetic
+sites are built with process_subset() (each sensor group and DSWE variant,
+separately and with `combine_dswe`, with and without `terrain_cache`) and
+serialized locally with graph_stats.py, with Earth Engine initialized offline
+(see the per_pr fixture).
+
+The budgets are deliberately loose upper bounds: the graph apart from the site
+payload should stay in the tens of kilobytes, each export should hold a single
+reduceRegions() call (one aggregation per export), and the payload should stay
+at a few dozen bytes per site. Tighten them from the numbers in the failure
+messages when the graph is trimmed.
+"""
+import pytest
+
+ee = pytest.importorskip("ee")
+
+from fake_sites import fake_locations
+from graph_stats import format_graph_stats, graph_stats, over_budget
+
+N_SITES = 5000
+PATHROW = "034032"
+
+# size of the graph apart from the constant payload, in bytes
+GRAPH_OVERHEAD_BUDGET = 256 * 1024
+# constant payload per site (id and coordinates), in bytes
+PAYLOAD_PER_SITE_BUDGET = 64
+NODE_BUDGET = 3000
+FUNCTION_BUDGET = {'Image.reduceRegions': 1}
+
+BUDGET = {'graph_bytes': GRAPH_OVERHEAD_BUDGET + PAYLOAD_PER_SITE_BUDGET * N_SITES,
+          'payload_bytes': PAYLOAD_PER_SITE_BUDGET * N_SITES,
+          'nodes': NODE_BUDGET,
+          'functions': FUNCTION_BUDGET}
+
+def collect_exports(per_pr, df, exports, monkeypatch):
+  """ Build the site exports of one chunk with process_subset(), keeping the
+  tasks instead of starting them
+
+  Returns:
+      dictionary of ee.batch.Task by export description
+  """
+  tasks = {}
+  def collect(task, description, *args, **kwargs):
+    tasks[description] = task
+    return False
+  monkeypatch.setattr(per_pr, "start_export", collect)
+  wrs, ls457, ls89 = per_pr.get_pathrow_stacks(PATHROW)
+  per_pr.process_subset(df, 0, len(df), PATHROW, wrs, ls457, ls89, exports = exports,
+                        terrain = per_pr.pathrow_terrain(df))
+  return tasks
+
+
+@pytest.mark.parametrize("terrain_cache", [False, True])
+@pytest.mark.parametrize("combined", [False, True])
+def test_site_exports_within_budget(per_pr, monkeypatch, terrain_cache, combined):
+  monkeypatch.setattr(per_pr, "terrain_cache", terrain_cache)
+  monkeypatch.setattr(per_pr, "completed_exports", set())
+  if combined:
+    exports = [(sensor_group, per_pr.combined_dswe) for sensor_group in ['LS457', 'LS89']]
+  else:
+    exports = [(sensor_group, variant) for sensor_group in ['LS457', 'LS89']
+               for variant in ['DSWE1', 'DSWE1a', 'DSWE3']]
+  tasks = collect_exports(per_pr, fake_locations(N_SITES), exports, monkeypatch)
+  assert len(tasks) == len(exports)
+  for description, task in tasks.items():
+    stats = graph_stats(task)
+    assert over_budget(stats, BUDGET) == [], description + ': ' + format_graph_stats(stats)
+    for name, limit in FUNCTION_BUDGET.items():
+      assert stats['functions'][name] == limit, description + ': ' + format_graph_stats(stats)
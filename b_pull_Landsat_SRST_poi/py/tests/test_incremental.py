@@ -0,0 +1,66 @@
+""" Scenes skipped by incremental runs, from small metadata exports of earlier
+runs """
+import json
+
+import pytest
+from pandas import DataFrame
+
+ee = pytest.importorskip("ee")
+
+from graph_stats import encode_expression
+from incremental import new_scenes, previous_acquisitions, previous_metadata_files
+
+
+def write_metadata(folder, run_date, pr, scenes, sensor_group="LS89"):
+  """ Write the metadata export of a path-row of an earlier run
+
+  Args:
+      scenes: list of (DATE_ACQUIRED, LANDSAT_PRODUCT_ID) tuples
+  """
+  directory = folder / run_date / "metadata"
+  directory.mkdir(parents = True, exist_ok = True)
+  fn = directory / ("LSC2_poi_metadata_" + sensor_group + "_C2_" + pr + "_v" + run_date + ".csv")
+  DataFrame(scenes, columns = ["DATE_ACQUIRED", "LANDSAT_PRODUCT_ID"]).assign(CLOUD_COVER = 10).to_csv(fn, index = False)
+  return str(fn)
+
+
+def test_previous_metadata_files_skips_missing_runs(tmp_path):
+  fn = write_metadata(tmp_path, "2024-06-01", "034032", [("2024-05-01", "a")])
+  files = previous_metadata_files("LSC2_poi", ["2024-01-01", "2024-06-01"], "LS89", "034032",
+                                  str(tmp_path))
+  assert files == [fn]
+  assert previous_metadata_files("LSC2_poi", ["2024-06-01"], "LS457", "034032", str(tmp_path)) == []
+
+
+def test_previous_acquisitions_without_files():
+  assert previous_acquisitions([]) is None
+
+
+def test_previous_acquisitions_without_scenes(tmp_path):
+  assert previous_acquisitions([write_metadata(tmp_path, "2024-06-01", "034032", [])]) is None
+
+
+def test_previous_acquisitions_lookback_window(tmp_path):
+  files = [write_metadata(tmp_path, "2024-01-01", "034032",
+                          [("2023-06-01", "old"), ("2023-12-20", "a")]),
+           write_metadata(tmp_path, "2024-06-01", "034032",
+                          [("2024-01-31", "before"), ("2024-02-01", "boundary"), ("2024-05-01", "last")])]
+  since, acquired = previous_acquisitions(files, lookback_days = 90)
+  # 90 days before the last acquisition of any earlier run
+  assert since == "2024-02-01"
+  # scenes acquired on the boundary date are in the window
+  assert acquired == ["boundary", "last"]
+  since, acquired = previous_acquisitions(files, lookback_days = 0)
+  assert (since, acquired) == ("2024-05-01", ["last"])
+
+
+def test_new_scenes_filters_by_date_and_product_id(ee_offline):
+  stack = ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
+  graph = encode_expression(new_scenes(stack, "2024-02-01", ["boundary", "last"]))
+  # scenes from midnight of the boundary date on (time_start not less than
+  # it), apart from the ones already acquired
+  expected = (stack
+    .filter(ee.Filter.lt("system:time_start", ee.Date("2024-02-01").millis()).Not())
+    .filter(ee.Filter.listContains(leftValue = ["boundary", "last"],
+                                   rightField = "LANDSAT_PRODUCT_ID").Not()))
+  assert json.dumps(graph, sort_keys = True) == json.dumps(encode_expression(expected), sort_keys = True)
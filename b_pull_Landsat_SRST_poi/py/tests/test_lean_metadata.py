@@ -0,0 +1,34 @@
+""" Rows of the metadata sidecars """
+import pytest
+
+pytest.importorskip("ee")
+
+from lean_metadata import METADATA_PROPERTIES, feature_rows
+
+
+def test_feature_rows_keep_the_scene_id():
+  # format of ee.FeatureCollection.getInfo(): the system:index set on a
+  # feature is returned as its id
+  features = [{"type": "Feature", "geometry": None, "id": "LC08_034032_20200101",
+               "properties": {"CLOUD_COVER": 12.5, "WRS_PATH": 34}},
+              {"type": "Feature", "geometry": None, "id": "LC09_034032_20220109",
+               "properties": {}}]
+  rows = feature_rows(features)
+  assert [row["system:index"] for row in rows] == ["LC08_034032_20200101", "LC09_034032_20220109"]
+  assert rows[0]["CLOUD_COVER"] == 12.5
+
+
+def test_scene_id_is_a_sidecar_column():
+  for properties in METADATA_PROPERTIES.values():
+    assert properties[0] == "system:index"
+
+
+def test_geometric_accuracy_properties_match():
+  # prep_LS_metadata_for_export.R keeps every GEOMETRIC_RMSE* and
+  # GROUND_CONTROL* column, of both sensor groups
+  geometric = [[name for name in properties
+                if name.startswith("GEOMETRIC_RMSE") or name.startswith("GROUND_CONTROL")]
+               for properties in METADATA_PROPERTIES.values()]
+  assert geometric[0] == geometric[1]
+  assert "GEOMETRIC_RMSE_VERIFY" in geometric[0]
+  assert "GROUND_CONTROL_POINTS_VERIFY" in geometric[0]
@@ -0,0 +1,116 @@
+""" The local NumPy pipeline on small hand-built scenes: QA bit masking and
+DSWE classes, the pixels of the site buffers and the export columns """
+import numpy as np
+import pytest
+
+import local_pipeline as lp
+from summary_bands import c2_bands, dswe_prefix, export_columns
+
+# scaled reflectance (blue, green, red, nir, swir1, swir2) of a clear water
+# pixel (DSWE class 1) and of a vegetated land pixel (DSWE class 0)
+WATER = (0.05, 0.06, 0.04, 0.02, 0.01, 0.005)
+LAND = (0.05, 0.08, 0.06, 0.35, 0.25, 0.15)
+
+# QA_PIXEL values: clear water, dilated cloud, cloud, cloud shadow
+QA_CLEAR_WATER = 21952
+QA_DILATED_CLOUD = 21824 | (1 << 1)
+QA_CLOUD = 22280
+QA_SHADOW = 23888
+
+
+def dn(reflectance):
+  """ Digital numbers of scaled surface reflectance, see apply_scale_factors() """
+  return np.round((np.asarray(reflectance) + 0.2) / 0.0000275)
+
+
+def scene(pixels, pixel_qa=None, aerosol_qa=None, radsat_qa=None):
+  """ LS89 Collection 2 band arrays of a single row of pixels
+
+  Args:
+      pixels: list of the (blue, green, red, nir, swir1, swir2) reflectance of
+      each pixel
+      pixel_qa, aerosol_qa, radsat_qa: QA values of each pixel, clear water,
+      low aerosol and no saturation by default
+  """
+  n = len(pixels)
+  sr = dn(np.array(pixels, dtype = float).T)
+  raw = {'SR_B1': sr[0].copy()}
+  for band, values in zip(['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7'], sr):
+    raw[band] = values
+  raw['QA_PIXEL'] = np.array(pixel_qa if pixel_qa is not None else [QA_CLEAR_WATER] * n)
+  raw['SR_QA_AEROSOL'] = np.array(aerosol_qa if aerosol_qa is not None else [0] * n)
+  raw['QA_RADSAT'] = np.array(radsat_qa if radsat_qa is not None else [0] * n)
+  raw['ST_B10'] = np.full(n, 45000.0)
+  assert sorted(raw) == sorted(c2_bands['LS89'])
+  return {band: values.reshape(1, n) for band, values in raw.items()}
+
+
+def test_scale_bands_masks_fill_and_saturation():
+  raw = scene([WATER, WATER, WATER], radsat_qa = [0, 0, 1])
+  raw['SR_B3'][0, 1] = 0
+  bands = lp.scale_bands(raw, 'LS89')
+  np.testing.assert_allclose(bands['Blue'][0, 0], WATER[0], atol = 1e-4)
+  np.testing.assert_allclose(bands['SurfaceTemp'][0, 0], 45000 * 0.00341802 + 149.0)
+  # a fill value in any SR band or a saturated band masks every band
+  for name, values in bands.items():
+    assert not np.isnan(values[0, 0]), name
+    assert np.isnan(values[0, 1:]).all(), name
+
+
+def test_qa_bits():
+  raw = scene([WATER] * 4, pixel_qa = [QA_CLEAR_WATER, QA_DILATED_CLOUD, QA_CLOUD, QA_SHADOW],
+              aerosol_qa = [0, 1 << 7, 1 << 6, 0])
+  qa = lp.qa_layers(lp.scale_bands(raw, 'LS89'), 'LS89')
+  np.testing.assert_array_equal(qa['clouds'][0], [0, 1, 1, 1])
+  # as add_sr_aero_mask(image).select('aero').eq(0) in qa_stack(): only the
+  # high aerosol bit sets the flag
+  np.testing.assert_array_equal(qa['atmos'][0], [0, 1, 0, 0])
+  np.testing.assert_array_equal(qa['valid'][0], [0, 0, 0, 0])
+
+
+def test_dswe_classes():
+  raw = scene([WATER, LAND, WATER, WATER], aerosol_qa = [1 << 7] * 4,
+              pixel_qa = [QA_CLEAR_WATER] * 3 + [QA_CLOUD])
+  raw['SR_B2'][0, 2] = 0
+  qa = lp.qa_layers(lp.scale_bands(raw, 'LS89'), 'LS89')
+  # masked (fill) pixels have no DSWE class
+  np.testing.assert_array_equal(qa['dswe'][0], [1, 0, np.nan, 1])
+  np.testing.assert_array_equal(lp.dswe_water(qa, 'DSWE1')[0], [1, 0, np.nan, 1])
+  np.testing.assert_array_equal(lp.dswe_water(qa, 'DSWE3')[0], [0, 0, np.nan, 0])
+  # the cloudy water pixel is not a valid water pixel, and the bright land
+  # pixel is masked as the glint mask is self masked in qa_stack()
+  np.testing.assert_array_equal(qa['valid_qa'][0], [1, np.nan, np.nan, 0])
+  with pytest.raises(ValueError):
+    lp.dswe_water(qa, 'DSWE2')
+
+
+def test_buffer_pixels():
+  # 30 m pixels, the upper left corner at (0, 300)
+  geotransform = (0.0, 30.0, 0, 300.0, 0, -30.0)
+  pixels = lp.buffer_pixels([150.0, 0.0, 500.0, 165.0], [150.0, 300.0, 150.0, 135.0],
+                            geotransform, (10, 10), 30)
+  # the four pixels around a pixel corner
+  assert sorted(pixels[0].tolist()) == [44, 45, 54, 55]
+  # buffers are cut at the edge of the image
+  assert pixels[1].tolist() == [0]
+  assert pixels[2].tolist() == []
+  # the center of pixel (5, 5) and its four neighbours
+  assert sorted(pixels[3].tolist()) == [45, 54, 55, 56, 65]
+
+
+@pytest.mark.parametrize("dswe_variants", [('DSWE1',), ('DSWE1', 'DSWE1a', 'DSWE3')])
+def test_ref_pull_local_columns(dswe_variants):
+  raw = scene([WATER, WATER, LAND, LAND], aerosol_qa = [1 << 7] * 4)
+  site_pixels = [np.array([0, 1]), np.array([2, 3])]
+  df = lp.ref_pull_local(raw, 'LS89', ['site1', 'site2'], site_pixels, 'LC08_027033_20200715',
+                         dswe_variants)
+  prefixes = [''] if len(dswe_variants) == 1 else [dswe_prefix[v] for v in dswe_variants]
+  assert list(df.columns) == export_columns('LS89', prefixes)
+  assert df.columns[0] == 'system:index'
+  assert {'pCount_dswe1', 'prop_clouds', 'prop_hillShadow', 'mean_hillShade'} <= set(df.columns)
+  # only the site over water has a row
+  assert df['system:index'].tolist() == ['LC08_027033_20200715_site1']
+  prefix = prefixes[0]
+  np.testing.assert_allclose(df[prefix + 'med_Blue'], WATER[0], atol = 1e-4)
+  assert df['pCount_dswe1'].tolist() == [2]
+  assert df[prefix + 'pCount_blue_zero'].tolist() == [0]
@@ -0,0 +1,57 @@
+""" Location table assets, with a local fake of the Earth Engine asset API """
+import pytest
+
+# asset_exists() tells missing assets apart by ee.EEException
+ee = pytest.importorskip("ee")
+
+from locations_asset import asset_exists, ensure_folder, locations_asset_id, locations_folder
+
+
+class FakeAssetApi:
+  """ Stands in for ee.data: assets are kept in a dictionary by asset id """
+
+  def __init__(self, assets=()):
+    self.assets = {asset_id: {"type": "FOLDER"} for asset_id in assets}
+    self.created = []
+
+  def getAsset(self, asset_id):
+    if asset_id not in self.assets:
+      raise ee.EEException("Asset '" + asset_id + "' not found.")
+    return dict(self.assets[asset_id], id = asset_id)
+
+  def createAsset(self, value, asset_id):
+    if asset_id in self.assets:
+      raise ee.EEException("Cannot overwrite asset '" + asset_id + "'.")
+    self.assets[asset_id] = value
+    self.created.append(asset_id)
+
+
+def test_asset_ids_per_run_date_and_pathrow():
+  folder = locations_folder("ee-aquamatch", "LSC2_poi", "2025-02-12")
+  assert folder == "projects/ee-aquamatch/assets/LSC2_poi_locations_v2025-02-12"
+  assert locations_asset_id(folder, "034032") == folder + "/locations_034032"
+  # runs of other dates and other path-rows get their own assets
+  assert locations_folder("ee-aquamatch", "LSC2_poi", "2025-03-01") != folder
+  assert locations_asset_id(folder, "034033") != locations_asset_id(folder, "034032")
+
+
+def test_asset_exists():
+  api = FakeAssetApi(["projects/p/assets/a"])
+  assert asset_exists("projects/p/assets/a", api)
+  assert not asset_exists("projects/p/assets/b", api)
+
+
+def test_ensure_folder_creates_missing_folder():
+  api = FakeAssetApi()
+  folder = locations_folder("p", "LSC2_poi", "2025-02-12")
+  ensure_folder(folder, api)
+  assert api.created == [folder]
+  assert api.assets[folder] == {"type": "FOLDER"}
+
+
+def test_ensure_folder_keeps_existing_folder():
+  folder = locations_folder("p", "LSC2_poi", "2025-02-12")
+  api = FakeAssetApi([folder])
+  ensure_folder(folder, api)
+  ensure_folder(folder, api)
+  assert api.created == []
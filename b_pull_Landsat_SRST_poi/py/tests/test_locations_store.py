@@ -0,0 +1,58 @@
+""" The memory-mapped locations store against the per-path-row csv files """
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.feather
+
+from pandas import DataFrame, read_csv
+from pandas.testing import assert_frame_equal
+
+from locations_store import (LOCATION_DTYPES, pathrow_offsets, read_pathrow_locations, store_pathrows,
+                             write_locations_store)
+
+
+def locations(ids):
+  return DataFrame({"id": ids,
+                    "WRS2_PR": ["034032", "033032", "034032", "033032"],
+                    "Latitude": [40.1, 40.2, 40.3, 40.4],
+                    "Longitude": [-105.1, -103.2, -105.3, -103.4]})
+
+
+def csv_locations(df, pr, folder):
+  """ The locations of a path-row as the pull reads them from locations_<PR>.csv """
+  fn = folder / ("locations_" + pr + ".csv")
+  df[df["WRS2_PR"] == pr].to_csv(fn, index = False)
+  return read_csv(fn)[list(LOCATION_DTYPES)]
+
+
+@pytest.mark.parametrize("ids", [["1", "2", "3", "4"], ["1_7", "2_14", "3_21", "4_28"]])
+def test_store_matches_csv_files(tmp_path, ids):
+  df = locations(ids)
+  store = write_locations_store(df, str(tmp_path / "locations.feather"))
+  assert store_pathrows(store) == {"033032", "034032"}
+  for pr in ["033032", "034032"]:
+    assert_frame_equal(read_pathrow_locations(pr, store), csv_locations(df, pr, tmp_path))
+
+
+def test_pathrow_without_locations(tmp_path):
+  store = write_locations_store(locations(["1", "2", "3", "4"]), str(tmp_path / "locations.feather"))
+  assert len(read_pathrow_locations("001001", store)) == 0
+
+
+@pytest.mark.parametrize("metadata", [None, {b"r": b"arrow metadata"}])
+def test_store_without_offsets(tmp_path, metadata):
+  # as written by write_locations_store.R with arrow::write_feather()
+  df = locations(["1", "2", "3", "4"]).sort_values("WRS2_PR", kind = "stable")
+  table = pyarrow.Table.from_pandas(df, preserve_index = False).replace_schema_metadata(metadata)
+  store = str(tmp_path / "locations.feather")
+  pyarrow.feather.write_feather(table, store, compression = "uncompressed")
+  assert store_pathrows(store) == {"033032", "034032"}
+  for pr in ["033032", "034032"]:
+    assert_frame_equal(read_pathrow_locations(pr, store), csv_locations(df, pr, tmp_path))
+
+
+def test_pathrow_offsets():
+  assert pathrow_offsets(["a", "a", "b", "c", "c"]) == {"a": [0, 2], "b": [2, 3], "c": [3, 5]}
+  assert pathrow_offsets([]) == {}
+  with pytest.raises(ValueError):
+    pathrow_offsets(["a", "b", "a"])
@@ -0,0 +1,49 @@
+""" Site histories of site-diff runs """
+from pandas import DataFrame
+
+from site_diff import (HISTORY_COLUMNS, read_site_history, site_history, site_history_file,
+                       write_site_history)
+
+
+def locations(rows):
+  return DataFrame(rows, columns = ["id", "Latitude", "Longitude"])
+
+
+def test_first_run_pulls_every_site():
+  history = site_history(locations([["1", 40.0, -105.0], ["2", 41.0, -104.0]]), "2025-02-12")
+  assert list(history.columns) == HISTORY_COLUMNS
+  assert list(history["change"]) == ["new", "new"]
+  assert list(history["history_run"]) == ["2025-02-12", "2025-02-12"]
+
+
+def test_changes_since_previous_run():
+  previous = site_history(locations([["1", 40.0, -105.0], ["2", 41.0, -104.0],
+                                     ["3", 39.0, -103.0]]), "2024-06-01")
+  current = locations([["2", 41.0, -104.0],
+                       # moved by more than the tolerance
+                       ["3", 39.001, -103.0],
+                       ["4", 38.0, -102.0],
+                       # within the tolerance
+                       ["1", 40.0 + 1e-9, -105.0]])
+  history = site_history(current, "2025-02-12", previous)
+  assert list(history["id"]) == ["2", "3", "4", "1"]
+  assert list(history["change"]) == ["unchanged", "moved", "new", "unchanged"]
+  # unchanged sites keep the run that holds their history
+  assert list(history["history_run"]) == ["2024-06-01", "2025-02-12", "2025-02-12", "2024-06-01"]
+  # and keep it through later runs
+  later = site_history(current, "2025-06-01", history)
+  assert list(later["history_run"]) == ["2024-06-01", "2025-02-12", "2025-02-12", "2024-06-01"]
+  assert set(later["change"]) == {"unchanged"}
+
+
+def test_write_and_read_history(tmp_path):
+  folder = str(tmp_path)
+  assert read_site_history("2025-02-12", "034032", folder) is None
+  history = site_history(locations([["0012", 40.0, -105.0]]), "2025-02-12")
+  fn = write_site_history(history, "2025-02-12", "034032", folder)
+  assert fn == site_history_file("2025-02-12", "034032", folder)
+  assert fn.endswith("v2025-02-12/site_history_034032.csv")
+  read = read_site_history("2025-02-12", "034032", folder)
+  # ids are read as text, keeping leading zeros
+  assert list(read["id"]) == ["0012"]
+  assert list(read["history_run"]) == ["2025-02-12"]
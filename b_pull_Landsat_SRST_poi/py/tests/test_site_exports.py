@@ -0,0 +1,204 @@
+""" Site export descriptions, resuming a run from a fake task list and the
+resubmission of failed site exports, with no task sent to Earth Engine """
+import json
+
+import numpy as np
+import pytest
+from pandas import DataFrame
+
+ee = pytest.importorskip("ee")
+
+from graph_stats import encode_expression
+from summary_bands import combined_dswe
+from task_monitor import TaskMonitor
+
+PATHROW = "034032"
+# run date of the yml of the per_pr fixture
+RUN_DATE = "2025-02-12"
+
+
+class FakeLedger:
+  """ Task ledger of the tasks of this run, without recorded chunks """
+
+  def __init__(self, rows=()):
+    self.rows = list(rows)
+
+  def tasks(self, run_date=None, states=None, pathrow=None):
+    return list(self.rows)
+
+  def record_submission(self, **kwargs):
+    self.rows.append(kwargs)
+
+
+class FakeTask:
+  """ Task of the account's task list, see ee.batch.Task """
+
+  def __init__(self, task_id, state, description):
+    self.id = task_id
+    self.state = state
+    self.config = {"description": description}
+
+  def status(self):
+    return {"id": self.id, "state": self.state}
+
+
+class FakeTaskSource:
+  """ Stands in for ee.batch.Task: `list()` returns the account's tasks """
+
+  def __init__(self, tasks=()):
+    self.tasks = list(tasks)
+
+  def list(self):
+    return list(self.tasks)
+
+
+def grid_locations(n_sites):
+  """ Sites on a line through path-row 034032 """
+  return DataFrame({'Longitude': np.linspace(-105.5, -103.5, n_sites),
+                    'Latitude': np.full(n_sites, 40.0),
+                    'id': [str(i) for i in range(n_sites)]})
+
+
+@pytest.fixture
+def collected(per_pr, monkeypatch):
+  """ The site ranges of the exports started by process_subset(), by export
+  description """
+  exports = {}
+  def collect(task, description, pr, chunk, dswe_variant, sensor_group, site_range=None):
+    exports[description] = site_range
+    return True
+  monkeypatch.setattr(per_pr, "start_export", collect)
+  monkeypatch.setattr(per_pr, "completed_exports", set())
+  monkeypatch.setattr(per_pr, "get_task_ledger", lambda: FakeLedger())
+  return exports
+
+
+@pytest.mark.parametrize("sensor_group, dswe_variant, chunk, part", [
+  ("LS457", "DSWE1", 0, None),
+  ("LS89", "DSWE1a", 12, None),
+  ("LS89", "DSWE3", 3, "s1of2"),
+  ("LS457", "DSWE1", 1, "t2of3"),
+  ("LS89", combined_dswe, 0, None),
+  ("LS457", combined_dswe, 2, "s2of2"),
+])
+def test_site_export_description_round_trip(per_pr, sensor_group, dswe_variant, chunk, part):
+  description = per_pr.site_export_description(sensor_group, dswe_variant, PATHROW, chunk, part)
+  assert description.endswith("_v" + RUN_DATE)
+  assert per_pr.parse_site_export_description(description) == {
+    "sensor_group": sensor_group, "dswe_variant": dswe_variant, "pr": PATHROW, "chunk": chunk,
+    "part": part}
+
+
+@pytest.mark.parametrize("description", [
+  # metadata exports
+  "LSC2_poi_metadata_LS457_C2_" + PATHROW + "_v" + RUN_DATE,
+  "LSC2_poi_metadata_LS89_C2_" + PATHROW + "_v" + RUN_DATE,
+  # site exports of another run
+  "LSC2_poi_site_LS89_C2_SRST_DSWE1_" + PATHROW + "_0_v2024-06-01",
+  "LSC2_poi_site_LS89_C2_SRST_DSWE1_" + PATHROW + "_0_v" + RUN_DATE + "_1",
+  "LSC2_poi_site_LS89_C2_SRST_DSWE2_" + PATHROW + "_0_v" + RUN_DATE,
+  "LSC2_poi_site_LS89_C2_SRST_DSWE1_" + PATHROW + "_0_x1of2_v" + RUN_DATE,
+])
+def test_parse_site_export_description_other_exports(per_pr, description):
+  assert per_pr.parse_site_export_description(description) is None
+
+
+@pytest.fixture
+def resumed(per_pr, monkeypatch, tmp_path):
+  """ A run resumed with exports recorded in the ledger, the task list and the
+  Drive folder, see get_completed_exports() """
+  describe = lambda sensor_group, dswe_variant: per_pr.site_export_description(
+    sensor_group, dswe_variant, PATHROW, 0)
+  ledger = FakeLedger([
+    {"task_id": "1", "description": describe("LS457", "DSWE1"), "state": "COMPLETED"},
+    # failed since it was recorded
+    {"task_id": "2", "description": describe("LS89", "DSWE1"), "state": "RUNNING"}])
+  monitor = TaskMonitor(task_source = FakeTaskSource([
+    FakeTask("2", "FAILED", describe("LS89", "DSWE1")),
+    FakeTask("3", "READY", describe("LS457", "DSWE1a")),
+    FakeTask("4", "CANCELLED", describe("LS89", "DSWE3")),
+    # another run
+    FakeTask("5", "COMPLETED", describe("LS457", "DSWE3").replace(RUN_DATE, "2024-06-01"))]))
+  exported_fn = tmp_path / "exported_files.csv"
+  DataFrame({"name": [describe("LS89", "DSWE1a") + ".csv"]}).to_csv(exported_fn, index = False)
+  monkeypatch.setattr(per_pr, "get_task_ledger", lambda: ledger)
+  monkeypatch.setattr(per_pr, "get_task_monitor", lambda: monitor)
+  monkeypatch.setattr(per_pr, "resume_check_drive", True)
+  monkeypatch.setattr(per_pr, "exported_fn", str(exported_fn))
+  return describe
+
+
+def test_get_completed_exports(per_pr, resumed):
+  assert per_pr.get_completed_exports() == {resumed("LS457", "DSWE1"), resumed("LS457", "DSWE1a"),
+                                            resumed("LS89", "DSWE1a")}
+
+
+def test_resume_skips_completed_exports(per_pr, monkeypatch, resumed):
+  started = []
+  def start(task):
+    task.id = task.config["description"]
+    started.append(task.config["description"])
+  monkeypatch.setattr(ee.batch.Task, "start", start)
+  monkeypatch.setattr(per_pr, "completed_exports", per_pr.get_completed_exports())
+  wrs, ls457, ls89 = per_pr.get_pathrow_stacks(PATHROW)
+  exports = [(sensor_group, dswe_variant) for sensor_group in ["LS457", "LS89"]
+             for dswe_variant in ["DSWE1", "DSWE1a", "DSWE3"]]
+  per_pr.process_subset(grid_locations(10), 0, 10, PATHROW, wrs, ls457, ls89, exports = exports)
+  assert started == [resumed("LS457", "DSWE3"), resumed("LS89", "DSWE1"), resumed("LS89", "DSWE3")]
+  # chunks with every export completed are skipped
+  started.clear()
+  monkeypatch.setattr(per_pr, "completed_exports", set(resumed(*export) for export in exports))
+  per_pr.process_subset(grid_locations(10), 0, 10, PATHROW, wrs, ls457, ls89, exports = exports)
+  assert started == []
+
+
+@pytest.mark.parametrize("n_sites, parts", [(250, ["s1of2", "s2of2"]), (50, ["t1of2", "t2of2"])])
+def test_resubmit_export_split(per_pr, monkeypatch, collected, n_sites, parts):
+  monkeypatch.setattr(per_pr, "pathrow_locations", lambda pr: grid_locations(n_sites))
+  description = per_pr.site_export_description("LS89", "DSWE1a", PATHROW, 0)
+  resubmitted = per_pr.resubmit_export(description, split = True)
+  assert resubmitted == list(collected)
+  exports = [per_pr.parse_site_export_description(part) for part in resubmitted]
+  assert [export["part"] for export in exports] == parts
+  for export in exports:
+    assert (export["sensor_group"], export["dswe_variant"], export["pr"], export["chunk"]) == \
+      ("LS89", "DSWE1a", PATHROW, 0)
+  if parts[0].startswith("s"):
+    # chunks of at least 200 sites are split by site
+    assert list(collected.values()) == [(0, 125), (125, 250)]
+  else:
+    # smaller chunks are split by time, each part with all the sites
+    assert list(collected.values()) == [(0, n_sites), (0, n_sites)]
+
+
+def test_resubmit_export_part_is_not_split_again(per_pr, monkeypatch, collected):
+  monkeypatch.setattr(per_pr, "pathrow_locations", lambda pr: grid_locations(250))
+  description = per_pr.site_export_description("LS457", "DSWE1", PATHROW, 0, "s2of2")
+  assert per_pr.resubmit_export(description, split = True) == [description]
+  # only the sites of the part
+  assert collected == {description: (125, 250)}
+
+
+def test_resubmit_export_without_split(per_pr, monkeypatch, collected):
+  monkeypatch.setattr(per_pr, "pathrow_locations", lambda pr: grid_locations(250))
+  description = per_pr.site_export_description("LS457", "DSWE3", PATHROW, 0)
+  assert per_pr.resubmit_export(description) == [description]
+  assert collected == {description: (0, 250)}
+
+
+def test_chunk_part_time_windows(per_pr):
+  df = grid_locations(10)
+  stack = ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
+  windows = []
+  for part in ["t1of2", "t2of2"]:
+    part_subset, _, part_89 = per_pr.chunk_part(df, stack, stack, part)
+    assert part_subset is df
+    windows.append(json.dumps(encode_expression(part_89)))
+  # the windows meet halfway through the time range of the pull
+  assert '"1983-01-01"' in windows[0] and '"2004-01-01"' in windows[0]
+  assert '"2004-01-01"' in windows[1] and '"2024-12-31"' in windows[1]
+
+
+def test_resubmit_export_ignores_other_exports(per_pr, collected):
+  assert per_pr.resubmit_export("LSC2_poi_metadata_LS89_C2_" + PATHROW + "_v2025-02-12") == []
+  assert collected == {}
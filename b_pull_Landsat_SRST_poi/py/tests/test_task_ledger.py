@@ -0,0 +1,82 @@
+""" The local SQLite task ledger """
+import sqlite3
+
+from task_ledger import LEDGER_COLUMNS, TaskLedger
+
+
+def test_record_and_query(tmp_path):
+  ledger = TaskLedger(str(tmp_path / "ledger.sqlite"))
+  ledger.record_submission("t1", "LSC2_poi_034032_0_LS89_DSWE1_v2025-02-12", "2025-02-12",
+                           pathrow = 34032, chunk = 0, dswe = "DSWE1", sensor = "LS89",
+                           site_start = 0, site_end = 500, n_scenes = 700)
+  ledger.record_submission("t2", "LSC2_poi_metadata_LS89_034033_v2025-02-12", "2025-02-12",
+                           pathrow = "034033", sensor = "LS89")
+  rows = ledger.tasks(run_date = "2025-02-12")
+  assert sorted(row["task_id"] for row in rows) == ["t1", "t2"]
+  assert set(rows[0]) == set(LEDGER_COLUMNS)
+  # path-rows are stored as text
+  assert [row["task_id"] for row in ledger.tasks(pathrow = "34032")] == ["t1"]
+  assert ledger.tasks(run_date = "2025-03-01") == []
+  ledger.close()
+
+
+def test_update_states_upserts(tmp_path):
+  ledger = TaskLedger(str(tmp_path / "ledger.sqlite"))
+  ledger.record_submission("t1", "export_1", "2025-02-12", site_start = 0, site_end = 10)
+  ledger.update_states([
+    {"id": "t1", "state": "COMPLETED", "start_timestamp_ms": 1000,
+     "update_timestamp_ms": 61000, "batch_eecu_usage_seconds": 12.5},
+    # not recorded yet (e.g. sent from another session), added with its description
+    {"id": "t2", "state": "FAILED", "description": "export_2", "run_date": "2025-02-12",
+     "error_message": "Computation timed out."}])
+  rows = {row["task_id"]: row for row in ledger.tasks()}
+  assert rows["t1"]["state"] == "COMPLETED"
+  assert rows["t1"]["runtime_s"] == 60
+  assert rows["t1"]["eecu_s"] == 12.5
+  # the submission details are kept
+  assert rows["t1"]["description"] == "export_1"
+  assert rows["t1"]["site_end"] == 10
+  assert rows["t2"]["description"] == "export_2"
+  assert rows["t2"]["error_message"] == "Computation timed out."
+  # later updates without run time or error keep the earlier values
+  ledger.update_states([{"id": "t2", "state": "FAILED"}, {"id": "t1", "state": "COMPLETED"}])
+  rows = {row["task_id"]: row for row in ledger.tasks()}
+  assert rows["t2"]["error_message"] == "Computation timed out."
+  assert rows["t1"]["runtime_s"] == 60
+  assert len(rows) == 2
+  assert [row["task_id"] for row in ledger.tasks(states = ["FAILED"])] == ["t2"]
+  ledger.close()
+
+
+def test_opening_an_old_ledger_adds_the_new_columns(tmp_path):
+  path = str(tmp_path / "ledger.sqlite")
+  # schema of the first version of the ledger
+  con = sqlite3.connect(path)
+  con.execute("""
+    CREATE TABLE tasks (
+      task_id TEXT PRIMARY KEY,
+      description TEXT NOT NULL,
+      run_date TEXT,
+      pathrow TEXT,
+      chunk INTEGER,
+      dswe TEXT,
+      sensor TEXT,
+      submitted TEXT,
+      state TEXT,
+      error_message TEXT,
+      updated TEXT
+    )""")
+  con.execute("INSERT INTO tasks (task_id, description, run_date, state) "
+              "VALUES ('old', 'export_old', '2024-06-01', 'COMPLETED')")
+  con.commit()
+  con.close()
+  ledger = TaskLedger(path)
+  rows = ledger.tasks()
+  assert set(rows[0]) == set(LEDGER_COLUMNS)
+  assert rows[0]["task_id"] == "old"
+  assert rows[0]["site_start"] is None
+  ledger.record_submission("new", "export_new", "2025-02-12", graph_bytes = 2048)
+  assert ledger.tasks(run_date = "2025-02-12")[0]["graph_bytes"] == 2048
+  ledger.close()
+  # opening again does not try to add the columns twice
+  TaskLedger(path).close()
@@ -0,0 +1,144 @@
+""" TaskMonitor against an in-process fake of ee.batch.Task """
+import enum
+import threading
+import time
+
+import pytest
+
+from task_monitor import TaskMonitor, classify_task_error
+
+
+class State(str, enum.Enum):
+  """ String enum of task states, as ee.batch.Task.State in recent versions of
+  the earthengine-api """
+  UNSUBMITTED = "UNSUBMITTED"
+  READY = "READY"
+  RUNNING = "RUNNING"
+  COMPLETED = "COMPLETED"
+  FAILED = "FAILED"
+
+
+class FakeTask:
+
+  def __init__(self, task_id, state, description=""):
+    self.id = task_id
+    self.state = state
+    self.config = {"description": description}
+
+  def status(self):
+    return {"id": self.id, "state": self.state}
+
+
+class FakeTaskSource:
+  """ Stands in for ee.batch.Task: `list()` returns the account's tasks """
+
+  def __init__(self, tasks=()):
+    self.tasks = list(tasks)
+    self.n_list_calls = 0
+
+  def list(self):
+    self.n_list_calls += 1
+    return list(self.tasks)
+
+
+def test_count_active_counts_by_state():
+  source = FakeTaskSource([FakeTask("a", State.READY), FakeTask("b", State.RUNNING),
+                           FakeTask("c", State.COMPLETED), FakeTask("d", "RUNNING"),
+                           FakeTask("e", State.FAILED)])
+  monitor = TaskMonitor(task_source = source)
+  monitor.resync()
+  assert monitor.count_active() == 3
+  assert monitor.state_of("a") == "READY"
+  source.tasks[0].state = State.COMPLETED
+  monitor.poll(["a"])
+  assert monitor.count_active() == 2
+
+
+def test_register_and_release_track_reserved_slots():
+  monitor = TaskMonitor(task_source = FakeTaskSource())
+  monitor.wait_for_slot(2)
+  assert monitor.count_active() == 1
+  # registering consumes the reservation, the task itself is now active
+  monitor.register(FakeTask("a", State.UNSUBMITTED))
+  assert monitor.state_of("a") == "READY"
+  assert monitor.count_active() == 1
+  monitor.wait_for_slot(2)
+  monitor.release()
+  assert monitor.count_active() == 1
+
+
+def test_wait_for_slot_wakes_when_a_task_finishes():
+  task = FakeTask("a", State.RUNNING)
+  monitor = TaskMonitor(task_source = FakeTaskSource([task]), poll_interval = 60)
+  woke = threading.Event()
+
+  def waiter():
+    monitor.wait_for_slot(1)
+    woke.set()
+
+  thread = threading.Thread(target = waiter, daemon = True)
+  thread.start()
+  time.sleep(0.2)
+  assert not woke.is_set()
+  # another thread (e.g. wait_for_run()) sees the task finish
+  task.state = State.COMPLETED
+  start = time.monotonic()
+  monitor.poll(["a"])
+  assert woke.wait(5)
+  # woken by the poll, not by the 60 s poll interval running out
+  assert time.monotonic() - start < 5
+  thread.join(5)
+
+
+def test_concurrent_reservations_do_not_oversubscribe():
+  max_active = 3
+  monitor = TaskMonitor(task_source = FakeTaskSource([FakeTask("x", State.RUNNING)]),
+                        poll_interval = 0.01)
+  lock = threading.Lock()
+  holding = [0]
+  most = [0]
+
+  def submitter():
+    for _ in range(20):
+      monitor.wait_for_slot(max_active)
+      with lock:
+        holding[0] += 1
+        most[0] = max(most[0], holding[0])
+      time.sleep(0.001)
+      with lock:
+        holding[0] -= 1
+      monitor.release()
+
+  threads = [threading.Thread(target = submitter) for _ in range(10)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join(30)
+  # one slot is taken by the running task
+  assert 1 <= most[0] <= max_active - 1
+  assert monitor.count_active() == 1
+
+
+# error messages of failed Earth Engine tasks
+@pytest.mark.parametrize("error_message, error_type", [
+  ("Computation timed out.", "timeout"),
+  ("Deadline exceeded.", "timeout"),
+  ("User memory limit exceeded.", "memory"),
+  ("Earth Engine memory capacity exceeded.", "memory"),
+  ("Execution failed; out of memory.", "memory"),
+  # memory errors win over the time out they caused
+  ("User memory limit exceeded. Computation timed out.", "memory"),
+  ("Too many concurrent aggregations.", "quota"),
+  ("Earth Engine capacity exceeded.", "quota"),
+  ("Too many tasks already in the queue (3000). Please wait for some of them to complete.", "quota"),
+  ("Quota exceeded.", "quota"),
+  ("Collection query aborted after accumulating over 5000 elements.", "user"),
+  ("Image.select: Pattern 'SR_B1' did not match any bands.", "user"),
+  ("Invalid argument specified for ee.Number(): None", "user"),
+  # a request to try again is not a quota error on its own
+  ("An internal error has occurred. Please try again.", "user"),
+  ("", "user"),
+  (None, "user"),
+])
+def test_classify_task_error(error_message, error_type):
+  assert classify_task_error(error_message) == error_type
@@ -0,0 +1,41 @@
+""" Binning of the sun angles of the terrain cache, checked on the serialized
+graphs (see the ee_offline fixture) """
+import json
+
+import pytest
+
+from graph_stats import encode_expression
+
+ee = pytest.importorskip("ee")
+
+from terrain import TerrainCache, bin_angle
+
+
+def graph(obj):
+  return json.dumps(encode_expression(obj), sort_keys = True)
+
+
+def functions(obj):
+  return set(name for name in graph(obj).split('"') if name.startswith("Number."))
+
+
+@pytest.mark.parametrize("bin_degrees", [0, None])
+def test_bin_angle_without_bins_keeps_the_angle(ee_offline, bin_degrees):
+  angle = ee.Number(ee.Image("LANDSAT/LC08/C02/T1_L2/LC08_034032_20200715").get("SUN_AZIMUTH"))
+  assert graph(bin_angle(angle, bin_degrees)) == graph(angle)
+
+
+def test_bin_angle_rounds_to_bin_centers(ee_offline):
+  binned = bin_angle(ee.Number(123.4), 0.5)
+  assert {"Number.divide", "Number.round", "Number.multiply"} <= functions(binned)
+  assert graph(binned) == graph(ee.Number(123.4).divide(0.5).round().multiply(0.5))
+
+
+def test_terrain_cache_without_bins_uses_the_exact_sun_angles(ee_offline):
+  image = ee.Image("LANDSAT/LC08/C02/T1_L2/LC08_034032_20200715")
+  cache = TerrainCache(ee.Geometry.Rectangle([-105.5, 39.0, -103.5, 41.0]), 0)
+  azimuth, elevation = cache.sun_angles(image)
+  assert graph(azimuth) == graph(ee.Number(image.get("SUN_AZIMUTH")))
+  assert graph(elevation) == graph(ee.Number(image.get("SUN_ELEVATION")))
+  assert "Number.round" not in functions(cache.hill_shade(image))
+  assert "Number.round" not in functions(cache.hill_shadow(image))